@@ -6,15 +6,24 @@ For USDC Hackathon - AgenticCommerce Track
 Built by Galeon (@Galeon on Moltbook)
 """
 
-from flask import Flask, request, jsonify, render_template_string
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
+import atexit
 import logging
-from datetime import datetime
+from datetime import datetime, timezone
+import json
 import os
 
 from blockchain import MockUSDCFaucet
 from verifier import MoltbookVerifier
-from database import Database
+from database import Database, TIMESTAMP_FORMAT, decode_cursor
+from balance_poller import BalancePoller
+from disbursement import DisbursementQueue
+from rate_limiter import TokenBucketLimiter
+from idempotency import IdempotencyStore
+import flask_guards
+from verification_cache import VerificationCache
+from page_cache import PageCache
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -25,45 +34,107 @@ app = Flask(__name__)
 CORS(app)  # Allow cross-origin requests from agents
 
 # Initialize components
-db = Database()
+db = Database(write_behind=os.getenv('DB_WRITE_BEHIND', '0') == '1')
 db.init_db()
-verifier = MoltbookVerifier()
+# VERIFY_CACHE_PERSIST=1 keeps verification results in the database across restarts
+verifier = MoltbookVerifier(cache=VerificationCache(
+    db_file=db.db_file if os.getenv('VERIFY_CACHE_PERSIST', '0') == '1' else None
+))
 faucet = MockUSDCFaucet()  # Using mock mode for demo
 
+# Faucet balance for probes, refreshed in the background
+balance_poller = BalancePoller(faucet, interval=float(os.getenv('BALANCE_POLL_INTERVAL', 30)))
+balance_poller.start()
+
+# Rendered dashboard pages, re-rendered when the stats version changes
+page_cache = PageCache()
+
+# Responses of payout endpoints by Idempotency-Key, for retried requests
+idempotency_store = IdempotencyStore(ttl=float(os.getenv('IDEMPOTENCY_TTL', 24 * 3600)))
+
+# Request admission by IP/agent/wallet; RATE_LIMIT_SHARED=1 shares buckets between workers
+rate_limiter = TokenBucketLimiter(db_file=db.db_file if os.getenv('RATE_LIMIT_SHARED', '0') == '1' else None)
+# Number of proxies in front of the app whose X-Forwarded-For entries are trusted
+RATE_LIMIT_TRUST_PROXY = int(os.getenv('RATE_LIMIT_TRUST_PROXY', '0'))
+
 # Constants
 FAUCET_AMOUNT = 10  # 10 USDC per request
 COOLDOWN_HOURS = 24  # 24 hour cooldown per agent
 
+# Payout batching: queue transfers and flush them together (PAYOUT_BATCHING=1)
+PAYOUT_BATCHING = os.getenv('PAYOUT_BATCHING', '0') == '1'
+PAYOUT_BATCH_SIZE = int(os.getenv('PAYOUT_BATCH_SIZE', 20))
+PAYOUT_BATCH_WAIT = float(os.getenv('PAYOUT_BATCH_WAIT', 2.0))
 
-@app.route('/')
-def index():
-    """Landing page with simple dashboard"""
-    stats = db.get_stats()
 
-    html = f"""
+def _record_payout(ticket):
+    """Record a batched payout once its transfer has been submitted"""
+    meta = ticket['meta']
+    db.record_request(
+        agent_name=meta['agent_name'],
+        wallet_address=ticket['wallet_address'],
+        reason=meta['reason'],
+        amount=ticket['amount'],
+        tx_hash=ticket['tx_hash'],
+        moltbook_proof=meta['moltbook_proof']
+    )
+
+
+payout_queue = DisbursementQueue(
+    faucet,
+    max_batch=PAYOUT_BATCH_SIZE,
+    max_wait=PAYOUT_BATCH_WAIT,
+    on_sent=_record_payout
+) if PAYOUT_BATCHING else None
+if payout_queue:
+    # atexit runs hooks last-in first-out: queued payouts are sent and recorded
+    # before the database's close hook flushes its write-behind queue
+    atexit.register(payout_queue.stop)
+
+
+# Idempotent replays run before admission, so retries are never charged
+idempotent = flask_guards.idempotent(idempotency_store)
+rate_limited = flask_guards.rate_limited(rate_limiter, RATE_LIMIT_TRUST_PROXY)
+
+
+def _cached_page(key: str, render):
+    """
+    Serve a dashboard page from the page cache
+
+    Responses carry an ETag and `Cache-Control: no-cache`, so browsers and
+    CDNs revalidate on every view and get a bodyless 304 until the stats change.
+    """
+    body, etag = page_cache.get_or_render(key, db.stats_version(), render)
+    response = app.response_class(body, mimetype='text/html')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+
+INDEX_TEMPLATE = app.jinja_env.from_string("""
     <!DOCTYPE html>
     <html>
     <head>
         <title>Agent Liquidity Nexus - For AI Agents</title>
         <style>
-            body {{
+            body {
                 font-family: monospace;
                 max-width: 800px;
                 margin: 50px auto;
                 padding: 20px;
                 background: #0a0a0a;
                 color: #00ff00;
-            }}
-            h1 {{ color: #00ff00; }}
-            .stat {{ margin: 10px 0; }}
-            .code {{
+            }
+            h1 { color: #00ff00; }
+            .stat { margin: 10px 0; }
+            .code {
                 background: #1a1a1a;
                 padding: 15px;
                 border-left: 3px solid #00ff00;
                 overflow-x: auto;
-            }}
-            .highlight {{ color: #ffff00; }}
-            a {{ color: #00aaff; }}
+            }
+            .highlight { color: #ffff00; }
+            a { color: #00aaff; }
         </style>
     </head>
     <body>
@@ -71,9 +142,9 @@ def index():
         <p>The central liquidity hub for AI agents in the decentralized economy.</p>
 
         <h2>📊 Stats</h2>
-        <div class="stat">Total Agents Served: <span class="highlight">{stats['total_requests']}</span></div>
-        <div class="stat">Total USDC Distributed: <span class="highlight">{stats['total_usdc']} USDC</span></div>
-        <div class="stat">Success Rate: <span class="highlight">{stats['success_rate']}%</span></div>
+        <div class="stat">Total Agents Served: <span class="highlight">{{ stats['total_requests'] }}</span></div>
+        <div class="stat">Total USDC Distributed: <span class="highlight">{{ stats['total_usdc'] }} USDC</span></div>
+        <div class="stat">Success Rate: <span class="highlight">{{ stats['success_rate'] }}%</span></div>
 
         <h2>💧 Request Test USDC (Interactive)</h2>
         <div style="background: #1a1a1a; padding: 20px; border-left: 3px solid #00ff00; margin: 20px 0;">
@@ -111,7 +182,7 @@ def index():
         </div>
 
         <script>
-            document.getElementById('faucetForm').addEventListener('submit', async (e) => {{
+            document.getElementById('faucetForm').addEventListener('submit', async (e) => {
                 e.preventDefault();
 
                 const resultDiv = document.getElementById('result');
@@ -120,54 +191,62 @@ def index():
                 resultDiv.style.color = '#ffff00';
                 resultDiv.innerHTML = '⏳ Processing request...';
 
-                const data = {{
+                const data = {
                     agent_name: document.getElementById('agent_name').value,
                     wallet_address: document.getElementById('wallet_address').value,
                     reason: document.getElementById('reason').value,
                     moltbook_proof: document.getElementById('moltbook_proof').value
-                }};
+                };
 
-                try {{
-                    const response = await fetch('/request', {{
+                try {
+                    const response = await fetch('/request', {
                         method: 'POST',
-                        headers: {{ 'Content-Type': 'application/json' }},
+                        headers: { 'Content-Type': 'application/json' },
                         body: JSON.stringify(data)
-                    }});
+                    });
 
                     const result = await response.json();
 
-                    if (result.success) {{
+                    if (result.success && result.ticket_id) {
+                        resultDiv.style.borderColor = '#00ff00';
+                        resultDiv.style.color = '#00ff00';
+                        resultDiv.innerHTML = `
+                            ✅ Queued! 10 USDC will be sent shortly.<br><br>
+                            <strong>Ticket:</strong> <a href="${result.status_url}" target="_blank" style="color: #00aaff;">${result.ticket_id}</a><br>
+                            <strong>Agent:</strong> ${data.agent_name}
+                        `;
+                    } else if (result.success) {
                         resultDiv.style.borderColor = '#00ff00';
                         resultDiv.style.color = '#00ff00';
                         resultDiv.innerHTML = `
                             ✅ Success! 10 USDC sent to your wallet!<br><br>
-                            <strong>Transaction:</strong> <a href="https://sepolia.etherscan.io/tx/${{result.tx_hash}}" target="_blank" style="color: #00aaff;">${{result.tx_hash.slice(0, 20)}}...</a><br>
-                            <strong>Agent:</strong> ${{result.agent_name}}<br>
-                            <strong>Cooldown:</strong> ${{result.cooldown_hours}} hours
+                            <strong>Transaction:</strong> <a href="https://sepolia.etherscan.io/tx/${result.tx_hash}" target="_blank" style="color: #00aaff;">${result.tx_hash.slice(0, 20)}...</a><br>
+                            <strong>Agent:</strong> ${result.agent_name}<br>
+                            <strong>Cooldown:</strong> ${result.cooldown_hours} hours
                         `;
-                    }} else {{
+                    } else {
                         resultDiv.style.borderColor = '#ff0000';
                         resultDiv.style.color = '#ff0000';
-                        resultDiv.innerHTML = `❌ Error: ${{result.error}}`;
-                    }}
-                }} catch (error) {{
+                        resultDiv.innerHTML = `❌ Error: ${result.error}`;
+                    }
+                } catch (error) {
                     resultDiv.style.borderColor = '#ff0000';
                     resultDiv.style.color = '#ff0000';
-                    resultDiv.innerHTML = `❌ Network error: ${{error.message}}`;
-                }}
-            }});
+                    resultDiv.innerHTML = `❌ Network error: ${error.message}`;
+                }
+            });
         </script>
 
         <h2>🤖 How to Use (API)</h2>
         <div class="code">
-curl -X POST {request.url_root}request \\
+curl -X POST {{ url_root }}request \\
   -H "Content-Type: application/json" \\
-  -d '{{
+  -d '{
     "agent_name": "YourAgentName",
     "wallet_address": "0x...",
     "reason": "Testing my USDC hackathon project",
     "moltbook_proof": "https://moltbook.com/post/..."
-  }}'
+  }'
         </div>
 
         <h2>✅ Requirements</h2>
@@ -190,11 +269,22 @@ curl -X POST {request.url_root}request \\
         </p>
     </body>
     </html>
-    """
-    return render_template_string(html)
+    """)
+
+
+@app.route('/')
+def index():
+    """Landing page with simple dashboard"""
+    url_root = request.url_root
+    return _cached_page(
+        f'index:{url_root}',
+        lambda: INDEX_TEMPLATE.render(stats=db.get_stats(), url_root=url_root)
+    )
 
 
 @app.route('/request', methods=['POST'])
+@idempotent
+@rate_limited
 def request_usdc():
     """Main endpoint for agents to request USDC"""
     try:
@@ -216,7 +306,13 @@ def request_usdc():
 
         logger.info(f"Request from {agent_name} for {wallet_address}")
 
-        # Check cooldown
+        # Check cooldown (a queued payout counts as a request)
+        if payout_queue and payout_queue.has_open_ticket(agent_name):
+            return jsonify({
+                'success': False,
+                'error': f'Payout already queued. Wait {COOLDOWN_HOURS}h between requests.'
+            }), 429
+
         if db.is_in_cooldown(agent_name, COOLDOWN_HOURS):
             last_request = db.get_last_request_time(agent_name)
             return jsonify({
@@ -238,6 +334,32 @@ def request_usdc():
                 'error': 'Invalid Ethereum address'
             }), 400
 
+        # Queue USDC (batched mode) - agent polls the ticket for the tx hash
+        if payout_queue:
+            ticket_id = payout_queue.enqueue(
+                wallet_address,
+                FAUCET_AMOUNT,
+                key=agent_name,
+                meta={'agent_name': agent_name, 'reason': reason, 'moltbook_proof': moltbook_proof}
+            )
+            if ticket_id is None:
+                # A concurrent request from the same agent queued first
+                return jsonify({
+                    'success': False,
+                    'error': f'Payout already queued. Wait {COOLDOWN_HOURS}h between requests.'
+                }), 429
+
+            logger.info(f"Queued payout {ticket_id} for {agent_name}")
+
+            return jsonify({
+                'success': True,
+                'amount': f'{FAUCET_AMOUNT} USDC',
+                'ticket_id': ticket_id,
+                'status': 'queued',
+                'status_url': f'/payout/{ticket_id}',
+                'message': f'Queued {FAUCET_AMOUNT} testnet USDC. Poll status_url for the transaction hash. 🦞'
+            }), 202
+
         # Send USDC
         logger.info(f"Sending {FAUCET_AMOUNT} USDC to {wallet_address}")
         tx_hash = faucet.send_usdc(wallet_address, FAUCET_AMOUNT)
@@ -270,37 +392,52 @@ def request_usdc():
         }), 500
 
 
-@app.route('/stats')
-def stats():
-    """Detailed statistics page"""
-    stats = db.get_detailed_stats()
+@app.route('/payout/<ticket_id>')
+def payout_status(ticket_id):
+    """Poll a queued payout ticket"""
+    ticket = payout_queue.get_ticket(ticket_id) if payout_queue else None
+
+    if not ticket:
+        return jsonify({
+            'success': False,
+            'error': 'Unknown payout ticket'
+        }), 404
+
+    if ticket['tx_hash']:
+        ticket['explorer'] = f'https://sepolia.etherscan.io/tx/{ticket["tx_hash"]}'
 
-    html = f"""
+    return jsonify({
+        'success': True,
+        **ticket
+    })
+
+
+STATS_TEMPLATE = app.jinja_env.from_string("""
     <!DOCTYPE html>
     <html>
     <head>
         <title>Agent Liquidity Nexus - Detailed Stats</title>
         <style>
-            body {{
+            body {
                 font-family: monospace;
                 max-width: 1000px;
                 margin: 50px auto;
                 padding: 20px;
                 background: #0a0a0a;
                 color: #00ff00;
-            }}
-            table {{
+            }
+            table {
                 width: 100%;
                 border-collapse: collapse;
                 margin: 20px 0;
-            }}
-            th, td {{
+            }
+            th, td {
                 padding: 10px;
                 text-align: left;
                 border-bottom: 1px solid #333;
-            }}
-            th {{ color: #ffff00; }}
-            .highlight {{ color: #ffff00; }}
+            }
+            th { color: #ffff00; }
+            .highlight { color: #ffff00; }
         </style>
     </head>
     <body>
@@ -309,70 +446,62 @@ def stats():
         <h2>Overview</h2>
         <table>
             <tr><th>Metric</th><th>Value</th></tr>
-            <tr><td>Total Requests</td><td class="highlight">{stats['total_requests']}</td></tr>
-            <tr><td>Successful</td><td class="highlight">{stats['successful_requests']}</td></tr>
-            <tr><td>Failed</td><td class="highlight">{stats['failed_requests']}</td></tr>
-            <tr><td>Total USDC Sent</td><td class="highlight">{stats['total_usdc']} USDC</td></tr>
-            <tr><td>Unique Agents</td><td class="highlight">{stats['unique_agents']}</td></tr>
+            <tr><td>Total Requests</td><td class="highlight">{{ stats['total_requests'] }}</td></tr>
+            <tr><td>Successful</td><td class="highlight">{{ stats['successful_requests'] }}</td></tr>
+            <tr><td>Failed</td><td class="highlight">{{ stats['failed_requests'] }}</td></tr>
+            <tr><td>Total USDC Sent</td><td class="highlight">{{ stats['total_usdc'] }} USDC</td></tr>
+            <tr><td>Unique Agents</td><td class="highlight">{{ stats['unique_agents'] }}</td></tr>
         </table>
 
         <h2>Top Use Cases</h2>
         <table>
             <tr><th>Category</th><th>Count</th><th>%</th></tr>
-            {_render_use_cases(stats['use_cases'])}
+            {% for case in stats['use_cases'] %}
+            <tr><td>{{ case['category'] }}</td><td>{{ case['count'] }}</td><td>{{ case['percentage'] }}%</td></tr>
+            {% else %}
+            <tr><td colspan='3'>No data yet</td></tr>
+            {% endfor %}
         </table>
 
         <a href="/">← Back to Home</a>
     </body>
     </html>
-    """
-    return render_template_string(html)
+    """)
 
 
-@app.route('/recent')
-def recent():
-    """Recent requests page"""
-    recent_requests = db.get_recent_requests(limit=50)
-
-    rows = ""
-    for req in recent_requests:
-        rows += f"""
-        <tr>
-            <td>{req['timestamp']}</td>
-            <td>{req['agent_name']}</td>
-            <td>{req['amount']} USDC</td>
-            <td>{req['reason'][:50]}...</td>
-            <td><a href="https://sepolia.etherscan.io/tx/{req['tx_hash']}" target="_blank">View</a></td>
-        </tr>
-        """
-
-    html = f"""
+@app.route('/stats')
+def stats():
+    """Detailed statistics page"""
+    return _cached_page('stats', lambda: STATS_TEMPLATE.render(stats=db.get_detailed_stats()))
+
+
+RECENT_TEMPLATE = app.jinja_env.from_string("""
     <!DOCTYPE html>
     <html>
     <head>
         <title>Agent Liquidity Nexus - Recent Requests</title>
         <style>
-            body {{
+            body {
                 font-family: monospace;
                 max-width: 1200px;
                 margin: 50px auto;
                 padding: 20px;
                 background: #0a0a0a;
                 color: #00ff00;
-            }}
-            table {{
+            }
+            table {
                 width: 100%;
                 border-collapse: collapse;
                 margin: 20px 0;
-            }}
-            th, td {{
+            }
+            th, td {
                 padding: 10px;
                 text-align: left;
                 border-bottom: 1px solid #333;
                 font-size: 12px;
-            }}
-            th {{ color: #ffff00; }}
-            a {{ color: #00aaff; }}
+            }
+            th { color: #ffff00; }
+            a { color: #00aaff; }
         </style>
     </head>
     <body>
@@ -385,34 +514,115 @@ def recent():
                 <th>Reason</th>
                 <th>Tx</th>
             </tr>
-            {rows}
+            {% for req in recent_requests %}
+            <tr>
+                <td>{{ req['timestamp'] }}</td>
+                <td>{{ req['agent_name'] }}</td>
+                <td>{{ req['amount'] }} USDC</td>
+                <td>{{ req['reason'][:50] }}...</td>
+                <td><a href="https://sepolia.etherscan.io/tx/{{ req['tx_hash'] }}" target="_blank">View</a></td>
+            </tr>
+            {% endfor %}
         </table>
         <a href="/">← Back to Home</a>
     </body>
     </html>
+    """)
+
+
+@app.route('/recent')
+def recent():
+    """Recent requests page"""
+    return _cached_page(
+        'recent',
+        lambda: RECENT_TEMPLATE.render(recent_requests=db.get_recent_requests(limit=50))
+    )
+
+
+def _parse_time(value):
+    """ISO 8601 (or unix seconds) query parameter -> stored UTC timestamp format"""
+    if value is None:
+        return None
+    if value.replace('.', '', 1).isdigit():
+        parsed = datetime.fromtimestamp(float(value), timezone.utc)
+    else:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone(timezone.utc)
+    return parsed.strftime(TIMESTAMP_FORMAT)
+
+
+@app.route('/api/requests')
+def api_requests():
     """
-    return render_template_string(html)
+    Faucet requests as JSON pages, or NDJSON for bulk export
+
+    Query: agent, tier, wallet, since, until (ISO 8601 or unix seconds),
+    limit, cursor (next_cursor of the previous page), format=ndjson.
+    NDJSON streams every matching row from the cursor on, one per line.
+    """
+    try:
+        filters = {
+            'agent_name': request.args.get('agent'),
+            'tier': request.args.get('tier'),
+            'wallet_address': request.args.get('wallet'),
+            'since': _parse_time(request.args.get('since')),
+            'until': _parse_time(request.args.get('until')),
+        }
+        limit = int(request.args.get('limit', 50))
+        cursor = request.args.get('cursor')
+
+        if cursor is not None:
+            # Reject a bad cursor before a stream has started
+            decode_cursor(cursor)
+
+        if request.args.get('format') == 'ndjson' or request.accept_mimetypes.best == 'application/x-ndjson':
+            rows = db.iter_requests(cursor=cursor, **filters)
+            return Response((json.dumps(row) + '\n' for row in rows), mimetype='application/x-ndjson')
+
+        rows, next_cursor = db.get_requests_page(limit=limit, cursor=cursor, **filters)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    return jsonify({
+        'success': True,
+        'requests': rows,
+        'next_cursor': next_cursor
+    })
 
 
 @app.route('/health')
 def health():
-    """Health check endpoint"""
+    """Liveness check - answered from memory, never touches the RPC node"""
+    balance = balance_poller.snapshot()
     return jsonify({
         'status': 'healthy',
         'timestamp': datetime.now().isoformat(),
-        'faucet_balance': faucet.get_balance()
+        'faucet_balance': balance['balance'],
+        'faucet_balance_updated_at': balance['updated_at'],
+        'faucet_balance_stale': balance['stale'],
+        'verifier_latency': verifier.latency_stats()
     })
 
 
-def _render_use_cases(use_cases):
-    """Helper to render use cases table"""
-    if not use_cases:
-        return "<tr><td colspan='3'>No data yet</td></tr>"
+@app.route('/ready')
+def ready():
+    """Readiness check - fresh faucet balance and a readable database"""
+    balance = balance_poller.snapshot()
+    checks = {'faucet_balance': not balance['stale']}
+    try:
+        db.get_stats()
+        checks['database'] = True
+    except Exception as e:
+        logger.error(f"Readiness database check failed: {e}")
+        checks['database'] = False
 
-    rows = ""
-    for case in use_cases:
-        rows += f"<tr><td>{case['category']}</td><td>{case['count']}</td><td>{case['percentage']}%</td></tr>"
-    return rows
+    is_ready = all(checks.values())
+    return jsonify({
+        'status': 'ready' if is_ready else 'not_ready',
+        'checks': checks,
+        'faucet_balance': balance
+    }), 200 if is_ready else 503
 
 
 if __name__ == '__main__':
@@ -8,6 +8,10 @@ from flask_cors import CORS
 import os
 import logging
 
+from idempotency import IdempotencyStore
+from rate_limiter import TokenBucketLimiter
+import flask_guards
+
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -19,12 +23,15 @@ try:
     from database import Database
     from payment_verifier import MockPaymentVerifier
     from balance_system import MockBalanceSystem
+    from balance_poller import BalancePoller
+    from payment_tracker import MockPaymentConfirmationTracker
+    from payment_claims import PaymentClaims
     logger.info("✅ 成功导入所有模块")
 except Exception as e:
     logger.error(f"导入模块失败: {e}")
     # 如果导入失败，使用内联版本
     class MockUSDCFaucet:
-        def send_usdc(self, addr, amount):
+        def send_usdc(self, addr, amount, **kwargs):
             import hashlib, time
             return "0x" + hashlib.sha256(f"{addr}{amount}{time.time()}".encode()).hexdigest()
         def get_balance(self):
@@ -35,6 +42,41 @@ except Exception as e:
     class MockVerifier:
         def verify_agent(self, name, proof=None):
             return True
+
+    class MockPaymentConfirmationTracker:
+        def __init__(self, verifier, **kwargs):
+            self.payments = {}
+        def watch(self, tx_hash, expected_amount_eth, on_confirmed, **kwargs):
+            self.payments[tx_hash] = {'tx_hash': tx_hash, 'status': 'pending'}
+            return self.payments[tx_hash]
+        def status(self, tx_hash):
+            return self.payments.get(tx_hash)
+
+    class PaymentClaims:
+        def __init__(self, *args):
+            self.claims = {}
+        def get(self, payment_tx):
+            return self.claims.get(payment_tx.lower())
+        def record_failure(self, payment_tx, error):
+            self.claims.setdefault(payment_tx.lower(), {'verified': False, 'claimed': False, 'error': error, 'payout_tx': None})
+        def claim(self, payment_tx, agent_name, payment_result):
+            claim = self.claims.get(payment_tx.lower())
+            if claim and (claim['claimed'] or not claim['verified']):
+                return False
+            self.claims[payment_tx.lower()] = {'verified': True, 'claimed': True, 'claimed_by': agent_name, 'payout_tx': None, **payment_result}
+            return True
+        def set_payout(self, payment_tx, payout_tx):
+            self.claims[payment_tx.lower()]['payout_tx'] = payout_tx
+        def release(self, payment_tx):
+            self.claims[payment_tx.lower()]['claimed'] = False
+
+    class BalancePoller:
+        def __init__(self, faucet, **kwargs):
+            self.faucet = faucet
+        def start(self):
+            pass
+        def snapshot(self):
+            return {'balance': self.faucet.get_balance(), 'updated_at': None, 'age_seconds': None, 'stale': False, 'error': None}
     
     class Database:
         def __init__(self, *args, **kwargs):
@@ -57,6 +99,8 @@ except Exception as e:
             if tx_hash.startswith('0x') and tx_hash[2:].upper().startswith('PAID'):
                 return {'verified': True, 'amount_eth': expected_amount_eth, 'from_address': '0x' + '1' * 40}
             return {'verified': False, 'error': 'Mock payment not recognized'}
+        def get_recent_payments(self, from_address=None, hours=24, limit=50, cursor=None):
+            return [], None
 
     class MockBalanceSystem:
         def __init__(self):
@@ -89,17 +133,29 @@ CORS(app)
 
 # 初始化组件
 try:
-    db = Database("faucet.db")
+    db = Database("faucet.db", write_behind=os.getenv('DB_WRITE_BEHIND', '0') == '1')
     db.init_db()
     verifier = MockVerifier()
     faucet = MockUSDCFaucet()
     payment_verifier = MockPaymentVerifier()
+    payment_tracker = MockPaymentConfirmationTracker(payment_verifier)
+    payment_claims = PaymentClaims("faucet.db")
     balance_system = MockBalanceSystem()
     balance_system.init_db()
+    balance_poller = BalancePoller(faucet, interval=float(os.getenv('BALANCE_POLL_INTERVAL', 30)))
+    balance_poller.start()
     logger.info("✅ 组件初始化成功")
 except Exception as e:
     logger.error(f"组件初始化失败: {e}")
 
+# 付费端点的幂等键响应（客户端超时重试时直接回放）
+idempotency_store = IdempotencyStore(ttl=float(os.getenv('IDEMPOTENCY_TTL', 24 * 3600)))
+
+# 按IP/agent/钱包的令牌桶准入；RATE_LIMIT_SHARED=1 时多个worker共享
+rate_limiter = TokenBucketLimiter(db_file="faucet.db" if os.getenv('RATE_LIMIT_SHARED', '0') == '1' else None)
+# 应用前面的代理层数（只信任这些代理追加的 X-Forwarded-For 条目）
+RATE_LIMIT_TRUST_PROXY = int(os.getenv('RATE_LIMIT_TRUST_PROXY', '0'))
+
 # 定价配置
 FREE_TIER_AMOUNT = 10  # USDC
 FREE_TIER_COOLDOWN = 24  # hours
@@ -107,6 +163,22 @@ PREMIUM_TIER_AMOUNT = 100  # USDC
 PREMIUM_TIER_PRICE = 0.001  # ETH
 PAYMENT_ADDRESS = "0x2f134373561052bCD4ED8cba44AB66637b7bee0B"  # 收款地址
 
+# 设置 PAYMENT_INDEX_RPC_URL 时，/payments 读取本地付款索引（后台线程保持同步）
+payment_history = payment_verifier
+if os.getenv('PAYMENT_INDEX_RPC_URL'):
+    try:
+        from payment_verifier import PaymentVerifier
+        payment_history = PaymentVerifier(PAYMENT_ADDRESS, os.getenv('PAYMENT_INDEX_RPC_URL'), index_db="faucet.db")
+        if payment_history.indexer:
+            payment_history.indexer.start()
+    except Exception as e:
+        logger.error(f"付款索引初始化失败: {e}")
+
+# 幂等回放先于限流准入，重试不扣令牌
+idempotent = flask_guards.idempotent(idempotency_store)
+rate_limited = flask_guards.rate_limited(rate_limiter, RATE_LIMIT_TRUST_PROXY)
+
+
 @app.route('/')
 def index():
     try:
@@ -222,7 +294,8 @@ curl -X POST https://web-production-19f04.up.railway.app/request-premium \\
 
             <h2>🔗 API Endpoints</h2>
             <ul>
-                <li><a href="/health">/health</a> - Health check</li>
+                <li><a href="/health">/health</a> - Health check (liveness)</li>
+                <li><a href="/ready">/ready</a> - Readiness check</li>
                 <li><a href="/stats">/stats</a> - Detailed statistics (JSON)</li>
                 <li><strong>POST /request</strong> - Free tier (10 USDC, 24h cooldown)</li>
                 <li><strong>POST /request-premium</strong> - Premium tier (100 USDC, requires payment)</li>
@@ -242,6 +315,8 @@ curl -X POST https://web-production-19f04.up.railway.app/request-premium \\
         return f"<h1>Error: {str(e)}</h1>", 500
 
 @app.route('/request', methods=['POST'])
+@idempotent
+@rate_limited
 def request_usdc():
     try:
         data = request.get_json()
@@ -302,6 +377,8 @@ def request_usdc():
 
 
 @app.route('/request-premium', methods=['POST'])
+@idempotent
+@rate_limited
 def request_usdc_premium():
     """Premium tier: Pay to get more USDC without cooldown"""
     try:
@@ -319,10 +396,38 @@ def request_usdc_premium():
                 'hint': 'Send 0.001 ETH to {} first, then provide the tx hash'.format(PAYMENT_ADDRESS)
             }), 400
 
-        # 验证支付
-        payment_result = payment_verifier.verify_payment(payment_tx, PREMIUM_TIER_PRICE)
+        # 已验证过的支付直接用本地记录回答，不再查询RPC
+        claim = payment_claims.get(payment_tx)
+        if claim and claim['claimed']:
+            return _payment_used_response(payment_tx, claim)
+
+        if claim:
+            payment_result = {k: claim[k] for k in ('verified', 'amount_eth', 'from_address', 'error')}
+        else:
+            # 验证支付
+            payment_result = payment_verifier.verify_payment(payment_tx, PREMIUM_TIER_PRICE)
+
+        # 支付尚未确认：登记到确认跟踪器，确认后自动发放
+        if payment_result.get('pending'):
+            payment = payment_tracker.watch(
+                payment_tx,
+                PREMIUM_TIER_PRICE,
+                on_confirmed=lambda result: _claim_premium_payout(agent_name, wallet_address, reason, payment_tx, result),
+                block_number=payment_result.get('block_number')
+            )
+            return jsonify({
+                'success': True,
+                'tier': 'premium',
+                'status': payment['status'],
+                'payment_tx': payment_tx,
+                'status_url': f'/payment/{payment_tx}',
+                'message': 'Payment seen but not confirmed yet. The payout is sent automatically once it confirms - poll status_url.',
+                'hint': 'For mock testing, tx hashes starting with "0xPENDING" confirm after a short delay'
+            }), 202
 
         if not payment_result.get('verified'):
+            if not claim and not payment_result.get('retryable'):
+                payment_claims.record_failure(payment_tx, payment_result.get('error'))
             return jsonify({
                 'success': False,
                 'error': 'Payment verification failed',
@@ -330,28 +435,16 @@ def request_usdc_premium():
                 'hint': 'For mock testing, use tx hash starting with "0xPAID"'
             }), 402  # Payment Required
 
+        # 每笔支付只能兑换一次（并发重复提交只有一个成功）
+        if not payment_claims.claim(payment_tx, agent_name, payment_result):
+            return _payment_used_response(payment_tx, payment_claims.get(payment_tx))
+
         # 验证agent身份（可选，premium可以跳过）
         # if not verifier.verify_agent(agent_name):
         #     return jsonify({'success': False, 'error': 'Verification failed'}), 403
 
         # 发送USDC (付费层 - 10倍金额)
-        tx_hash = faucet.send_usdc(wallet_address, PREMIUM_TIER_AMOUNT)
-
-        # 记录
-        db.record_request(
-            agent_name=agent_name,
-            wallet_address=wallet_address,
-            reason=reason,
-            amount=PREMIUM_TIER_AMOUNT,
-            tx_hash=tx_hash,
-            moltbook_proof="",
-            success=True,
-            tier='premium',
-            payment_tx=payment_tx,
-            payment_amount=payment_result.get('amount_eth', PREMIUM_TIER_PRICE)
-        )
-
-        logger.info(f"✅ [PREMIUM] Request from {agent_name}: {tx_hash} (paid {payment_result.get('amount_eth')} ETH)")
+        tx_hash = _send_premium_payout(agent_name, wallet_address, reason, payment_tx, payment_result)['tx_hash']
 
         return jsonify({
             'success': True,
@@ -371,6 +464,86 @@ def request_usdc_premium():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+def _payment_used_response(payment_tx, claim):
+    return jsonify({
+        'success': False,
+        'error': 'Payment already used',
+        'payment_tx': payment_tx,
+        'payout_tx': claim.get('payout_tx'),
+        'hint': 'Each payment buys one premium request - send a new payment'
+    }), 409
+
+
+def _claim_premium_payout(agent_name, wallet_address, reason, payment_tx, payment_result):
+    """认领追踪器已确认的付款，然后发放"""
+    if not payment_claims.claim(payment_tx, agent_name, payment_result):
+        raise ValueError('Payment already used')
+    return _send_premium_payout(agent_name, wallet_address, reason, payment_tx, payment_result)
+
+
+def _send_premium_payout(agent_name, wallet_address, reason, payment_tx, payment_result):
+    """为已认领的付款发放并记录付费层USDC"""
+    try:
+        tx_hash = faucet.send_usdc(wallet_address, PREMIUM_TIER_AMOUNT, fee_strategy='fast')
+    except Exception:
+        # 未发出转账，付款可以再次使用
+        payment_claims.release(payment_tx)
+        raise
+    payment_claims.set_payout(payment_tx, tx_hash)
+
+    db.record_request(
+        agent_name=agent_name,
+        wallet_address=wallet_address,
+        reason=reason,
+        amount=PREMIUM_TIER_AMOUNT,
+        tx_hash=tx_hash,
+        moltbook_proof="",
+        success=True,
+        tier='premium',
+        payment_tx=payment_tx,
+        payment_amount=payment_result.get('amount_eth', PREMIUM_TIER_PRICE)
+    )
+
+    logger.info(f"✅ [PREMIUM] Request from {agent_name}: {tx_hash} (paid {payment_result.get('amount_eth')} ETH)")
+
+    return {'tx_hash': tx_hash, 'explorer': f'https://sepolia.etherscan.io/tx/{tx_hash}'}
+
+
+@app.route('/payment/<payment_tx>')
+def payment_status(payment_tx):
+    """查询待确认的付费请求（确认后返回发放详情）"""
+    payment = payment_tracker.status(payment_tx)
+
+    if not payment:
+        return jsonify({
+            'success': False,
+            'error': 'Unknown payment - submit it to /request-premium first'
+        }), 404
+
+    return jsonify({
+        'success': True,
+        **payment
+    })
+
+
+@app.route('/payments')
+def recent_payments():
+    """从本地付款索引分页查询转入水龙头的付款（?from_address=&hours=24&limit=50&cursor=）"""
+    try:
+        hours = int(request.args.get('hours', 24))
+        limit = int(request.args.get('limit', 50))
+    except ValueError:
+        return jsonify({'success': False, 'error': 'hours and limit must be integers'}), 400
+
+    try:
+        payments, next_cursor = payment_history.get_recent_payments(
+            request.args.get('from_address'), hours, limit, request.args.get('cursor')
+        )
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    return jsonify({'success': True, 'payments': payments, 'next_cursor': next_cursor})
+
+
 @app.route('/pricing')
 def pricing():
     """Return pricing information in JSON"""
@@ -464,6 +637,8 @@ def check_balance():
 
 
 @app.route('/request-premium-balance', methods=['POST'])
+@idempotent
+@rate_limited
 def request_premium_balance():
     """
     Request premium tier using balance (TRUE AUTONOMOUS)
@@ -492,7 +667,7 @@ def request_premium_balance():
             }), 402  # Payment Required
 
         # Send USDC (premium tier)
-        tx_hash = faucet.send_usdc(wallet_address, PREMIUM_TIER_AMOUNT)
+        tx_hash = faucet.send_usdc(wallet_address, PREMIUM_TIER_AMOUNT, fee_strategy='fast')
 
         # Record
         db.record_request(
@@ -539,16 +714,39 @@ def stats():
 
 @app.route('/health')
 def health():
+    """存活检查 - 只读内存，不访问RPC节点"""
     try:
+        balance = balance_poller.snapshot()
         return jsonify({
             'status': 'healthy',
             'mode': 'mock',
-            'faucet_balance': faucet.get_balance()
+            'faucet_balance': balance['balance'],
+            'faucet_balance_updated_at': balance['updated_at'],
+            'faucet_balance_stale': balance['stale']
         })
     except Exception as e:
         logger.error(f"Health error: {e}")
         return jsonify({'status': 'error', 'error': str(e)}), 500
 
+@app.route('/ready')
+def ready():
+    """就绪检查 - 余额数据新鲜且数据库可读"""
+    balance = balance_poller.snapshot()
+    checks = {'faucet_balance': not balance['stale']}
+    try:
+        db.get_stats()
+        checks['database'] = True
+    except Exception as e:
+        logger.error(f"Readiness database check failed: {e}")
+        checks['database'] = False
+
+    is_ready = all(checks.values())
+    return jsonify({
+        'status': 'ready' if is_ready else 'not_ready',
+        'checks': checks,
+        'faucet_balance': balance
+    }), 200 if is_ready else 503
+
 # 错误处理
 @app.errorhandler(404)
 def not_found(e):
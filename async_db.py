@@ -0,0 +1,60 @@
+"""
+Async DB Layer
+Awaitable wrappers around Database and BalanceSystem for the ASGI server
+"""
+
+import asyncio
+import logging
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncDatabase:
+    """
+    Awaitable facade over a Database (or mock)
+
+    sqlite3 has no async driver, so each call runs in the default executor.
+    The wrapped calls are short (pooled WAL connections, in-memory cooldown
+    index, counter-table stats), so the event loop never waits on disk.
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    async def record_request(self, **kwargs):
+        return await asyncio.to_thread(self.db.record_request, **kwargs)
+
+    async def is_in_cooldown(self, agent_name: str, cooldown_hours: int) -> bool:
+        return await asyncio.to_thread(self.db.is_in_cooldown, agent_name, cooldown_hours)
+
+    async def get_last_request_time(self, agent_name: str) -> str:
+        return await asyncio.to_thread(self.db.get_last_request_time, agent_name)
+
+    async def get_stats(self) -> Dict:
+        return await asyncio.to_thread(self.db.get_stats)
+
+    async def get_detailed_stats(self) -> Dict:
+        return await asyncio.to_thread(self.db.get_detailed_stats)
+
+    async def get_recent_requests(self, limit: int = 50) -> List[Dict]:
+        return await asyncio.to_thread(self.db.get_recent_requests, limit)
+
+
+class AsyncBalanceSystem:
+    """Awaitable facade over a BalanceSystem (or mock)"""
+
+    def __init__(self, balance_system):
+        self.balance_system = balance_system
+
+    async def record_deposit(self, agent_name: str, amount_eth: float, tx_hash: str, signature: str = None) -> Dict:
+        return await asyncio.to_thread(self.balance_system.record_deposit, agent_name, amount_eth, tx_hash, signature)
+
+    async def get_balance(self, agent_name: str) -> float:
+        return await asyncio.to_thread(self.balance_system.get_balance, agent_name)
+
+    async def deduct_balance(self, agent_name: str, amount_eth: float, service_type: str = 'premium_tier') -> Dict:
+        return await asyncio.to_thread(self.balance_system.deduct_balance, agent_name, amount_eth, service_type)
+
+    async def get_balance_info(self, agent_name: str) -> Dict:
+        return await asyncio.to_thread(self.balance_system.get_balance_info, agent_name)
@@ -0,0 +1,93 @@
+"""
+Faucet Balance Poller
+Keeps the faucet's on-chain USDC balance in memory for health/readiness probes
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BalancePoller:
+    """
+    Cached faucet balance, refreshed by a background thread
+
+    Probes read the last known balance plus its age instead of calling the
+    node, so the RPC cost is one balanceOf per `interval` no matter how often
+    load balancers and monitors ask. A balance older than `max_age` is
+    reported as stale.
+    """
+
+    def __init__(self, faucet, interval: float = 30.0, max_age: float = 120.0):
+        """
+        Args:
+            faucet: USDCFaucet (or mock) providing get_balance
+            interval: Seconds between balance refreshes
+            max_age: Seconds after which the cached balance counts as stale
+        """
+        self.faucet = faucet
+        self.interval = interval
+        self.max_age = max_age
+
+        self._lock = threading.Lock()
+        self._balance: Optional[float] = None
+        self._updated_at: Optional[float] = None
+        self._last_error: Optional[str] = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def snapshot(self) -> Dict:
+        """Last known balance with its timestamp, age and staleness"""
+        with self._lock:
+            balance, updated_at, error = self._balance, self._updated_at, self._last_error
+
+        age = time.time() - updated_at if updated_at is not None else None
+        return {
+            'balance': balance,
+            'updated_at': datetime.fromtimestamp(updated_at, timezone.utc).isoformat() if updated_at else None,
+            'age_seconds': round(age, 1) if age is not None else None,
+            'stale': age is None or age > self.max_age,
+            'error': error
+        }
+
+    def is_fresh(self) -> bool:
+        return not self.snapshot()['stale']
+
+    def refresh(self) -> Optional[float]:
+        """Read the balance from the node now (errors are kept, not raised)"""
+        try:
+            balance = self.faucet.get_balance()
+        except Exception as e:
+            logger.error(f"Faucet balance refresh failed: {e}")
+            with self._lock:
+                self._last_error = str(e)
+            return None
+
+        with self._lock:
+            self._balance = balance
+            self._updated_at = time.time()
+            self._last_error = None
+        return balance
+
+    def start(self):
+        """Fetch once, then keep refreshing in the background (no-op if running)"""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='balance-poller', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval + 1)
+
+    def _run(self):
+        self.refresh()
+        while not self._stop.wait(self.interval):
+            self.refresh()
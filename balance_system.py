@@ -3,13 +3,54 @@ Balance/Deposit System for Autonomous Agents
 Enables true autonomous payments without per-request transactions
 """
 
-import sqlite3
 import logging
 from datetime import datetime
-from typing import Dict, Optional
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+from eth_account import Account
+from eth_account.messages import encode_defunct
+
+from db_pool import get_pool
 
 logger = logging.getLogger(__name__)
 
+WEI_PER_ETH = 10 ** 18
+
+# Rows converted per transaction when migrating REAL balances to wei
+MIGRATION_BATCH_SIZE = 500
+
+
+def eth_to_wei(amount_eth) -> int:
+    """Convert an ETH amount (float, str or Decimal) to integer wei"""
+    # str() first so 0.001 becomes exactly 10**15, not the nearest binary float
+    return int(Decimal(str(amount_eth)) * WEI_PER_ETH)
+
+
+def real_to_wei(value: Optional[float]) -> int:
+    """
+    Convert a stored REAL ETH value to wei
+
+    Rounded to 15 significant digits first, which drops the accumulated
+    float error (0.009000000000000001 -> 0.009) without losing real digits.
+    """
+    if not value:
+        return 0
+    return eth_to_wei(format(value, '.15g'))
+
+
+def wei_to_eth(amount_wei: int) -> float:
+    """Convert integer wei to ETH for display"""
+    return float(Decimal(amount_wei) / WEI_PER_ETH)
+
+
+PREMIUM_PRICE_WEI = eth_to_wei('0.001')
+
+
+def deposit_message(agent_name: str, tx_hash: str) -> str:
+    """Text the sending wallet signs (EIP-191) to credit its deposit to an agent"""
+    return f'Deposit {tx_hash.lower()} to {agent_name}'
+
 
 class BalanceSystem:
     """
@@ -19,26 +60,46 @@ class BalanceSystem:
     1. Agent deposits ETH once
     2. Agent can use balance for multiple premium requests
     3. No need for per-request web3 transactions
+
+    Amounts are stored as INTEGER wei and all sums and comparisons stay on
+    integers; the public methods still take and return ETH.
     """
 
-    def __init__(self, db_file: str = "faucet.db"):
+    def __init__(self, db_file: str = "faucet.db", deposit_address: str = None):
+        """
+        Args:
+            db_file: SQLite database path
+            deposit_address: Address deposits must be sent to. When set,
+                record_deposit only queues the deposit and DepositPipeline
+                credits it once verified on-chain; otherwise the mock
+                "0xDEPOSIT" prefix check applies.
+        """
         self.db_file = db_file
-        self.conn = None
+        self.deposit_address = deposit_address
+        self.pool = None
+        # Tables still carrying the old NOT NULL amount_eth column
+        self._legacy_amount_eth = set()
 
     def init_db(self):
         """Initialize balance tables"""
-        self.conn = sqlite3.connect(self.db_file, check_same_thread=False)
-        self.conn.row_factory = sqlite3.Row
+        self.pool = get_pool(self.db_file)
 
-        cursor = self.conn.cursor()
+        with self.pool.writer() as conn:
+            self._create_tables(conn.cursor())
 
+        self._migrate_to_wei()
+
+        logger.info("Balance system initialized")
+
+    def _create_tables(self, cursor):
+        """Create balance tables (inside the caller's write transaction)"""
         # Agent balances table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS agent_balances (
                 agent_name TEXT PRIMARY KEY,
-                balance_eth REAL DEFAULT 0,
-                total_deposited REAL DEFAULT 0,
-                total_spent REAL DEFAULT 0,
+                balance_wei INTEGER NOT NULL DEFAULT 0,
+                total_deposited_wei INTEGER NOT NULL DEFAULT 0,
+                total_spent_wei INTEGER NOT NULL DEFAULT 0,
                 last_deposit_tx TEXT,
                 last_deposit_time DATETIME,
                 created_at DATETIME DEFAULT CURRENT_TIMESTAMP
@@ -50,20 +111,58 @@ class BalanceSystem:
             CREATE TABLE IF NOT EXISTS deposits (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 agent_name TEXT NOT NULL,
-                amount_eth REAL NOT NULL,
+                amount_wei INTEGER NOT NULL,
                 tx_hash TEXT NOT NULL,
                 verified BOOLEAN DEFAULT FALSE,
                 timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                status TEXT,
+                error TEXT,
                 FOREIGN KEY(agent_name) REFERENCES agent_balances(agent_name)
             )
         ''')
 
+        # On-chain deposit state (NULL for mock deposits credited on arrival);
+        # sender is the wallet that signed the deposit message
+        cursor.execute('PRAGMA table_info(deposits)')
+        existing = [col['name'] for col in cursor.fetchall()]
+        for column in ('status', 'error', 'sender'):
+            if column not in existing:
+                cursor.execute(f'ALTER TABLE deposits ADD COLUMN {column} TEXT')
+
+        # A chain deposit can be credited once. Until then it may be pending
+        # once per signing wallet - only the one that sent it gets credited,
+        # so a copy queued by someone else can't block the real sender.
+        cursor.execute('''
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_deposits_credited_tx
+            ON deposits(tx_hash) WHERE status = 'credited'
+        ''')
+        cursor.execute('''
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_deposits_pending_tx
+            ON deposits(tx_hash, sender) WHERE status = 'pending'
+        ''')
+
+        # The verification worker's queue
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_deposits_pending
+            ON deposits(id) WHERE status = 'pending'
+        ''')
+
+        # REAL -> wei conversions in progress: rows up to max_rowid predate the
+        # wei columns, rows up to last_rowid are converted
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS wei_backfill (
+                table_name TEXT PRIMARY KEY,
+                last_rowid INTEGER NOT NULL,
+                max_rowid INTEGER NOT NULL
+            )
+        ''')
+
         # Spending history
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS spending (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 agent_name TEXT NOT NULL,
-                amount_eth REAL NOT NULL,
+                amount_wei INTEGER NOT NULL,
                 service_type TEXT NOT NULL,
                 request_id INTEGER,
                 timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
@@ -71,17 +170,108 @@ class BalanceSystem:
             )
         ''')
 
-        self.conn.commit()
-        logger.info("Balance system initialized")
+    def _migrate_to_wei(self):
+        """
+        Convert databases created with REAL ETH columns to INTEGER wei
 
-    def record_deposit(self, agent_name: str, amount_eth: float, tx_hash: str) -> Dict:
+        Adds the wei columns (NOT NULL DEFAULT 0) and notes the last rowid
+        that existed at that point, then fills those rows in rowid order with
+        one short write transaction per batch, so other writers are never
+        locked out for long. Rows written after the columns were added are
+        never touched. The old REAL columns are left in place and no longer read.
+        """
+        migrations = {
+            'agent_balances': [
+                ('balance_eth', 'balance_wei'),
+                ('total_deposited', 'total_deposited_wei'),
+                ('total_spent', 'total_spent_wei'),
+            ],
+            'deposits': [('amount_eth', 'amount_wei')],
+            'spending': [('amount_eth', 'amount_wei')],
+        }
+
+        for table, columns in migrations.items():
+            existing = {row['name'] for row in self.pool.reader().execute(f'PRAGMA table_info({table})')}
+            if 'amount_eth' in existing:
+                self._legacy_amount_eth.add(table)
+
+            pending = [(old, new) for old, new in columns if old in existing]
+            if not pending:
+                continue
+
+            if any(new not in existing for _, new in pending):
+                with self.pool.writer() as conn:
+                    for _, new in pending:
+                        if new not in existing:
+                            conn.execute(f'ALTER TABLE {table} ADD COLUMN {new} INTEGER NOT NULL DEFAULT 0')
+                    conn.execute(f'''
+                        INSERT OR IGNORE INTO wei_backfill (table_name, last_rowid, max_rowid)
+                        SELECT ?, 0, COALESCE(MAX(rowid), 0) FROM {table}
+                    ''', (table,))
+
+            converted = self._backfill_wei(table, pending)
+            if converted:
+                logger.info(f"Migrated {converted} {table} rows to wei")
+
+    def _backfill_wei(self, table: str, columns) -> int:
+        """Add the REAL values of rows that predate the wei columns, batch by batch"""
+        old_cols = ', '.join(old for old, _ in columns)
+        # Added, not assigned: a legacy row may already have been credited or
+        # charged in wei since its columns were created with 0
+        set_clause = ', '.join(f'{new} = {new} + ?' for _, new in columns)
+
+        converted = 0
+        while True:
+            progress = self.pool.reader().execute(
+                'SELECT last_rowid, max_rowid FROM wei_backfill WHERE table_name = ?', (table,)
+            ).fetchone()
+            if progress is None:
+                return converted
+
+            rows = self.pool.reader().execute(f'''
+                SELECT rowid AS row_id, {old_cols} FROM {table}
+                WHERE rowid > ? AND rowid <= ?
+                ORDER BY rowid
+                LIMIT ?
+            ''', (progress['last_rowid'], progress['max_rowid'], MIGRATION_BATCH_SIZE)).fetchall()
+
+            with self.pool.writer() as conn:
+                if not rows:
+                    conn.execute('DELETE FROM wei_backfill WHERE table_name = ?', (table,))
+                    return converted
+
+                # Claim the batch together with converting it, so a worker
+                # migrating the same file at the same time can't add it twice
+                claimed = conn.execute(
+                    'UPDATE wei_backfill SET last_rowid = ? WHERE table_name = ? AND last_rowid = ?',
+                    (rows[-1]['row_id'], table, progress['last_rowid'])
+                ).rowcount
+                if claimed:
+                    conn.executemany(f'UPDATE {table} SET {set_clause} WHERE rowid = ?', [
+                        tuple(real_to_wei(row[old]) for old, _ in columns) + (row['row_id'],)
+                        for row in rows
+                    ])
+                    converted += len(rows)
+
+    def _insert_amount_row(self, cursor, table: str, columns: Dict):
+        """Insert a deposits/spending row, mirroring amount_eth on legacy tables"""
+        columns = dict(columns)
+        if table in self._legacy_amount_eth:
+            columns['amount_eth'] = wei_to_eth(columns['amount_wei'])
+        names = ', '.join(columns)
+        placeholders = ', '.join('?' for _ in columns)
+        cursor.execute(f'INSERT INTO {table} ({names}) VALUES ({placeholders})', tuple(columns.values()))
+
+    def record_deposit(self, agent_name: str, amount_eth: float, tx_hash: str, signature: str = None) -> Dict:
         """
         Record a deposit from an agent
 
-        In production: Verify tx_hash on-chain
+        With a deposit_address: queue it for on-chain verification; signature
+        is the sending wallet's signature of deposit_message(agent_name, tx_hash)
         In mock: Accept deposits with "0xDEPOSIT" prefix
         """
-        cursor = self.conn.cursor()
+        if self.deposit_address:
+            return self._queue_deposit(agent_name, amount_eth, tx_hash, signature)
 
         # Verify transaction (mock mode)
         verified = tx_hash.startswith('0xDEPOSIT') or tx_hash.startswith('0xPAID')
@@ -92,27 +282,34 @@ class BalanceSystem:
                 'error': 'Invalid deposit transaction. Use tx starting with 0xDEPOSIT for mock mode.'
             }
 
-        # Create or get agent balance
-        cursor.execute('''
-            INSERT INTO agent_balances (agent_name, balance_eth, total_deposited)
-            VALUES (?, ?, ?)
-            ON CONFLICT(agent_name) DO UPDATE SET
-                balance_eth = balance_eth + ?,
-                total_deposited = total_deposited + ?,
-                last_deposit_tx = ?,
-                last_deposit_time = ?
-        ''', (agent_name, amount_eth, amount_eth, amount_eth, amount_eth, tx_hash, datetime.now()))
-
-        # Record deposit
-        cursor.execute('''
-            INSERT INTO deposits (agent_name, amount_eth, tx_hash, verified)
-            VALUES (?, ?, ?, ?)
-        ''', (agent_name, amount_eth, tx_hash, verified))
-
-        self.conn.commit()
+        amount_wei = eth_to_wei(amount_eth)
+
+        with self.pool.writer() as conn:
+            cursor = conn.cursor()
+
+            # Create or get agent balance
+            cursor.execute('''
+                INSERT INTO agent_balances
+                (agent_name, balance_wei, total_deposited_wei, last_deposit_tx, last_deposit_time)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(agent_name) DO UPDATE SET
+                    balance_wei = balance_wei + excluded.balance_wei,
+                    total_deposited_wei = total_deposited_wei + excluded.total_deposited_wei,
+                    last_deposit_tx = excluded.last_deposit_tx,
+                    last_deposit_time = excluded.last_deposit_time
+                RETURNING balance_wei
+            ''', (agent_name, amount_wei, amount_wei, tx_hash, datetime.now()))
+            new_balance_wei = cursor.fetchone()['balance_wei']
+
+            # Record deposit
+            self._insert_amount_row(cursor, 'deposits', {
+                'agent_name': agent_name,
+                'amount_wei': amount_wei,
+                'tx_hash': tx_hash,
+                'verified': verified
+            })
 
-        # Get new balance
-        new_balance = self.get_balance(agent_name)
+        new_balance = wei_to_eth(new_balance_wei)
 
         logger.info(f"Deposit recorded: {agent_name} +{amount_eth} ETH, new balance: {new_balance} ETH")
 
@@ -120,57 +317,199 @@ class BalanceSystem:
             'success': True,
             'deposit_amount': amount_eth,
             'new_balance': new_balance,
+            'new_balance_wei': new_balance_wei,
             'tx_hash': tx_hash,
             'message': f'Deposited {amount_eth} ETH. New balance: {new_balance} ETH'
         }
 
-    def get_balance(self, agent_name: str) -> float:
-        """Get agent's current balance"""
-        cursor = self.conn.cursor()
+    def _queue_deposit(self, agent_name: str, amount_eth: float, tx_hash: str, signature: str = None) -> Dict:
+        """
+        Store a deposit as pending; DepositPipeline credits it once verified
+
+        The wallet recovered from the signature is stored as the sender and
+        the pipeline only credits the deposit if that wallet sent it, so
+        nobody can claim a transfer they only saw on-chain.
+        """
+        tx_hash = tx_hash.lower()
+        if len(tx_hash) != 66 or not tx_hash.startswith('0x'):
+            return {'success': False, 'error': 'Invalid deposit transaction hash'}
+
+        message = deposit_message(agent_name, tx_hash)
+        if not signature:
+            return {'success': False, 'error': f'Missing signature: sign "{message}" with the sending wallet'}
+        try:
+            sender = Account.recover_message(encode_defunct(text=message), signature=signature).lower()
+        except Exception:
+            return {'success': False, 'error': 'Invalid deposit signature'}
+
+        with self.pool.writer() as conn:
+            cursor = conn.cursor()
+            error = None
+            if cursor.execute('''
+                SELECT 1 FROM deposits
+                WHERE tx_hash = ? AND (status = 'credited' OR (status = 'pending' AND sender = ?))
+            ''', (tx_hash, sender)).fetchone():
+                error = 'Deposit transaction already submitted'
+            elif self._used_as_payment(cursor, tx_hash):
+                error = 'Transaction already used as a premium payment'
+            else:
+                self._insert_amount_row(cursor, 'deposits', {
+                    'agent_name': agent_name,
+                    'amount_wei': eth_to_wei(amount_eth),
+                    'tx_hash': tx_hash,
+                    'verified': False,
+                    'status': 'pending',
+                    'sender': sender
+                })
+
+        if error:
+            return {'success': False, 'error': error}
+
+        logger.info(f"Deposit queued for verification: {agent_name} {tx_hash}")
+
+        return {
+            'success': True,
+            'pending': True,
+            'deposit_amount': amount_eth,
+            'tx_hash': tx_hash,
+            'message': 'Deposit received. It is credited once the transaction is confirmed on-chain.'
+        }
+
+    def _used_as_payment(self, cursor, tx_hash: str) -> bool:
+        """
+        Whether a transfer was verified as a premium payment (PaymentClaims)
+
+        Payments and deposits may go to the same address; checked in the
+        deposit's write transaction, as PaymentClaims.claim checks deposits.
+        """
+        if not cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'payment_claims'"
+        ).fetchone():
+            return False
+        return cursor.execute(
+            'SELECT 1 FROM payment_claims WHERE payment_tx = ? AND verified', (tx_hash,)
+        ).fetchone() is not None
+
+    def pending_deposits(self, limit: int = 100, after_id: int = 0) -> List[Dict]:
+        """Oldest pending on-chain deposits (the verification queue)"""
+        rows = self.pool.reader().execute('''
+            SELECT id, agent_name, amount_wei, tx_hash, sender, timestamp FROM deposits
+            WHERE status = 'pending' AND id > ?
+            ORDER BY id
+            LIMIT ?
+        ''', (after_id, limit)).fetchall()
+        return [dict(row) for row in rows]
+
+    def settle_deposits(self, credits: List[Tuple[int, int]], rejections: List[Tuple[int, str]] = ()) -> int:
+        """
+        Credit verified deposits and reject failed ones in one transaction
+
+        Args:
+            credits: (deposit id, on-chain amount in wei) pairs
+            rejections: (deposit id, reason) pairs
+
+        Returns:
+            Number of deposits credited (already settled ids are skipped)
+        """
+        credited = 0
+        now = datetime.now()
+
+        with self.pool.writer() as conn:
+            cursor = conn.cursor()
+
+            for deposit_id, amount_wei in credits:
+                # The credited amount is what arrived on-chain, not what was claimed
+                row = cursor.execute('''
+                    UPDATE deposits SET status = 'credited', verified = TRUE, amount_wei = ?
+                    WHERE id = ? AND status = 'pending'
+                    RETURNING agent_name, tx_hash
+                ''', (amount_wei, deposit_id)).fetchone()
+                if row is None:
+                    continue
+                if 'deposits' in self._legacy_amount_eth:
+                    cursor.execute('UPDATE deposits SET amount_eth = ? WHERE id = ?', (wei_to_eth(amount_wei), deposit_id))
+
+                cursor.execute('''
+                    INSERT INTO agent_balances
+                    (agent_name, balance_wei, total_deposited_wei, last_deposit_tx, last_deposit_time)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(agent_name) DO UPDATE SET
+                        balance_wei = balance_wei + excluded.balance_wei,
+                        total_deposited_wei = total_deposited_wei + excluded.total_deposited_wei,
+                        last_deposit_tx = excluded.last_deposit_tx,
+                        last_deposit_time = excluded.last_deposit_time
+                ''', (row['agent_name'], amount_wei, amount_wei, row['tx_hash'], now))
+                credited += 1
+
+            cursor.executemany('''
+                UPDATE deposits SET status = 'rejected', error = ?
+                WHERE id = ? AND status = 'pending'
+            ''', [(error, deposit_id) for deposit_id, error in rejections])
+
+        if credited or rejections:
+            logger.info(f"Deposits settled: {credited} credited, {len(rejections)} rejected")
+        return credited
+
+    def get_balance_wei(self, agent_name: str) -> int:
+        """Get agent's current balance in wei"""
+        cursor = self.pool.reader().cursor()
         cursor.execute('''
-            SELECT balance_eth FROM agent_balances WHERE agent_name = ?
+            SELECT balance_wei FROM agent_balances WHERE agent_name = ?
         ''', (agent_name,))
 
         result = cursor.fetchone()
-        return result['balance_eth'] if result else 0.0
+        return result['balance_wei'] if result else 0
+
+    def get_balance(self, agent_name: str) -> float:
+        """Get agent's current balance"""
+        return wei_to_eth(self.get_balance_wei(agent_name))
 
     def deduct_balance(self, agent_name: str, amount_eth: float, service_type: str = 'premium_tier') -> Dict:
         """
         Deduct from agent's balance for a service
 
+        The balance check and the deduction are one conditional UPDATE, and
+        the spending row is written in the same transaction, so concurrent
+        requests can never both spend the same balance.
+
         Returns:
             dict with success status and new balance
         """
-        current_balance = self.get_balance(agent_name)
-
-        if current_balance < amount_eth:
+        amount_wei = eth_to_wei(amount_eth)
+
+        with self.pool.writer() as conn:
+            cursor = conn.cursor()
+
+            # Deduct balance only if it covers the amount
+            cursor.execute('''
+                UPDATE agent_balances
+                SET balance_wei = balance_wei - ?,
+                    total_spent_wei = total_spent_wei + ?
+                WHERE agent_name = ? AND balance_wei >= ?
+                RETURNING balance_wei
+            ''', (amount_wei, amount_wei, agent_name, amount_wei))
+            row = cursor.fetchone()
+
+            if row is not None:
+                # Record spending
+                self._insert_amount_row(cursor, 'spending', {
+                    'agent_name': agent_name,
+                    'amount_wei': amount_wei,
+                    'service_type': service_type
+                })
+
+        if row is None:
+            current_wei = self.get_balance_wei(agent_name)
+            current_balance = wei_to_eth(current_wei)
             return {
                 'success': False,
                 'error': f'Insufficient balance. Need {amount_eth} ETH, have {current_balance} ETH',
                 'current_balance': current_balance,
                 'required': amount_eth,
-                'shortfall': amount_eth - current_balance
+                'shortfall': wei_to_eth(amount_wei - current_wei)
             }
 
-        cursor = self.conn.cursor()
-
-        # Deduct balance
-        cursor.execute('''
-            UPDATE agent_balances
-            SET balance_eth = balance_eth - ?,
-                total_spent = total_spent + ?
-            WHERE agent_name = ?
-        ''', (amount_eth, amount_eth, agent_name))
-
-        # Record spending
-        cursor.execute('''
-            INSERT INTO spending (agent_name, amount_eth, service_type)
-            VALUES (?, ?, ?)
-        ''', (agent_name, amount_eth, service_type))
-
-        self.conn.commit()
-
-        new_balance = self.get_balance(agent_name)
+        new_balance = wei_to_eth(row['balance_wei'])
 
         logger.info(f"Balance deducted: {agent_name} -{amount_eth} ETH, remaining: {new_balance} ETH")
 
@@ -178,12 +517,13 @@ class BalanceSystem:
             'success': True,
             'deducted': amount_eth,
             'new_balance': new_balance,
+            'new_balance_wei': row['balance_wei'],
             'service_type': service_type
         }
 
     def get_balance_info(self, agent_name: str) -> Dict:
         """Get complete balance information for an agent"""
-        cursor = self.conn.cursor()
+        cursor = self.pool.reader().cursor()
 
         cursor.execute('''
             SELECT * FROM agent_balances WHERE agent_name = ?
@@ -202,13 +542,14 @@ class BalanceSystem:
 
         return {
             'agent_name': agent_name,
-            'balance_eth': result['balance_eth'],
-            'total_deposited': result['total_deposited'],
-            'total_spent': result['total_spent'],
+            'balance_eth': wei_to_eth(result['balance_wei']),
+            'balance_wei': result['balance_wei'],
+            'total_deposited': wei_to_eth(result['total_deposited_wei']),
+            'total_spent': wei_to_eth(result['total_spent_wei']),
             'last_deposit_tx': result['last_deposit_tx'],
             'last_deposit_time': result['last_deposit_time'],
-            'has_balance': result['balance_eth'] > 0,
-            'can_use_premium': result['balance_eth'] >= 0.001
+            'has_balance': result['balance_wei'] > 0,
+            'can_use_premium': result['balance_wei'] >= PREMIUM_PRICE_WEI
         }
 
 
@@ -222,7 +563,7 @@ class MockBalanceSystem(BalanceSystem):
     def init_db(self):
         pass  # No DB needed for mock
 
-    def record_deposit(self, agent_name: str, amount_eth: float, tx_hash: str) -> Dict:
+    def record_deposit(self, agent_name: str, amount_eth: float, tx_hash: str, signature: str = None) -> Dict:
         if not tx_hash.startswith('0xDEPOSIT'):
             return {'success': False, 'error': 'Use 0xDEPOSIT prefix for mock deposits'}
 
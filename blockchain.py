@@ -6,6 +6,11 @@ Handles sending testnet USDC via web3.py
 from web3 import Web3
 from eth_account import Account
 import logging
+from typing import Dict, List, Tuple
+
+from contract_metadata import ContractMetadata
+from gas_oracle import GasOracle
+from tx_pipeline import NonceManager, ReceiptTracker, is_nonce_error
 
 logger = logging.getLogger(__name__)
 
@@ -38,20 +43,42 @@ ERC20_ABI = [
         "name": "decimals",
         "outputs": [{"name": "", "type": "uint8"}],
         "type": "function"
+    },
+    {
+        "constant": True,
+        "inputs": [],
+        "name": "symbol",
+        "outputs": [{"name": "", "type": "string"}],
+        "type": "function"
     }
 ]
 
+# Attempts per send when the node rejects our nonce
+MAX_NONCE_RETRIES = 3
+
+# Never-funded recipient for the transfer gas estimate (the worst case:
+# writing a zero balance slot costs more than updating a non-zero one)
+GAS_ESTIMATE_RECIPIENT = "0xd679Cec98E8E02c621cf4Ca2b1938A9FeA470c35"
+
 
 class USDCFaucet:
     """USDC Testnet Faucet for sending to agents"""
 
-    def __init__(self, private_key: str, rpc_url: str):
+    def __init__(
+        self,
+        private_key: str,
+        rpc_url: str,
+        receipt_poll_interval: float = 2.0,
+        gas_refresh_interval: float = 12.0
+    ):
         """
         Initialize faucet with wallet private key and RPC URL
 
         Args:
             private_key: Faucet wallet private key (with testnet USDC)
             rpc_url: Sepolia RPC endpoint
+            receipt_poll_interval: Seconds between background receipt checks
+            gas_refresh_interval: Seconds between background fee refreshes
         """
         self.w3 = Web3(Web3.HTTPProvider(rpc_url))
 
@@ -68,16 +95,35 @@ class USDCFaucet:
             abi=ERC20_ABI
         )
 
+        # Decimals, symbol, chain id: read once, used by every send
+        self.metadata = ContractMetadata(self.w3, self.usdc_contract)
+
+        # Nonces come from memory; receipts are confirmed in the background
+        self.nonce_manager = NonceManager(self.w3, self.address) if self.address else None
+        self.receipt_tracker = ReceiptTracker(
+            self.w3,
+            poll_interval=receipt_poll_interval,
+            on_dropped=lambda entry: self.nonce_manager.resync()
+        )
+
+        # Fees come from memory, refreshed in the background
+        self.gas_oracle = GasOracle(self.w3, refresh_interval=gas_refresh_interval)
+
         logger.info(f"Faucet initialized: {self.address}")
         logger.info(f"Connected to: {rpc_url}")
 
-    def send_usdc(self, to_address: str, amount: float) -> str:
+    def send_usdc(self, to_address: str, amount: float, wait: bool = False, fee_strategy: str = 'cheap') -> str:
         """
         Send USDC to specified address
 
+        The transaction is submitted and the hash returned straight away;
+        the receipt tracker confirms it in the background.
+
         Args:
             to_address: Recipient Ethereum address
             amount: Amount in USDC (e.g., 10 for 10 USDC)
+            wait: Block until the receipt arrives (old behaviour)
+            fee_strategy: Gas oracle strategy ('cheap' for free tier, 'fast' for premium)
 
         Returns:
             Transaction hash
@@ -85,50 +131,121 @@ class USDCFaucet:
         if not self.account:
             raise Exception("Faucet account not configured")
 
-        # Convert amount to wei (USDC has 6 decimals)
-        decimals = self.usdc_contract.functions.decimals().call()
-        amount_wei = int(amount * (10 ** decimals))
+        # Convert amount to base units (USDC has 6 decimals)
+        amount_wei = self.metadata.to_base_units(amount)
 
         # Prepare transaction
         to_checksum = Web3.to_checksum_address(to_address)
 
-        # Build transaction
-        tx = self.usdc_contract.functions.transfer(
-            to_checksum,
-            amount_wei
-        ).build_transaction({
-            'from': self.address,
-            'nonce': self.w3.eth.get_transaction_count(self.address),
-            'gas': 100000,  # Sufficient for ERC20 transfer
-            'gasPrice': self.w3.eth.gas_price,
-        })
+        tx_hash = self._submit_transfer(to_checksum, amount_wei, self.gas_oracle.fees(fee_strategy))
 
-        # Sign transaction
-        signed_tx = self.account.sign_transaction(tx)
+        if wait:
+            # Wait for receipt (with timeout)
+            receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=120)
 
-        # Send transaction
-        tx_hash = self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
+            if receipt['status'] != 1:
+                raise Exception(f"Transaction failed: {tx_hash}")
 
-        # Wait for receipt (with timeout)
-        receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=120)
+        logger.info(f"Sent {amount} USDC to {to_address}: {tx_hash}")
 
-        if receipt['status'] != 1:
-            raise Exception(f"Transaction failed: {tx_hash.hex()}")
+        return tx_hash
 
-        logger.info(f"Sent {amount} USDC to {to_address}: {tx_hash.hex()}")
+    def send_batch(self, transfers: List[Tuple[str, float]], fee_strategy: str = 'cheap') -> List[Dict]:
+        """
+        Send several USDC transfers as one pipelined burst
 
-        return tx_hash.hex()
+        The whole batch is priced with one set of fees and the transfers go
+        out back to back on consecutive nonces.
+
+        Args:
+            transfers: List of (to_address, amount) pairs
+            fee_strategy: Gas oracle strategy for every transfer in the batch
+
+        Returns:
+            One dict per transfer with 'tx_hash' or 'error'
+        """
+        if not self.account:
+            raise Exception("Faucet account not configured")
+
+        fees = self.gas_oracle.fees(fee_strategy)
+
+        results = []
+        for to_address, amount in transfers:
+            try:
+                tx_hash = self._submit_transfer(
+                    Web3.to_checksum_address(to_address),
+                    self.metadata.to_base_units(amount),
+                    fees
+                )
+                results.append({'tx_hash': tx_hash, 'error': None})
+            except Exception as e:
+                logger.error(f"Batch transfer to {to_address} failed: {e}")
+                results.append({'tx_hash': None, 'error': str(e)})
+
+        logger.info(f"Sent batch of {len(transfers)} transfers ({sum(1 for r in results if r['tx_hash'])} submitted)")
+
+        return results
+
+    def _submit_transfer(self, to_checksum: str, amount_wei: int, fees: Dict[str, int]) -> str:
+        """Sign and submit one ERC20 transfer, retrying on nonce errors"""
+        gas_limit = self._transfer_gas_limit()
+
+        for attempt in range(MAX_NONCE_RETRIES):
+            nonce = self.nonce_manager.next_nonce()
+
+            # Build transaction (calldata encoded directly, chain id cached)
+            tx = {
+                'to': self.metadata.address,
+                'data': self.metadata.transfer_data(to_checksum, amount_wei),
+                'value': 0,
+                'chainId': self.metadata.chain_id,
+                'nonce': nonce,
+                'gas': gas_limit,
+                **fees,
+            }
+            if 'maxFeePerGas' in fees:
+                tx['type'] = 2
+
+            # Sign transaction (eth-account < 0.13 names it rawTransaction)
+            signed_tx = self.account.sign_transaction(tx)
+            raw_tx = getattr(signed_tx, 'raw_transaction', None) or signed_tx.rawTransaction
+
+            # Send transaction
+            try:
+                tx_hash = self.w3.eth.send_raw_transaction(raw_tx).hex()
+                break
+            except Exception as e:
+                # Our nonce view is stale either way; retry only on nonce errors
+                self.nonce_manager.resync()
+                if is_nonce_error(e) and attempt < MAX_NONCE_RETRIES - 1:
+                    logger.warning(f"Nonce {nonce} rejected ({e}), retrying")
+                    continue
+                raise
+
+        self.receipt_tracker.track(tx_hash, nonce=nonce)
+
+        return tx_hash
+
+    def _transfer_gas_limit(self) -> int:
+        """Gas limit for an ERC20 transfer, estimated once and cached"""
+        return self.gas_oracle.gas_limit('erc20_transfer', lambda: {
+            'from': self.address,
+            'to': self.metadata.address,
+            'data': self.metadata.transfer_data(GAS_ESTIMATE_RECIPIENT, 1)
+        })
+
+    def get_transaction_status(self, tx_hash: str) -> dict:
+        """Get background confirmation state of a payout transaction"""
+        return self.receipt_tracker.status(tx_hash) or {'tx_hash': tx_hash, 'status': 'unknown'}
 
     def get_balance(self) -> float:
         """Get faucet USDC balance"""
         if not self.address:
             return 0.0
 
-        decimals = self.usdc_contract.functions.decimals().call()
         balance_wei = self.usdc_contract.functions.balanceOf(self.address).call()
-        balance = balance_wei / (10 ** decimals)
 
-        return balance
+        return self.metadata.from_base_units(balance_wei)
 
     def is_valid_address(self, address: str) -> bool:
         """Check if address is valid Ethereum address"""
@@ -150,7 +267,7 @@ class MockUSDCFaucet(USDCFaucet):
         self.address = "0x0000000000000000000000000000000000000000"
         logger.info("Mock faucet initialized (for testing)")
 
-    def send_usdc(self, to_address: str, amount: float) -> str:
+    def send_usdc(self, to_address: str, amount: float, wait: bool = False, fee_strategy: str = 'cheap') -> str:
         """Mock USDC send - returns fake tx hash"""
         import hashlib
         import time
@@ -163,6 +280,15 @@ class MockUSDCFaucet(USDCFaucet):
 
         return tx_hash
 
+    def send_batch(self, transfers: List[Tuple[str, float]], fee_strategy: str = 'cheap') -> List[Dict]:
+        """Mock batch send - one fake tx hash per transfer"""
+        return [{'tx_hash': self.send_usdc(to_address, amount), 'error': None}
+                for to_address, amount in transfers]
+
+    def get_transaction_status(self, tx_hash: str) -> dict:
+        """Mock status - every mock transaction is confirmed instantly"""
+        return {'tx_hash': tx_hash, 'status': 'confirmed'}
+
     def get_balance(self) -> float:
         """Mock balance - always return 10000"""
         return 10000.0
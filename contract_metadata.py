@@ -0,0 +1,66 @@
+"""
+Contract Metadata Module
+Token facts that never change, read once, plus direct ERC20 calldata encoding
+"""
+
+import logging
+from decimal import Decimal
+
+from eth_utils import function_signature_to_4byte_selector
+from web3 import Web3
+
+logger = logging.getLogger(__name__)
+
+TRANSFER_SELECTOR = function_signature_to_4byte_selector('transfer(address,uint256)')
+
+
+def encode_transfer(to_checksum: str, amount_wei: int, selector: bytes = TRANSFER_SELECTOR) -> bytes:
+    """ABI-encode transfer(address,uint256) calldata without the contract machinery"""
+    if not 0 <= amount_wei < 2 ** 256:
+        raise ValueError(f"Amount out of uint256 range: {amount_wei}")
+    return (
+        selector
+        + bytes(12) + bytes.fromhex(to_checksum[2:])
+        + amount_wei.to_bytes(32, 'big')
+    )
+
+
+class ContractMetadata:
+    """
+    Immutable facts about the faucet token, fetched once at construction
+
+    Holds decimals, symbol, the checksummed token address, the chain id and
+    the transfer selector, so sends and balance reads need no extra round
+    trips and transfer calldata can be built with plain byte concatenation.
+    """
+
+    def __init__(self, w3: Web3, contract):
+        """
+        Args:
+            w3: Connected Web3 instance
+            contract: web3 contract for the token (ERC20 ABI incl. symbol)
+        """
+        self.address = Web3.to_checksum_address(contract.address)
+        self.decimals = contract.functions.decimals().call()
+        try:
+            self.symbol = contract.functions.symbol().call()
+        except Exception as e:
+            # symbol() is optional in ERC20
+            logger.warning(f"Token symbol unavailable: {e}")
+            self.symbol = None
+        self.chain_id = w3.eth.chain_id
+        self.transfer_selector = TRANSFER_SELECTOR
+
+        logger.info(f"Token metadata: {self.symbol} ({self.decimals} decimals) at {self.address} on chain {self.chain_id}")
+
+    def to_base_units(self, amount: float) -> int:
+        """Convert a token amount (e.g. 10 USDC) to base units"""
+        return int(Decimal(str(amount)).scaleb(self.decimals))
+
+    def from_base_units(self, amount_wei: int) -> float:
+        """Convert base units to a token amount"""
+        return float(Decimal(amount_wei).scaleb(-self.decimals))
+
+    def transfer_data(self, to_checksum: str, amount_wei: int) -> bytes:
+        """Calldata for transfer(to, amount)"""
+        return encode_transfer(to_checksum, amount_wei, self.transfer_selector)
@@ -0,0 +1,94 @@
+"""
+Cooldown Index
+In-memory last-successful-request time per agent, evicted by a timer wheel
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class CooldownIndex:
+    """
+    Agent -> last successful request time, answered in O(1)
+
+    Every entry lives for `retention_seconds` after its last request. Expiry
+    is tracked on a timer wheel of `slot_seconds` buckets: each tick only
+    looks at the bucket that comes due, so eviction cost is proportional to
+    the number of entries expiring, not to the number of agents.
+    """
+
+    def __init__(
+        self,
+        retention_seconds: float = 24 * 3600,
+        slot_seconds: float = 60,
+        clock: Callable[[], float] = time.time
+    ):
+        self.retention_seconds = retention_seconds
+        self.slot_seconds = slot_seconds
+        self.clock = clock
+
+        # One extra slot so a full retention window never wraps onto itself
+        self._num_slots = int(-(-retention_seconds // slot_seconds)) + 1
+        self._wheel = [set() for _ in range(self._num_slots)]
+        self._last: Dict[str, Tuple[float, str]] = {}
+        self._tick = self._tick_for(clock())
+        self._lock = threading.Lock()
+
+    def _tick_for(self, epoch: float) -> int:
+        return int(epoch // self.slot_seconds)
+
+    def record(self, agent_name: str, epoch: float, timestamp: str):
+        """Remember a successful request (older than the current entry is ignored)"""
+        with self._lock:
+            now = self.clock()
+            self._advance(now)
+            epoch = min(epoch, now)  # Future timestamps would outlive the wheel
+
+            current = self._last.get(agent_name)
+            if current and current[0] >= epoch:
+                return
+
+            expire_tick = self._tick_for(epoch + self.retention_seconds)
+            if expire_tick <= self._tick:
+                return  # Already outside the retention window
+
+            self._last[agent_name] = (epoch, timestamp)
+            self._wheel[expire_tick % self._num_slots].add(agent_name)
+
+    def last_request(self, agent_name: str) -> Optional[Tuple[float, str]]:
+        """Get (epoch, timestamp string) of the agent's last request, if retained"""
+        with self._lock:
+            self._advance(self.clock())
+            return self._last.get(agent_name)
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._advance(self.clock())
+            return len(self._last)
+
+    def _advance(self, now: float):
+        """Evict every entry whose slot came due since the last call"""
+        tick = self._tick_for(now)
+        if tick <= self._tick:
+            return
+
+        # After a long idle gap every slot is due exactly once
+        first = max(self._tick + 1, tick - self._num_slots + 1)
+        evicted = 0
+        for t in range(first, tick + 1):
+            bucket = self._wheel[t % self._num_slots]
+            for agent_name in bucket:
+                entry = self._last.get(agent_name)
+                # Refreshed entries were re-filed in a later slot
+                if entry and self._tick_for(entry[0] + self.retention_seconds) <= tick:
+                    del self._last[agent_name]
+                    evicted += 1
+            bucket.clear()
+
+        self._tick = tick
+        if evicted:
+            logger.debug(f"Cooldown index evicted {evicted} agents")
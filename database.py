@@ -3,32 +3,137 @@ Database Module - SQLite for tracking faucet usage
 Records all requests and enables analytics
 """
 
-import sqlite3
+import base64
 import logging
-from datetime import datetime, timedelta
-from typing import List, Dict
+import atexit
+import queue
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, List, Dict, Optional, Tuple
 import json
 
+from cooldown_index import CooldownIndex
+from db_pool import get_pool
+from migrations import apply_migrations
+from use_case_classifier import USE_CASE_CATEGORIES, classifier
+
 logger = logging.getLogger(__name__)
 
 DB_FILE = 'faucet.db'
 
+# Same format SQLite uses for CURRENT_TIMESTAMP (UTC)
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+INSERT_REQUEST_SQL = '''
+    INSERT INTO requests
+    (agent_name, wallet_address, reason, amount, tx_hash, moltbook_proof, success, tier, payment_tx, payment_amount, timestamp, use_case)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+# Index changes to the requests table, applied once per database (see migrations.py)
+REQUESTS_MIGRATIONS = [
+    ('0001_requests_keyset_indexes', [
+        'CREATE INDEX IF NOT EXISTS idx_agent_timestamp ON requests(agent_name, timestamp)',
+        'CREATE INDEX IF NOT EXISTS idx_wallet_timestamp ON requests(wallet_address, timestamp)',
+        'CREATE INDEX IF NOT EXISTS idx_tier_timestamp ON requests(tier, timestamp)',
+    ]),
+    # Cooldown and recent-request reads only ever look at successful rows
+    ('0002_requests_success_indexes', [
+        'CREATE INDEX IF NOT EXISTS idx_success_agent_timestamp ON requests(agent_name, timestamp) WHERE success = TRUE',
+        'CREATE INDEX IF NOT EXISTS idx_success_timestamp ON requests(timestamp) WHERE success = TRUE',
+    ]),
+    # A prefix of idx_agent_timestamp
+    ('0003_drop_agent_name_index', [
+        'DROP INDEX IF EXISTS idx_agent_name',
+    ]),
+]
+
+# Columns returned by the requests API
+REQUEST_API_COLUMNS = ('id', 'agent_name', 'wallet_address', 'reason', 'amount', 'tx_hash',
+                       'tier', 'payment_tx', 'payment_amount', 'timestamp', 'success', 'use_case')
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(timestamp: str, request_id: int) -> str:
+    """Opaque page cursor for the (timestamp, id) keyset"""
+    return base64.urlsafe_b64encode(json.dumps([timestamp, request_id]).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    """Inverse of encode_cursor; raises ValueError for a malformed cursor"""
+    try:
+        timestamp, request_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if not isinstance(timestamp, str) or not isinstance(request_id, int):
+        raise ValueError('Invalid cursor')
+    return timestamp, request_id
+
+
+# Marks the end of the write-behind queue on shutdown
+_STOP = object()
+
 
 class Database:
     """SQLite database for faucet requests and analytics"""
 
-    def __init__(self, db_file: str = DB_FILE):
-        """Initialize database connection"""
+    def __init__(
+        self,
+        db_file: str = DB_FILE,
+        write_behind: bool = False,
+        flush_rows: int = 100,
+        flush_interval_ms: int = 50,
+        max_pending_rows: int = 1000,
+        cooldown_retention_hours: int = 24
+    ):
+        """
+        Initialize database connection
+
+        Args:
+            db_file: SQLite database path
+            write_behind: Queue record_request rows and commit them in groups
+                from a dedicated writer thread instead of one commit per call
+            flush_rows: Commit a group once this many rows are queued
+            flush_interval_ms: Commit a group at least this often
+            max_pending_rows: Queue bound; record_request blocks when full.
+                A crash loses at most this many rows plus one group in flight.
+            cooldown_retention_hours: How long the in-memory cooldown index
+                keeps an agent; checks it can't answer fall back to SQL
+        """
         self.db_file = db_file
-        self.conn = None
+        self.pool = None
+
+        self.write_behind = write_behind
+        self.flush_rows = flush_rows
+        self.flush_interval_ms = flush_interval_ms
+        self.max_pending_rows = max_pending_rows
+        self._write_queue = queue.Queue(maxsize=max_pending_rows)
+        self._writer = None
+
+        self.cooldown_index = CooldownIndex(retention_seconds=cooldown_retention_hours * 3600)
 
     def init_db(self):
         """Create database tables if they don't exist"""
-        self.conn = sqlite3.connect(self.db_file, check_same_thread=False)
-        self.conn.row_factory = sqlite3.Row  # Enable column access by name
+        self.pool = get_pool(self.db_file)
+
+        with self.pool.writer() as conn:
+            self._create_tables(conn.cursor())
+        apply_migrations(self.pool, REQUESTS_MIGRATIONS)
+
+        self._load_cooldown_index()
 
-        cursor = self.conn.cursor()
+        # Categorise rows written before the use_case column existed
+        if self.pool.reader().execute('SELECT 1 FROM requests WHERE use_case IS NULL LIMIT 1').fetchone():
+            threading.Thread(target=self.backfill_use_cases, name='use-case-backfill', daemon=True).start()
+
+        logger.info(f"Database initialized: {self.db_file}")
 
+        if self.write_behind:
+            self._start_writer()
+
+    def _create_tables(self, cursor):
+        """Create tables and indexes (inside the caller's write transaction)"""
         # Create requests table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS requests (
@@ -43,23 +148,94 @@ class Database:
                 payment_tx TEXT,
                 payment_amount REAL,
                 timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                success BOOLEAN DEFAULT TRUE
+                success BOOLEAN DEFAULT TRUE,
+                use_case TEXT
             )
         ''')
 
-        # Create index for faster lookups
-        cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_agent_name
-            ON requests(agent_name)
-        ''')
+        # Older databases: category column added later, filled by backfill_use_cases
+        cursor.execute('PRAGMA table_info(requests)')
+        if 'use_case' not in [col['name'] for col in cursor.fetchall()]:
+            cursor.execute('ALTER TABLE requests ADD COLUMN use_case TEXT')
 
+        # Create index for faster lookups (the rest are in REQUESTS_MIGRATIONS;
+        # rowid (id) is the implicit last column of every index, so each one is
+        # already ordered by (column, timestamp, id) for keyset pages)
         cursor.execute('''
             CREATE INDEX IF NOT EXISTS idx_timestamp
             ON requests(timestamp)
         ''')
 
-        self.conn.commit()
-        logger.info(f"Database initialized: {self.db_file}")
+        # Materialised dashboard counters, maintained on insert
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS stats_counters (
+                name TEXT PRIMARY KEY,
+                value REAL NOT NULL DEFAULT 0
+            )
+        ''')
+
+        # Exact set of agents seen, for the unique_agents counter
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS stats_agents (
+                agent_name TEXT PRIMARY KEY
+            ) WITHOUT ROWID
+        ''')
+
+        cursor.execute("SELECT 1 FROM stats_counters WHERE name = 'total_requests'")
+        if cursor.fetchone() is None:
+            self._rebuild_stats(cursor)
+
+    def _rebuild_stats(self, cursor):
+        """One-time backfill of stats counters from an existing requests table"""
+        cursor.execute('DELETE FROM stats_counters')
+        cursor.execute('DELETE FROM stats_agents')
+        cursor.execute("INSERT INTO stats_counters (name, value) VALUES ('total_requests', 0)")
+
+        # Stream rows so a large table is never held in memory at once
+        read_cursor = cursor.connection.cursor()
+        read_cursor.execute('SELECT agent_name, reason, amount, success, use_case FROM requests')
+        rebuilt = 0
+        while True:
+            rows = read_cursor.fetchmany(1000)
+            if not rows:
+                break
+            self._apply_stats(cursor, [
+                (r['agent_name'], r['use_case'] or classifier.classify(r['reason']), r['amount'], r['success'])
+                for r in rows
+            ])
+            rebuilt += len(rows)
+
+        logger.info(f"Stats counters rebuilt from {rebuilt} requests")
+
+    def _apply_stats(self, cursor, rows: List[tuple]):
+        """
+        Add inserted rows to the stats counters (inside the insert transaction)
+
+        Args:
+            rows: (agent_name, use_case, amount, success) tuples
+        """
+        # stats_version moves on every committed batch (cache key for rendered pages)
+        deltas = {'total_requests': 0, 'successful_requests': 0, 'failed_requests': 0, 'total_usdc': 0,
+                  'stats_version': 1}
+
+        for agent_name, use_case, amount, success in rows:
+            deltas['total_requests'] += 1
+            if success:
+                deltas['successful_requests'] += 1
+                deltas['total_usdc'] += amount
+                key = f"use_case:{use_case}"
+                deltas[key] = deltas.get(key, 0) + 1
+            else:
+                deltas['failed_requests'] += 1
+
+            cursor.execute('INSERT OR IGNORE INTO stats_agents (agent_name) VALUES (?)', (agent_name,))
+            if cursor.rowcount == 1:
+                deltas['unique_agents'] = deltas.get('unique_agents', 0) + 1
+
+        cursor.executemany('''
+            INSERT INTO stats_counters (name, value) VALUES (?, ?)
+            ON CONFLICT(name) DO UPDATE SET value = value + excluded.value
+        ''', list(deltas.items()))
 
     def record_request(
         self,
@@ -75,35 +251,137 @@ class Database:
         payment_amount: float = None
     ):
         """Record a faucet request"""
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            INSERT INTO requests
-            (agent_name, wallet_address, reason, amount, tx_hash, moltbook_proof, success, tier, payment_tx, payment_amount)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (agent_name, wallet_address, reason, amount, tx_hash, moltbook_proof, success, tier, payment_tx, payment_amount))
+        # Timestamp captured now rather than at commit (write-behind)
+        now = time.time()
+        timestamp = datetime.utcfromtimestamp(now).strftime(TIMESTAMP_FORMAT)
+        use_case = classifier.classify(reason)
+        row = (agent_name, wallet_address, reason, amount, tx_hash, moltbook_proof,
+               success, tier, payment_tx, payment_amount, timestamp, use_case)
+
+        # Index first so the cooldown also covers rows still in the write queue
+        if success:
+            self.cooldown_index.record(agent_name, now, timestamp)
+
+        if self.write_behind:
+            self._write_queue.put(row)
+            logger.info(f"Queued request [{tier}]: {agent_name} -> {amount} USDC")
+            return
+
+        with self.pool.writer() as conn:
+            conn.execute(INSERT_REQUEST_SQL, row)
+            self._apply_stats(conn.cursor(), [(agent_name, use_case, amount, success)])
 
-        self.conn.commit()
         logger.info(f"Recorded request [{tier}]: {agent_name} -> {amount} USDC")
 
+    def flush(self):
+        """Block until every queued write-behind row is committed"""
+        if self._writer:
+            self._write_queue.join()
+
+    def close(self):
+        """Flush queued rows and stop the writer thread (safe to call twice)"""
+        if self._writer and self._writer.is_alive():
+            self._write_queue.put(_STOP)
+            self._writer.join()
+        self._writer = None
+
+    def _start_writer(self):
+        if self._writer and self._writer.is_alive():
+            return
+        self._writer = threading.Thread(target=self._writer_loop, name='db-writer', daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+        logger.info(f"Write-behind enabled: {self.flush_rows} rows / {self.flush_interval_ms}ms groups")
+
+    def _writer_loop(self):
+        """Drain the write queue, committing one transaction per group"""
+        stopping = False
+        while not stopping:
+            rows = [self._write_queue.get()]
+            deadline = time.monotonic() + self.flush_interval_ms / 1000
+
+            while len(rows) < self.flush_rows and rows[-1] is not _STOP:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    rows.append(self._write_queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            if rows[-1] is _STOP:
+                stopping = True
+            batch = [row for row in rows if row is not _STOP]
+
+            try:
+                if batch:
+                    with self.pool.writer() as conn:
+                        conn.executemany(INSERT_REQUEST_SQL, batch)
+                        self._apply_stats(conn.cursor(), [(r[0], r[11], r[3], r[6]) for r in batch])
+            except Exception as e:
+                logger.error(f"Write-behind commit of {len(batch)} rows failed: {e}")
+            finally:
+                for _ in rows:
+                    self._write_queue.task_done()
+
+    def _load_cooldown_index(self):
+        """Load each agent's last successful request inside the retention window"""
+        retention = self.cooldown_index.retention_seconds
+        threshold = datetime.utcfromtimestamp(time.time() - retention).strftime(TIMESTAMP_FORMAT)
+
+        cursor = self.pool.reader().cursor()
+        cursor.execute('''
+            SELECT agent_name, MAX(timestamp) as last_timestamp
+            FROM requests
+            WHERE success = TRUE AND timestamp > ?
+            GROUP BY agent_name
+        ''', (threshold,))
+
+        loaded = 0
+        for row in cursor.fetchall():
+            last = datetime.fromisoformat(str(row['last_timestamp']))
+            epoch = last.replace(tzinfo=timezone.utc).timestamp()
+            self.cooldown_index.record(row['agent_name'], epoch, row['last_timestamp'])
+            loaded += 1
+
+        logger.info(f"Cooldown index loaded: {loaded} agents")
+
     def is_in_cooldown(self, agent_name: str, cooldown_hours: int) -> bool:
-        """Check if agent is in cooldown period"""
-        cursor = self.conn.cursor()
+        """
+        Check if agent is in cooldown period
 
-        # Calculate cooldown threshold
-        threshold = datetime.now() - timedelta(hours=cooldown_hours)
+        A recent entry in the cooldown index answers at once. A miss is
+        checked in SQLite, since another worker sharing the database may
+        have served the agent since this process last saw it.
+        """
+        cooldown_seconds = cooldown_hours * 3600
+        entry = self.cooldown_index.last_request(agent_name)
+        if entry is not None and entry[0] > time.time() - cooldown_seconds:
+            return True
 
-        cursor.execute('''
-            SELECT COUNT(*) as count
+        # Calculate cooldown threshold (timestamps are stored in UTC)
+        threshold = (datetime.utcnow() - timedelta(hours=cooldown_hours)).strftime(TIMESTAMP_FORMAT)
+
+        row = self.pool.reader().execute('''
+            SELECT MAX(timestamp) AS last_timestamp
             FROM requests
             WHERE agent_name = ? AND timestamp > ? AND success = TRUE
-        ''', (agent_name, threshold))
+        ''', (agent_name, threshold)).fetchone()
+        if row['last_timestamp'] is None:
+            return False
 
-        result = cursor.fetchone()
-        return result['count'] > 0
+        # Keep the other worker's request, so repeat checks stay in memory
+        last = datetime.fromisoformat(str(row['last_timestamp']))
+        self.cooldown_index.record(agent_name, last.replace(tzinfo=timezone.utc).timestamp(), row['last_timestamp'])
+        return True
 
     def get_last_request_time(self, agent_name: str) -> str:
         """Get timestamp of last request from agent"""
-        cursor = self.conn.cursor()
+        entry = self.cooldown_index.last_request(agent_name)
+        if entry:
+            return entry[1]
+
+        cursor = self.pool.reader().cursor()
 
         cursor.execute('''
             SELECT timestamp
@@ -116,22 +394,26 @@ class Database:
         result = cursor.fetchone()
         return result['timestamp'] if result else "Never"
 
-    def get_stats(self) -> Dict:
-        """Get basic statistics"""
-        cursor = self.conn.cursor()
+    def _read_counters(self) -> Dict[str, float]:
+        cursor = self.pool.reader().cursor()
+        cursor.execute('SELECT name, value FROM stats_counters')
+        return {row['name']: row['value'] for row in cursor.fetchall()}
 
-        # Total requests
-        cursor.execute('SELECT COUNT(*) as count FROM requests')
-        total = cursor.fetchone()['count']
+    def stats_version(self) -> int:
+        """Counter bumped by every committed insert (one primary-key read)"""
+        row = self.pool.reader().execute(
+            "SELECT value FROM stats_counters WHERE name = 'stats_version'"
+        ).fetchone()
+        return int(row['value']) if row else 0
 
-        # Total USDC sent
-        cursor.execute('SELECT SUM(amount) as total FROM requests WHERE success = TRUE')
-        result = cursor.fetchone()
-        total_usdc = result['total'] if result['total'] else 0
+    def get_stats(self, counters: Dict[str, float] = None) -> Dict:
+        """Get basic statistics (from the materialised counters)"""
+        if counters is None:
+            counters = self._read_counters()
 
-        # Success rate
-        cursor.execute('SELECT COUNT(*) as count FROM requests WHERE success = TRUE')
-        successful = cursor.fetchone()['count']
+        total = int(counters.get('total_requests', 0))
+        successful = int(counters.get('successful_requests', 0))
+        total_usdc = counters.get('total_usdc') or 0
 
         success_rate = (successful / total * 100) if total > 0 else 0
 
@@ -143,39 +425,29 @@ class Database:
 
     def get_detailed_stats(self) -> Dict:
         """Get detailed statistics for dashboard"""
-        cursor = self.conn.cursor()
+        counters = self._read_counters()
 
         # Basic stats
-        stats = self.get_stats()
+        stats = self.get_stats(counters)
 
-        # Successful vs failed
-        cursor.execute('SELECT COUNT(*) as count FROM requests WHERE success = TRUE')
-        successful = cursor.fetchone()['count']
+        successful = int(counters.get('successful_requests', 0))
 
-        cursor.execute('SELECT COUNT(*) as count FROM requests WHERE success = FALSE')
-        failed = cursor.fetchone()['count']
-
-        # Unique agents
-        cursor.execute('SELECT COUNT(DISTINCT agent_name) as count FROM requests')
-        unique_agents = cursor.fetchone()['count']
-
-        # Use cases (categorize reasons)
-        cursor.execute('SELECT reason FROM requests WHERE success = TRUE')
-        reasons = cursor.fetchall()
-
-        use_cases = self._categorize_use_cases([r['reason'] for r in reasons])
+        use_case_counts = {
+            category: int(counters.get(f'use_case:{category}', 0))
+            for category in USE_CASE_CATEGORIES
+        }
 
         return {
             **stats,
             'successful_requests': successful,
-            'failed_requests': failed,
-            'unique_agents': unique_agents,
-            'use_cases': use_cases
+            'failed_requests': int(counters.get('failed_requests', 0)),
+            'unique_agents': int(counters.get('unique_agents', 0)),
+            'use_cases': self._format_use_cases(use_case_counts, successful)
         }
 
     def get_recent_requests(self, limit: int = 50) -> List[Dict]:
         """Get recent requests for display"""
-        cursor = self.conn.cursor()
+        cursor = self.pool.reader().cursor()
 
         cursor.execute('''
             SELECT agent_name, wallet_address, reason, amount, tx_hash, timestamp
@@ -189,6 +461,78 @@ class Database:
 
         return [dict(row) for row in results]
 
+    def get_requests_page(
+        self,
+        limit: int = 50,
+        cursor: str = None,
+        agent_name: str = None,
+        tier: str = None,
+        wallet_address: str = None,
+        since: str = None,
+        until: str = None
+    ) -> Tuple[List[Dict], Optional[str]]:
+        """
+        One page of requests, newest first, with keyset pagination
+
+        Pages continue from the (timestamp, id) of the previous page's last
+        row instead of an OFFSET, so page 1000 costs the same index seek as
+        page 1.
+
+        Args:
+            limit: Rows per page (capped at MAX_PAGE_SIZE)
+            cursor: next_cursor of the previous page
+            agent_name, tier, wallet_address: Exact-match filters
+            since: Earliest timestamp (inclusive, TIMESTAMP_FORMAT)
+            until: Latest timestamp (exclusive, TIMESTAMP_FORMAT)
+
+        Returns:
+            (rows, next_cursor) - next_cursor is None on the last page
+
+        Raises:
+            ValueError: malformed cursor
+        """
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        clauses, params = [], []
+
+        for column, value in (('agent_name', agent_name), ('tier', tier), ('wallet_address', wallet_address)):
+            if value is not None:
+                clauses.append(f'{column} = ?')
+                params.append(value)
+        if since is not None:
+            clauses.append('timestamp >= ?')
+            params.append(since)
+        if until is not None:
+            clauses.append('timestamp < ?')
+            params.append(until)
+        if cursor is not None:
+            clauses.append('(timestamp, id) < (?, ?)')
+            params.extend(decode_cursor(cursor))
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        rows = self.pool.reader().execute(f'''
+            SELECT {', '.join(REQUEST_API_COLUMNS)} FROM requests
+            {where}
+            ORDER BY timestamp DESC, id DESC
+            LIMIT ?
+        ''', params + [limit + 1]).fetchall()
+
+        page = [dict(row) for row in rows[:limit]]
+        for row in page:
+            row['success'] = bool(row['success'])
+
+        next_cursor = None
+        if len(rows) > limit:
+            next_cursor = encode_cursor(page[-1]['timestamp'], page[-1]['id'])
+        return page, next_cursor
+
+    def iter_requests(self, batch_size: int = MAX_PAGE_SIZE, cursor: str = None, **filters) -> Iterator[Dict]:
+        """Every request matching the filters (after `cursor`), newest first, page by page"""
+        while True:
+            page, cursor = self.get_requests_page(limit=batch_size, cursor=cursor, **filters)
+            yield from page
+            if cursor is None:
+                return
+
     def _categorize_use_cases(self, reasons: List[str]) -> List[Dict]:
         """
         Categorize request reasons into use cases
@@ -199,42 +543,57 @@ class Database:
         Returns:
             List of use case categories with counts
         """
-        categories = {
-            'Testing': 0,
-            'Payment': 0,
-            'Smart Contract': 0,
-            'Agent-to-Agent': 0,
-            'Hackathon': 0,
-            'Other': 0
-        }
-
-        keywords = {
-            'Testing': ['test', 'testing', 'try', 'experiment'],
-            'Payment': ['payment', 'pay', 'transfer', 'send'],
-            'Smart Contract': ['contract', 'deploy', 'smart contract'],
-            'Agent-to-Agent': ['agent', 'a2a', 'agent-to-agent'],
-            'Hackathon': ['hackathon', 'usdc', 'competition', 'project']
-        }
+        categories = {category: 0 for category in USE_CASE_CATEGORIES}
 
         for reason in reasons:
-            if not reason:
-                categories['Other'] += 1
-                continue
+            categories[self._classify_use_case(reason)] += 1
 
-            reason_lower = reason.lower()
-            categorized = False
+        return self._format_use_cases(categories, len(reasons))
 
-            for category, kws in keywords.items():
-                if any(kw in reason_lower for kw in kws):
-                    categories[category] += 1
-                    categorized = True
-                    break
+    def _classify_use_case(self, reason: str) -> str:
+        """Get the use case category for one reason string"""
+        return classifier.classify(reason)
 
-            if not categorized:
-                categories['Other'] += 1
+    def backfill_use_cases(self, batch_size: int = 500) -> int:
+        """
+        Fill the use_case column for rows that predate it
+
+        Walks the table in id order, one short write transaction per batch,
+        so request inserts are never blocked for long.
 
-        # Convert to list with percentages
-        total = len(reasons) if reasons else 1
+        Returns:
+            Number of rows categorised
+        """
+        last_id = 0
+        updated = 0
+
+        while True:
+            cursor = self.pool.reader().cursor()
+            cursor.execute('''
+                SELECT id, reason FROM requests
+                WHERE id > ? AND use_case IS NULL
+                ORDER BY id
+                LIMIT ?
+            ''', (last_id, batch_size))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+
+            with self.pool.writer() as conn:
+                conn.executemany(
+                    'UPDATE requests SET use_case = ? WHERE id = ?',
+                    [(classifier.classify(row['reason']), row['id']) for row in rows]
+                )
+
+            last_id = rows[-1]['id']
+            updated += len(rows)
+
+        logger.info(f"Use case backfill complete: {updated} rows")
+        return updated
+
+    def _format_use_cases(self, categories: Dict[str, int], total: int) -> List[Dict]:
+        """Convert category counts to a list with percentages"""
+        total = total if total else 1
 
         result = []
         for category, count in sorted(categories.items(), key=lambda x: x[1], reverse=True):
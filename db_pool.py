@@ -0,0 +1,116 @@
+"""
+SQLite Connection Pool
+WAL-mode connections shared by Database and BalanceSystem:
+one serialised writer, one read connection per thread
+"""
+
+import os
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+# Connection tuning (negative cache_size is KiB)
+SYNCHRONOUS = 'NORMAL'  # Safe with WAL; fsync at checkpoint instead of every commit
+CACHE_SIZE_KB = 16000
+MMAP_SIZE = 256 * 1024 * 1024
+BUSY_TIMEOUT_MS = 5000
+
+_pools: Dict[str, 'ConnectionPool'] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_file: str) -> 'ConnectionPool':
+    """Get the shared pool for a database file (one writer per file per process)"""
+    # Absolute, so readers opened later (or after a chdir) hit the same file
+    db_file = os.path.abspath(db_file)
+    with _pools_lock:
+        pool = _pools.get(db_file)
+        if pool is None or pool.closed:
+            pool = ConnectionPool(db_file)
+            _pools[db_file] = pool
+        return pool
+
+
+class ConnectionPool:
+    """
+    Single-writer / many-reader SQLite connections
+
+    Writers take the pool lock and get the one write connection inside a
+    transaction. Readers each get a thread-local connection; under WAL they
+    see the last committed state and never wait for the writer.
+    """
+
+    def __init__(self, db_file: str):
+        self.db_file = db_file
+        self.closed = False
+        self._write_lock = threading.RLock()
+        self._local = threading.local()
+
+        self._write_conn = self._connect()
+        mode = self._write_conn.execute('PRAGMA journal_mode=WAL').fetchone()[0]
+        logger.info(f"Connection pool opened: {db_file} (journal_mode={mode})")
+
+    def _connect(self, read_only: bool = False) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_file,
+            timeout=BUSY_TIMEOUT_MS / 1000,
+            check_same_thread=False,
+            isolation_level=None  # Transactions are managed explicitly by writer()
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute(f'PRAGMA synchronous={SYNCHRONOUS}')
+        conn.execute(f'PRAGMA cache_size=-{CACHE_SIZE_KB}')
+        conn.execute(f'PRAGMA mmap_size={MMAP_SIZE}')
+        conn.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT_MS}')
+        if read_only:
+            conn.execute('PRAGMA query_only=ON')
+        return conn
+
+    def reader(self) -> sqlite3.Connection:
+        """Get this thread's read connection (autocommit, query only)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect(read_only=True)
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def writer(self):
+        """
+        Exclusive write transaction
+
+        Commits when the block exits, rolls back if it raises. Nested use on
+        the same thread joins the outer transaction.
+        """
+        with self._write_lock:
+            conn = self._write_conn
+            if conn.in_transaction:
+                yield conn
+                return
+
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            else:
+                conn.execute('COMMIT')
+
+    def close(self):
+        """
+        Close the write connection and this thread's reader
+
+        Other threads' readers are released with their thread-local state.
+        """
+        self.closed = True
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+        with self._write_lock:
+            self._write_conn.close()
@@ -0,0 +1,190 @@
+"""
+Deposit Verification Pipeline
+Checks pending balance deposits on-chain in JSON-RPC batches
+and credits them in one transaction per batch
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List
+
+import requests
+
+from payment_verifier import MIN_CONFIRMATIONS
+
+logger = logging.getLogger(__name__)
+
+
+class RPCBatchError(Exception):
+    """The node rejected a whole JSON-RPC batch"""
+
+
+def rpc_batch(session: requests.Session, rpc_url: str, calls: List[tuple], timeout: float = 30) -> List:
+    """
+    Send many JSON-RPC calls in one HTTP request
+
+    Args:
+        session: Keep-alive session to post with
+        rpc_url: Node URL
+        calls: (method, params) tuples
+
+    Returns:
+        Results in call order (None where the call returned an error)
+    """
+    payload = [
+        {'jsonrpc': '2.0', 'id': i, 'method': method, 'params': list(params)}
+        for i, (method, params) in enumerate(calls)
+    ]
+    response = session.post(rpc_url, json=payload, timeout=timeout)
+    response.raise_for_status()
+    replies = response.json()
+    if not isinstance(replies, list):
+        raise RPCBatchError(replies.get('error', replies) if isinstance(replies, dict) else replies)
+
+    # Batch replies may come back in any order
+    results = [None] * len(calls)
+    for reply in replies:
+        if 'error' in reply:
+            logger.warning(f"RPC batch call {payload[reply['id']]['method']} failed: {reply['error']}")
+            continue
+        results[reply['id']] = reply.get('result')
+    return results
+
+
+class DepositPipeline:
+    """
+    Background verification of deposits queued by BalanceSystem
+
+    Each round takes up to `batch_size` pending deposits and looks all of
+    them up in one JSON-RPC batch (transaction + receipt per deposit, plus
+    the block number), so a burst of deposits costs a few HTTP round trips
+    instead of three per deposit. Confirmed deposits are credited - with the
+    amount that actually arrived - and failed ones rejected in a single
+    write transaction per batch. A round walks the whole queue, so a backlog
+    is cleared in one round rather than one batch per interval.
+    """
+
+    def __init__(
+        self,
+        balance_system,
+        rpc_url: str,
+        deposit_address: str = None,
+        batch_size: int = 100,
+        interval: float = 5.0,
+        min_confirmations: int = MIN_CONFIRMATIONS,
+        timeout: float = 3600.0,
+        session: requests.Session = None
+    ):
+        """
+        Args:
+            balance_system: BalanceSystem with a deposit_address
+            rpc_url: Node URL (must accept JSON-RPC batches)
+            deposit_address: Address deposits must pay (default: the balance system's)
+            batch_size: Deposits verified per RPC batch and DB transaction
+            interval: Seconds between rounds when the queue is drained
+            min_confirmations: Blocks on top of the deposit's block before crediting
+            timeout: Seconds before a deposit never seen on-chain is rejected
+            session: HTTP session (default: a new keep-alive session)
+        """
+        self.balance_system = balance_system
+        self.rpc_url = rpc_url
+        self.deposit_address = (deposit_address or balance_system.deposit_address).lower()
+        self.batch_size = batch_size
+        self.interval = interval
+        self.min_confirmations = min_confirmations
+        self.timeout = timeout
+        self.session = session or requests.Session()
+
+        self._thread = None
+        self._stop = threading.Event()
+
+    def process_once(self) -> Dict[str, int]:
+        """
+        Verify every deposit pending right now, batch by batch
+
+        Returns:
+            Counts of deposits credited, rejected and still pending
+        """
+        counts = {'credited': 0, 'rejected': 0, 'pending': 0}
+        after_id = 0
+
+        while True:
+            deposits = self.balance_system.pending_deposits(self.batch_size, after_id=after_id)
+            if not deposits:
+                return counts
+
+            credits, rejections, waiting = self._check_batch(deposits)
+            counts['credited'] += self.balance_system.settle_deposits(credits, rejections)
+            counts['rejected'] += len(rejections)
+            counts['pending'] += waiting
+
+            if len(deposits) < self.batch_size:
+                return counts
+            after_id = deposits[-1]['id']
+
+    def _check_batch(self, deposits: List[Dict]):
+        """Look up one batch on-chain; returns (credits, rejections, still pending)"""
+        calls = [('eth_blockNumber', [])]
+        for deposit in deposits:
+            calls.append(('eth_getTransactionByHash', [deposit['tx_hash']]))
+            calls.append(('eth_getTransactionReceipt', [deposit['tx_hash']]))
+
+        results = rpc_batch(self.session, self.rpc_url, calls)
+        if results[0] is None:
+            raise RPCBatchError('eth_blockNumber failed')
+        head = int(results[0], 16)
+        now = time.time()
+
+        credits, rejections, waiting = [], [], 0
+        for i, deposit in enumerate(deposits):
+            tx, receipt = results[1 + 2 * i], results[2 + 2 * i]
+
+            if tx is None or receipt is None:
+                if now - self._queued_at(deposit) > self.timeout:
+                    rejections.append((deposit['id'], 'Deposit not confirmed before timeout'))
+                else:
+                    waiting += 1
+                continue
+
+            # Only the wallet that signed the deposit can have it credited
+            if (tx.get('from') or '').lower() != deposit['sender']:
+                rejections.append((deposit['id'], 'Deposit not sent by the wallet that signed it'))
+            elif (tx.get('to') or '').lower() != self.deposit_address:
+                rejections.append((deposit['id'], f"Deposit sent to wrong address: {tx.get('to')}"))
+            elif int(receipt['status'], 16) != 1:
+                rejections.append((deposit['id'], 'Transaction failed'))
+            elif int(tx['value'], 16) == 0:
+                rejections.append((deposit['id'], 'Deposit transaction carries no ETH'))
+            elif head - int(receipt['blockNumber'], 16) < self.min_confirmations:
+                waiting += 1
+            else:
+                credits.append((deposit['id'], int(tx['value'], 16)))
+
+        return credits, rejections, waiting
+
+    def _queued_at(self, deposit: Dict) -> float:
+        # deposits.timestamp is CURRENT_TIMESTAMP (UTC, SQLite format)
+        queued = datetime.strptime(deposit['timestamp'], '%Y-%m-%d %H:%M:%S')
+        return queued.replace(tzinfo=timezone.utc).timestamp()
+
+    def start(self):
+        """Start the verification thread (no-op if already running)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='deposit-pipeline', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval + 1)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.process_once()
+            except Exception as e:
+                logger.error(f"Deposit verification round failed: {e}")
@@ -0,0 +1,193 @@
+"""
+Disbursement Queue Module
+Batches faucet payouts and hands agents a ticket they can poll
+"""
+
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class DisbursementQueue:
+    """
+    Queue of pending payouts flushed on a size or time threshold
+
+    Each flush goes out through `faucet.send_batch`, so a burst of payouts
+    shares one decimals/gas-price lookup and is pipelined on consecutive
+    nonces instead of being signed and sent inside the HTTP request.
+
+    Ticket lifecycle: queued -> sent -> confirmed / failed
+    """
+
+    def __init__(
+        self,
+        faucet,
+        max_batch: int = 20,
+        max_wait: float = 2.0,
+        on_sent: Callable[[Dict], None] = None,
+        max_tickets: int = 10000
+    ):
+        """
+        Args:
+            faucet: USDCFaucet (or mock) providing send_batch
+            max_batch: Flush as soon as this many payouts are queued
+            max_wait: Flush queued payouts after this many seconds
+            on_sent: Called with the ticket once its transfer is submitted
+            max_tickets: Finished tickets kept for polling
+        """
+        self.faucet = faucet
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.on_sent = on_sent
+        self.max_tickets = max_tickets
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._queue = []
+        self._tickets = OrderedDict()
+        self._open_keys = {}
+        self._thread = None
+        self._running = False
+
+    def enqueue(self, to_address: str, amount: float, key: str = None, meta: Dict = None) -> str:
+        """
+        Queue a payout
+
+        Args:
+            to_address: Recipient address
+            amount: Amount in USDC
+            key: Optional dedupe key (e.g. agent name), see has_open_ticket
+            meta: Extra data passed back to on_sent
+
+        Returns:
+            Ticket id, or None if `key` already has an open ticket (checked
+            and claimed under one lock, so concurrent callers can't both get one)
+        """
+        ticket_id = uuid.uuid4().hex
+        ticket = {
+            'ticket_id': ticket_id,
+            'status': 'queued',
+            'wallet_address': to_address,
+            'amount': amount,
+            'key': key,
+            'meta': meta or {},
+            'tx_hash': None,
+            'error': None,
+            'created_at': time.time(),
+            'sent_at': None
+        }
+
+        with self._lock:
+            if key is not None:
+                if key in self._open_keys:
+                    return None
+                self._open_keys[key] = ticket_id
+            self._tickets[ticket_id] = ticket
+            self._queue.append(ticket)
+            if len(self._queue) >= self.max_batch:
+                self._wakeup.notify()
+
+        self.start()
+        return ticket_id
+
+    def has_open_ticket(self, key: str) -> bool:
+        """Check if a payout for this key is queued but not yet submitted"""
+        with self._lock:
+            return key in self._open_keys
+
+    def get_ticket(self, ticket_id: str) -> Optional[Dict]:
+        """Get public ticket state, refreshing confirmation for sent payouts"""
+        with self._lock:
+            ticket = self._tickets.get(ticket_id)
+            if not ticket:
+                return None
+            ticket = dict(ticket)
+
+        if ticket['status'] == 'sent':
+            tx_status = self.faucet.get_transaction_status(ticket['tx_hash'])['status']
+            if tx_status in ('confirmed', 'failed', 'dropped'):
+                ticket['status'] = 'confirmed' if tx_status == 'confirmed' else 'failed'
+
+        return {k: v for k, v in ticket.items() if k not in ('key', 'meta')}
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._queue)
+
+    def start(self):
+        """Start the flush thread (no-op if already running)"""
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name='disbursement-queue', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the flush thread after sending whatever is still queued"""
+        with self._lock:
+            self._running = False
+            self._wakeup.notify()
+        if self._thread:
+            self._thread.join(timeout=self.max_wait + 5)
+        while self.flush():
+            pass
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._running:
+                    return
+                if len(self._queue) < self.max_batch:
+                    self._wakeup.wait(timeout=self.max_wait)
+                if not self._running:
+                    return
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Disbursement flush failed: {e}")
+
+    def flush(self) -> int:
+        """Send the oldest queued payouts (up to max_batch) now; returns number of payouts flushed"""
+        with self._lock:
+            batch, self._queue = self._queue[:self.max_batch], self._queue[self.max_batch:]
+        if not batch:
+            return 0
+
+        try:
+            results = self.faucet.send_batch([(t['wallet_address'], t['amount']) for t in batch])
+        except Exception as e:
+            results = [{'tx_hash': None, 'error': str(e)}] * len(batch)
+
+        for ticket, result in zip(batch, results):
+            if result['tx_hash']:
+                ticket['tx_hash'] = result['tx_hash']
+                ticket['sent_at'] = time.time()
+                if self.on_sent:
+                    try:
+                        self.on_sent(ticket)
+                    except Exception as e:
+                        logger.error(f"on_sent failed for ticket {ticket['ticket_id']}: {e}")
+                ticket['status'] = 'sent'
+            else:
+                ticket['status'] = 'failed'
+                ticket['error'] = result['error']
+
+            with self._lock:
+                if ticket['key'] is not None and self._open_keys.get(ticket['key']) == ticket['ticket_id']:
+                    del self._open_keys[ticket['key']]
+
+        with self._lock:
+            while len(self._tickets) > self.max_tickets:
+                oldest_id, oldest = next(iter(self._tickets.items()))
+                if oldest['status'] == 'queued':
+                    break
+                self._tickets.popitem(last=False)
+
+        logger.info(f"Flushed {len(batch)} payouts")
+        return len(batch)
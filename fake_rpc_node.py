@@ -0,0 +1,319 @@
+"""
+Local stand-in JSON-RPC node for tests
+Implements just enough of the Ethereum JSON-RPC API for the faucet modules
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import rlp
+from eth_utils import keccak
+
+CHAIN_ID = 11155111  # Sepolia
+
+SELECTOR_DECIMALS = '0x313ce567'
+SELECTOR_BALANCE_OF = '0x70a08231'
+SELECTOR_SYMBOL = '0x95d89b41'
+
+
+def _hex(value: int) -> str:
+    return hex(value)
+
+
+def _word(value: int) -> str:
+    return '0x' + value.to_bytes(32, 'big').hex()
+
+
+def _string(value: str) -> str:
+    data = value.encode()
+    padded = data + bytes(-len(data) % 32)
+    return '0x' + (32).to_bytes(32, 'big').hex() + len(data).to_bytes(32, 'big').hex() + padded.hex()
+
+
+def _int(field: bytes) -> int:
+    return int.from_bytes(field, 'big')
+
+
+def decode_transaction(raw: bytes) -> dict:
+    """Decode the fields of a signed legacy or EIP-1559 raw transaction"""
+    if raw[0] >= 0xc0:
+        # Legacy: [nonce, gasPrice, gas, to, value, data, v, r, s]
+        fields = rlp.decode(raw)
+        return {
+            'type': 0,
+            'nonce': _int(fields[0]),
+            'gasPrice': _int(fields[1]),
+            'gas': _int(fields[2]),
+            'to': '0x' + fields[3].hex(),
+            'data': '0x' + fields[5].hex(),
+        }
+    # Typed 0x02: [chainId, nonce, maxPriorityFeePerGas, maxFeePerGas, gas, to, value, data, ...]
+    fields = rlp.decode(raw[1:])
+    return {
+        'type': raw[0],
+        'nonce': _int(fields[1]),
+        'maxPriorityFeePerGas': _int(fields[2]),
+        'maxFeePerGas': _int(fields[3]),
+        'gas': _int(fields[4]),
+        'to': '0x' + fields[5].hex(),
+        'data': '0x' + fields[7].hex(),
+    }
+
+
+class FakeRPCNode:
+    """
+    In-process JSON-RPC server with a single sender account
+
+    Transactions land in a mempool and are mined by `mine()` (or on every
+    send when `automine` is set). Every call is counted in `calls`.
+    """
+
+    def __init__(self, automine: bool = False):
+        self.automine = automine
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.http_requests = 0
+        self.block_number = 100
+        self.confirmed_nonce = 0
+        self.mempool = {}      # nonce -> tx hash
+        self.transactions = {}  # tx hash -> tx info
+        self.receipts = {}
+        self.blocks = {}        # block number -> tx hashes
+        self.token_decimals = 6
+        self.token_symbol = 'USDC'
+        self.gas_price = 10 ** 9
+        self.base_fee = 10 ** 9  # None for a pre-London (legacy fee) chain
+        self.priority_fee = 10 ** 8
+        self.transfer_gas = 51000
+        self.token_balance = 10000 * 10 ** 6
+        self.fail_next_send = None
+
+        node = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                payload = json.loads(self.rfile.read(length))
+                with node.lock:
+                    node.http_requests += 1
+                if isinstance(payload, list):
+                    response = [node.handle(item) for item in payload]
+                else:
+                    response = node.handle(payload)
+                body = json.dumps(response).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    # ----- node state helpers -----
+
+    def pending_nonce(self) -> int:
+        nonce = self.confirmed_nonce
+        while nonce in self.mempool:
+            nonce += 1
+        return nonce
+
+    def mine(self):
+        """Mine every executable mempool transaction into a new block"""
+        with self.lock:
+            self.block_number += 1
+            while self.confirmed_nonce in self.mempool:
+                tx_hash = self.mempool.pop(self.confirmed_nonce)
+                self._include(tx_hash)
+                self.confirmed_nonce += 1
+
+    def add_payment(self, sender: str, to: str, value_wei: int, status: int = 1) -> str:
+        """Mine a new block holding an ETH transfer from another account"""
+        with self.lock:
+            self.block_number += 1
+            tx_hash = '0x' + keccak(f'{sender}{to}{value_wei}{self.block_number}'.encode()).hex()
+            self.transactions[tx_hash] = {
+                'hash': tx_hash,
+                'nonce': 0,
+                'from': sender,
+                'to': to,
+                'value': value_wei,
+                'data': '0x',
+                'gas': 21000,
+                'fees': {'gasPrice': self.gas_price},
+            }
+            self._include(tx_hash, status)
+            return tx_hash
+
+    def _include(self, tx_hash: str, status: int = 1):
+        """Put a transaction into the current block (caller holds the lock)"""
+        tx = self.transactions[tx_hash]
+        tx['blockNumber'] = self.block_number
+        self.blocks.setdefault(self.block_number, []).append(tx_hash)
+        self.receipts[tx_hash] = {
+            'transactionHash': tx_hash,
+            'blockHash': '0x' + keccak(str(self.block_number).encode()).hex(),
+            'blockNumber': _hex(self.block_number),
+            'transactionIndex': _hex(len(self.blocks[self.block_number]) - 1),
+            'from': tx['from'],
+            'to': tx['to'],
+            'cumulativeGasUsed': '0xc350',
+            'gasUsed': '0xc350',
+            'effectiveGasPrice': '0x3b9aca00',
+            'contractAddress': None,
+            'logs': [],
+            'logsBloom': '0x' + '00' * 256,
+            'status': _hex(status),
+            'type': '0x0',
+        }
+
+    def _transaction_json(self, tx_hash: str) -> dict:
+        tx = self.transactions[tx_hash]
+        number = tx.get('blockNumber')
+        return {
+            'hash': tx_hash,
+            'nonce': _hex(tx['nonce']),
+            'from': tx['from'],
+            'to': tx['to'],
+            'value': _hex(tx.get('value', 0)),
+            'input': tx['data'],
+            'gas': _hex(tx['gas']),
+            'gasPrice': _hex(tx['fees'].get('gasPrice', tx['fees'].get('maxFeePerGas', 0))),
+            'blockNumber': _hex(number) if number is not None else None,
+            'blockHash': '0x' + keccak(str(number).encode()).hex() if number is not None else None,
+            'transactionIndex': self.receipts[tx_hash]['transactionIndex'] if number is not None else None,
+        }
+
+    def use_nonces_externally(self, count: int):
+        """Simulate another process spending nonces from the same wallet"""
+        with self.lock:
+            self.confirmed_nonce += count
+
+    # ----- JSON-RPC dispatch -----
+
+    def handle(self, request: dict) -> dict:
+        method = request['method']
+        params = request.get('params', [])
+        with self.lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+        try:
+            result = getattr(self, 'rpc_' + method)(*params)
+        except AttributeError:
+            return {'jsonrpc': '2.0', 'id': request.get('id'),
+                    'error': {'code': -32601, 'message': f'method not found: {method}'}}
+        except ValueError as e:
+            return {'jsonrpc': '2.0', 'id': request.get('id'),
+                    'error': {'code': -32000, 'message': str(e)}}
+        return {'jsonrpc': '2.0', 'id': request.get('id'), 'result': result}
+
+    def rpc_web3_clientVersion(self):
+        return 'FakeRPCNode/v0'
+
+    def rpc_net_version(self):
+        return str(CHAIN_ID)
+
+    def rpc_eth_chainId(self):
+        return _hex(CHAIN_ID)
+
+    def rpc_eth_blockNumber(self):
+        return _hex(self.block_number)
+
+    def rpc_eth_gasPrice(self):
+        return _hex(self.gas_price)
+
+    def rpc_eth_maxPriorityFeePerGas(self):
+        return _hex(self.priority_fee)
+
+    def rpc_eth_estimateGas(self, tx, block='latest'):
+        return _hex(self.transfer_gas)
+
+    def rpc_eth_getBlockByNumber(self, block='latest', full=False):
+        number = self.block_number if block in ('latest', 'pending') else int(block, 16)
+        result = {
+            'number': _hex(number),
+            'hash': '0x' + keccak(str(number).encode()).hex(),
+            'parentHash': '0x' + keccak(str(number - 1).encode()).hex(),
+            'timestamp': _hex(1_700_000_000 + number * 12),
+            'gasLimit': _hex(30_000_000),
+            'gasUsed': '0x0',
+            'miner': '0x' + '00' * 20,
+            'transactions': [
+                self._transaction_json(tx_hash) if full else tx_hash
+                for tx_hash in self.blocks.get(number, [])
+            ],
+        }
+        if self.base_fee is not None:
+            result['baseFeePerGas'] = _hex(self.base_fee)
+        return result
+
+    def rpc_eth_getTransactionCount(self, address, block='latest'):
+        with self.lock:
+            if block == 'pending':
+                return _hex(self.pending_nonce())
+            return _hex(self.confirmed_nonce)
+
+    def rpc_eth_call(self, tx, block='latest'):
+        selector = tx.get('data', tx.get('input', ''))[:10]
+        if selector == SELECTOR_DECIMALS:
+            return _word(self.token_decimals)
+        if selector == SELECTOR_BALANCE_OF:
+            return _word(self.token_balance)
+        if selector == SELECTOR_SYMBOL:
+            return _string(self.token_symbol)
+        raise ValueError(f'execution reverted: unknown selector {selector}')
+
+    def rpc_eth_sendRawTransaction(self, raw_hex):
+        raw = bytes.fromhex(raw_hex[2:])
+        decoded = decode_transaction(raw)
+        nonce = decoded['nonce']
+        tx_hash = '0x' + keccak(raw).hex()
+        with self.lock:
+            if self.fail_next_send:
+                message, self.fail_next_send = self.fail_next_send, None
+                raise ValueError(message)
+            if nonce < self.confirmed_nonce:
+                raise ValueError('nonce too low')
+            if nonce in self.mempool:
+                raise ValueError('replacement transaction underpriced')
+            self.mempool[nonce] = tx_hash
+            self.transactions[tx_hash] = {
+                'hash': tx_hash,
+                'nonce': nonce,
+                'from': '0x' + '00' * 20,
+                'to': decoded['to'],
+                'data': decoded['data'],
+                'gas': decoded['gas'],
+                'fees': {k: decoded[k] for k in ('gasPrice', 'maxFeePerGas', 'maxPriorityFeePerGas') if k in decoded},
+                'raw': raw_hex,
+            }
+        if self.automine:
+            self.mine()
+        return tx_hash
+
+    def rpc_eth_getTransactionByHash(self, tx_hash):
+        with self.lock:
+            tx = self.transactions.get(tx_hash)
+            # An unmined transaction evicted from the mempool is forgotten
+            if tx is None or (tx.get('blockNumber') is None and tx_hash not in self.mempool.values()):
+                return None
+            return self._transaction_json(tx_hash)
+
+    def rpc_eth_getTransactionReceipt(self, tx_hash):
+        with self.lock:
+            return self.receipts.get(tx_hash)
@@ -0,0 +1,87 @@
+"""
+Flask Request Guards
+Rate-limit and idempotency decorators shared by the Flask apps
+"""
+
+import functools
+
+from flask import current_app, jsonify, request
+
+from idempotency import IdempotencyStore, IdempotencyKeyReused, IDEMPOTENCY_HEADER, MAX_KEY_LENGTH, fingerprint
+from rate_limiter import TokenBucketLimiter, forwarded_client, retry_after_header
+
+
+def client_ip(trust_proxy: int = 0):
+    """Client address of the current request, behind `trust_proxy` proxies"""
+    # The hop the outermost trusted proxy appended; earlier ones are client-written
+    forwarded = forwarded_client(request.headers.get('X-Forwarded-For'), trust_proxy)
+    return forwarded or request.remote_addr
+
+
+def rate_limited(limiter: TokenBucketLimiter, trust_proxy: int = 0):
+    """Decorator: admit the request through the token buckets before the view runs (429 + Retry-After)"""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            data = request.get_json(silent=True)
+            data = data if isinstance(data, dict) else {}
+            wallet_address = data.get('wallet_address')
+            retry_after = limiter.acquire(
+                ip=client_ip(trust_proxy),
+                agent=str(data.get('agent_name') or ''),
+                wallet=str(wallet_address).lower() if wallet_address else None
+            )
+            if retry_after:
+                response = jsonify({
+                    'success': False,
+                    'error': 'Too many requests',
+                    'retry_after_seconds': round(retry_after, 1)
+                })
+                response.headers['Retry-After'] = retry_after_header(retry_after)
+                return response, 429
+            return view(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def idempotent(store: IdempotencyStore):
+    """
+    Decorator: replay the stored response for a repeated Idempotency-Key header
+
+    Requests without the header run normally. A key reused with a different
+    body is rejected with 422. Apply it outside `rate_limited` so replays
+    are not charged.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            key = request.headers.get(IDEMPOTENCY_HEADER)
+            if not key:
+                return view(*args, **kwargs)
+            if len(key) > MAX_KEY_LENGTH:
+                return jsonify({'success': False, 'error': f'{IDEMPOTENCY_HEADER} longer than {MAX_KEY_LENGTH} characters'}), 400
+
+            def handler():
+                response = current_app.make_response(view(*args, **kwargs))
+                return response.status_code, response.get_data()
+
+            try:
+                status, body, replayed = store.execute(
+                    f'{request.path}\n{key}', fingerprint(request.get_data()), handler
+                )
+            except IdempotencyKeyReused:
+                return jsonify({
+                    'success': False,
+                    'error': f'{IDEMPOTENCY_HEADER} already used for a different request'
+                }), 422
+
+            response = current_app.response_class(body, status=status, mimetype='application/json')
+            if replayed:
+                response.headers['Idempotent-Replayed'] = 'true'
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,149 @@
+"""
+Gas Oracle Module
+Fee data refreshed in the background and served from memory,
+with per-tier fee strategies and a cached gas limit per call type
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+# Fallback when estimation fails; sufficient for an ERC20 transfer
+DEFAULT_GAS_LIMIT = 100000
+# Headroom over eth_estimateGas (first transfer to an empty account costs more)
+GAS_LIMIT_MARGIN = 1.2
+
+# base_fee_multiplier covers base fee growth (up to 12.5% per block) until
+# inclusion; legacy_multiplier applies to gasPrice on pre-London chains
+FEE_STRATEGIES = {
+    'cheap': {'base_fee_multiplier': 1.25, 'priority_multiplier': 1.0, 'legacy_multiplier': 1.0},
+    'fast': {'base_fee_multiplier': 2.0, 'priority_multiplier': 2.0, 'legacy_multiplier': 1.25},
+}
+
+
+class GasOracle:
+    """
+    In-memory fee data for the send path
+
+    A daemon thread refreshes the latest base fee and priority fee (or the
+    legacy gas price on chains without EIP-1559) every `refresh_interval`
+    seconds, so sending a transaction costs no fee RPCs. If the data is
+    older than `max_age` (thread stopped, node unreachable) the next caller
+    refreshes inline.
+    """
+
+    def __init__(
+        self,
+        w3,
+        refresh_interval: float = 12.0,
+        max_age: float = 60.0,
+        strategies: Dict[str, Dict[str, float]] = None
+    ):
+        self.w3 = w3
+        self.refresh_interval = refresh_interval
+        self.max_age = max_age
+        self.strategies = strategies or FEE_STRATEGIES
+
+        self._lock = threading.Lock()
+        self._fee_data = None
+        self._gas_limits: Dict[str, int] = {}
+        self._thread = None
+        self._stop = threading.Event()
+
+    def fees(self, strategy: str = 'cheap') -> Dict[str, int]:
+        """
+        Fee fields for a transaction under the named strategy
+
+        Returns maxFeePerGas/maxPriorityFeePerGas (EIP-1559) or gasPrice.
+        """
+        if strategy not in self.strategies:
+            raise ValueError(f"Unknown fee strategy: {strategy}")
+        params = self.strategies[strategy]
+
+        fee_data = self.fee_data()
+        if fee_data['base_fee'] is None:
+            return {'gasPrice': int(fee_data['gas_price'] * params['legacy_multiplier'])}
+
+        priority_fee = int(fee_data['priority_fee'] * params['priority_multiplier'])
+        return {
+            'maxFeePerGas': int(fee_data['base_fee'] * params['base_fee_multiplier']) + priority_fee,
+            'maxPriorityFeePerGas': priority_fee
+        }
+
+    def fee_data(self) -> Dict:
+        """Latest fee data (refreshed inline if missing or stale)"""
+        with self._lock:
+            fee_data = self._fee_data
+        if fee_data is None or time.time() - fee_data['updated_at'] > self.max_age:
+            fee_data = self.refresh()
+        self.start()
+        return fee_data
+
+    def gas_limit(self, key: str, build_tx: Callable[[], Dict]) -> int:
+        """
+        Cached gas limit for a kind of call
+
+        Estimated once per key from the transaction `build_tx` returns, plus
+        GAS_LIMIT_MARGIN; falls back to DEFAULT_GAS_LIMIT if estimation fails
+        (the fallback is not cached, so the next call tries again).
+        """
+        with self._lock:
+            limit = self._gas_limits.get(key)
+        if limit is not None:
+            return limit
+
+        try:
+            limit = int(self.w3.eth.estimate_gas(build_tx()) * GAS_LIMIT_MARGIN)
+        except Exception as e:
+            logger.warning(f"Gas estimation for {key} failed ({e}), using {DEFAULT_GAS_LIMIT}")
+            return DEFAULT_GAS_LIMIT
+
+        with self._lock:
+            self._gas_limits[key] = limit
+        logger.info(f"Gas limit for {key}: {limit}")
+        return limit
+
+    def refresh(self) -> Dict:
+        """Fetch fee data from the node now"""
+        block = self.w3.eth.get_block('latest')
+        base_fee = block.get('baseFeePerGas')
+
+        if base_fee is None:
+            fee_data = {'base_fee': None, 'priority_fee': None, 'gas_price': self.w3.eth.gas_price}
+        else:
+            try:
+                priority_fee = self.w3.eth.max_priority_fee
+            except Exception:
+                # Node without eth_maxPriorityFeePerGas: derive it from gasPrice
+                priority_fee = max(self.w3.eth.gas_price - base_fee, 0)
+            fee_data = {'base_fee': base_fee, 'priority_fee': priority_fee, 'gas_price': None}
+
+        fee_data['block_number'] = block['number']
+        fee_data['updated_at'] = time.time()
+        with self._lock:
+            self._fee_data = fee_data
+        return fee_data
+
+    def start(self):
+        """Start the refresh thread (no-op if already running)"""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='gas-oracle', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.refresh_interval + 1)
+
+    def _run(self):
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Gas oracle refresh failed: {e}")
@@ -0,0 +1,252 @@
+"""
+Pooled HTTP Client
+Keep-alive requests.Session with retries, per-host concurrency limits
+and per-phase latency (DNS, connect, TLS, first byte)
+"""
+
+import logging
+import socket
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+PHASES = ('dns', 'connect', 'tls', 'first_byte')
+
+# Phase timings of the request running on this thread
+_current = threading.local()
+
+
+def _record(phase: str, seconds: float):
+    timings = getattr(_current, 'timings', None)
+    if timings is not None:
+        timings[phase] += seconds
+
+
+class HostBusyError(requests.exceptions.RequestException):
+    """No request slot for the host became free within the timeout"""
+
+
+class _HostSlots:
+    """Request slots for one host, and how many callers hold or wait for one"""
+
+    def __init__(self, size: int):
+        self.semaphore = threading.BoundedSemaphore(size)
+        self.users = 0
+
+
+class _TimedConnectionMixin:
+    """
+    Times DNS and TCP connect separately, and TLS as the rest of connect()
+
+    The host is resolved here and each resolved address is handed to the
+    normal urllib3 connect, so the lookup is done (and timed) exactly once.
+    """
+
+    def _new_conn(self):
+        start = time.perf_counter()
+        try:
+            infos = socket.getaddrinfo(self._dns_host, self.port, 0, socket.SOCK_STREAM)
+        except socket.gaierror:
+            # Let urllib3 raise its own resolution error
+            return super()._new_conn()
+        resolved = time.perf_counter()
+        self._dns_seconds = resolved - start
+        _record('dns', self._dns_seconds)
+
+        dns_host = self._dns_host
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        try:
+            for i, address in enumerate(addresses):
+                self._dns_host = address
+                try:
+                    sock = super()._new_conn()
+                    break
+                except (NewConnectionError, ConnectTimeoutError):
+                    if i == len(addresses) - 1:
+                        raise
+        finally:
+            self._dns_host = dns_host
+
+        self._tcp_seconds = time.perf_counter() - resolved
+        _record('connect', self._tcp_seconds)
+        return sock
+
+    def connect(self):
+        self._dns_seconds = self._tcp_seconds = 0.0
+        start = time.perf_counter()
+        super().connect()
+        if isinstance(self, HTTPSConnection):
+            # Whatever connect() spent beyond DNS + TCP is the TLS handshake
+            elapsed = time.perf_counter() - start
+            _record('tls', max(elapsed - self._dns_seconds - self._tcp_seconds, 0.0))
+
+
+class _TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _TimedAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _TimedHTTPConnectionPool,
+            'https': _TimedHTTPSConnectionPool
+        }
+
+
+class PooledHTTPClient:
+    """
+    Shared HTTP client for outbound calls
+
+    One keep-alive session per client: repeat calls to a host reuse an open
+    TCP+TLS connection instead of handshaking again. Idempotent requests are
+    retried with exponential backoff on connection errors and 429/5xx. At
+    most `max_per_host` requests run against one host at a time; further
+    callers wait for a slot up to their timeout. A streamed response keeps
+    its slot until it is closed, so use it as a context manager.
+
+    Latency of the last `window` requests is kept per phase (see
+    latency_stats). Phases that did not happen, such as DNS/connect/TLS on a
+    reused connection, count as zero.
+    """
+
+    def __init__(
+        self,
+        max_per_host: int = 10,
+        max_hosts: int = 10,
+        retries: int = 2,
+        backoff_factor: float = 0.3,
+        window: int = 1000
+    ):
+        self.max_per_host = max_per_host
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset({'GET', 'HEAD'}),
+            raise_on_status=False
+        )
+        adapter = _TimedAdapter(
+            pool_connections=max_hosts,
+            pool_maxsize=max_per_host,
+            max_retries=retry
+        )
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        # Only hosts with a request in flight or waiting have an entry
+        self._host_slots: Dict[str, _HostSlots] = {}
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=window)
+
+    def get(self, url: str, timeout: float = 10, **kwargs) -> requests.Response:
+        """GET through the pool (pass stream=True to read the body lazily)"""
+        host = urlparse(url).netloc
+        timings = {phase: 0.0 for phase in PHASES}
+
+        slots = self._acquire_slot(host, timeout)
+        _current.timings = timings
+        try:
+            response = self.session.get(url, timeout=timeout, **kwargs)
+        except BaseException:
+            self._release_slot(host, slots)
+            raise
+        finally:
+            _current.timings = None
+
+        if kwargs.get('stream'):
+            # The body is still being read from the connection
+            self._release_on_close(response, host, slots)
+        else:
+            self._release_slot(host, slots)
+
+        # requests.elapsed runs from sending until the headers are parsed
+        setup = timings['dns'] + timings['connect'] + timings['tls']
+        timings['first_byte'] = max(response.elapsed.total_seconds() - setup, 0.0)
+        with self._lock:
+            self._samples.append(timings)
+        return response
+
+    def latency_stats(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """Per-phase count, mean, p50, p95 and max over the window, in ms"""
+        with self._lock:
+            samples = list(self._samples)
+
+        stats = {}
+        for phase in PHASES:
+            values = sorted(s[phase] * 1000 for s in samples)
+            if not values:
+                stats[phase] = {'count': 0, 'mean_ms': None, 'p50_ms': None, 'p95_ms': None, 'max_ms': None}
+                continue
+            stats[phase] = {
+                'count': len(values),
+                'mean_ms': round(sum(values) / len(values), 2),
+                'p50_ms': round(values[len(values) // 2], 2),
+                'p95_ms': round(values[min(len(values) - 1, int(len(values) * 0.95))], 2),
+                'max_ms': round(values[-1], 2)
+            }
+        return stats
+
+    def close(self):
+        self.session.close()
+
+    def _acquire_slot(self, host: str, timeout: float) -> _HostSlots:
+        with self._lock:
+            slots = self._host_slots.get(host)
+            if slots is None:
+                slots = self._host_slots[host] = _HostSlots(self.max_per_host)
+            slots.users += 1
+
+        if not slots.semaphore.acquire(timeout=timeout):
+            self._forget_user(host, slots)
+            raise HostBusyError(f"Too many concurrent requests to {host}")
+        return slots
+
+    def _release_slot(self, host: str, slots: _HostSlots):
+        slots.semaphore.release()
+        self._forget_user(host, slots)
+
+    def _forget_user(self, host: str, slots: _HostSlots):
+        with self._lock:
+            slots.users -= 1
+            if slots.users == 0:
+                del self._host_slots[host]
+
+    def _release_on_close(self, response: requests.Response, host: str, slots: _HostSlots):
+        """Give the host slot back the first time the response is closed"""
+        close = response.close
+        released = threading.Lock()
+
+        def close_and_release():
+            try:
+                close()
+            finally:
+                if released.acquire(blocking=False):
+                    self._release_slot(host, slots)
+
+        response.close = close_and_release
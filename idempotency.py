@@ -0,0 +1,182 @@
+"""
+Idempotency Keys
+Compact TTL store of endpoint responses, replayed for retried requests
+"""
+
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+# (status code, JSON body bytes)
+Response = Tuple[int, bytes]
+
+
+class IdempotencyKeyReused(Exception):
+    """The key was already used for a request with a different body"""
+
+
+def fingerprint(body: bytes) -> bytes:
+    """Short digest of a request body, to detect a key reused for another request"""
+    return hashlib.blake2b(body, digest_size=16).digest()
+
+
+class _Flight:
+    """One in-progress request that concurrent duplicates wait on"""
+
+    def __init__(self, fingerprint: bytes):
+        self.fingerprint = fingerprint
+        self.done = threading.Event()
+        self.response = None
+        self.error = None
+
+
+class IdempotencyStore:
+    """
+    Responses by idempotency key, kept for `ttl` seconds
+
+    An agent retrying after a client timeout gets the first attempt's
+    response back - no second verification, payment check, transfer or DB
+    row. A duplicate that arrives while the first attempt is still running
+    waits for it and gets the same response. Bodies are stored
+    zlib-compressed next to a 16-byte request fingerprint; at most
+    `max_entries` keys are kept, oldest dropped first.
+
+    5xx and 429 responses are not stored, so a retry after a server error
+    or a rate-limit rejection runs the request again. Wrap endpoints with
+    this outside the rate limiter: replays then skip admission and are
+    never charged or turned away.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 24 * 3600,
+        max_entries: int = 10000,
+        clock: Callable[[], float] = time.time
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        # key -> (expires_at, fingerprint, status, compressed body)
+        self._responses: 'OrderedDict[str, Tuple[float, bytes, int, bytes]]' = OrderedDict()
+        self._inflight: Dict[str, _Flight] = {}
+        self._inflight_async: Dict[str, Tuple[bytes, asyncio.Future]] = {}
+
+    def execute(self, key: str, request_fingerprint: bytes, handler: Callable[[], Response]) -> Tuple[int, bytes, bool]:
+        """
+        Run `handler` once per key
+
+        Returns:
+            (status, body, replayed) - replayed is True when the response
+            came from the store or from a concurrent first attempt
+
+        Raises:
+            IdempotencyKeyReused: the key belongs to a different request body
+        """
+        with self._lock:
+            stored = self._lookup(key, request_fingerprint)
+            if stored is not None:
+                return stored + (True,)
+
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight(request_fingerprint)
+            elif flight.fingerprint != request_fingerprint:
+                raise IdempotencyKeyReused(key)
+
+        if not leader:
+            flight.done.wait()
+            if flight.error:
+                raise flight.error
+            return flight.response + (True,)
+
+        try:
+            flight.response = handler()
+            self._store(key, request_fingerprint, flight.response)
+            return flight.response + (False,)
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            flight.done.set()
+
+    async def execute_async(
+        self,
+        key: str,
+        request_fingerprint: bytes,
+        handler: Callable[[], Awaitable[Response]]
+    ) -> Tuple[int, bytes, bool]:
+        """Async version of execute (duplicates await the first attempt)"""
+        with self._lock:
+            stored = self._lookup(key, request_fingerprint)
+        if stored is not None:
+            return stored + (True,)
+
+        inflight = self._inflight_async.get(key)
+        if inflight is not None:
+            if inflight[0] != request_fingerprint:
+                raise IdempotencyKeyReused(key)
+            return await asyncio.shield(inflight[1]) + (True,)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight_async[key] = (request_fingerprint, future)
+        try:
+            response = await handler()
+            self._store(key, request_fingerprint, response)
+            future.set_result(response)
+            return response + (False,)
+        except BaseException as e:
+            future.set_exception(e)
+            # Retrieved here so an unawaited future doesn't log a warning
+            future.exception()
+            raise
+        finally:
+            del self._inflight_async[key]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._responses)
+
+    def _lookup(self, key: str, request_fingerprint: bytes):
+        """Stored (status, body) for a key, or None (caller holds the lock)"""
+        entry = self._responses.get(key)
+        if entry is None:
+            return None
+        expires_at, stored_fingerprint, status, body = entry
+        if expires_at <= self.clock():
+            del self._responses[key]
+            return None
+        if stored_fingerprint != request_fingerprint:
+            raise IdempotencyKeyReused(key)
+        return status, zlib.decompress(body)
+
+    def _store(self, key: str, request_fingerprint: bytes, response: Response):
+        status, body = response
+        if status >= 500 or status == 429:
+            return
+
+        entry = (self.clock() + self.ttl, request_fingerprint, status, zlib.compress(body))
+        with self._lock:
+            self._responses.pop(key, None)
+            self._responses[key] = entry
+            # Same TTL for every key, so insertion order is expiry order
+            now = self.clock()
+            while self._responses:
+                oldest_key, oldest = next(iter(self._responses.items()))
+                if len(self._responses) <= self.max_entries and oldest[0] > now:
+                    break
+                del self._responses[oldest_key]
@@ -0,0 +1,50 @@
+"""
+Schema Migrations
+Named, ordered schema changes applied once per database file
+"""
+
+import logging
+from typing import List, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (name, SQL statements); names are recorded once applied, so never rename one
+Migration = Tuple[str, Sequence[str]]
+
+
+def apply_migrations(pool, migrations: Sequence[Migration]) -> List[str]:
+    """
+    Apply the migrations a database has not seen yet, in order
+
+    Each migration runs in its own write transaction together with its row
+    in `schema_migrations`, so it is applied completely or not at all, and
+    workers starting at the same time (BEGIN IMMEDIATE) apply it only once.
+    Several modules sharing a file each pass their own list; names must be
+    unique across them.
+
+    Args:
+        pool: ConnectionPool of the database
+        migrations: (name, statements) in the order to apply them
+
+    Returns:
+        Names of the migrations applied by this call
+    """
+    with pool.writer() as conn:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                name TEXT PRIMARY KEY,
+                applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            ) WITHOUT ROWID
+        ''')
+
+    applied = []
+    for name, statements in migrations:
+        with pool.writer() as conn:
+            if conn.execute('SELECT 1 FROM schema_migrations WHERE name = ?', (name,)).fetchone():
+                continue
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute('INSERT INTO schema_migrations (name) VALUES (?)', (name,))
+        applied.append(name)
+        logger.info(f"Applied migration {name}")
+    return applied
@@ -0,0 +1,54 @@
+"""
+Page Cache
+Rendered dashboard pages, reused until the stats they show change
+"""
+
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class PageCache:
+    """
+    Rendered pages keyed by name and tagged with a data version
+
+    A page is rendered once per data version (Database.stats_version, which
+    every committed request bumps) and served from memory until the version
+    moves on. Each page carries an ETag derived from the version and body,
+    so clients that already hold it can be answered with 304.
+    """
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # key -> (version, body, etag)
+        self._pages: 'OrderedDict[str, Tuple[int, bytes, str]]' = OrderedDict()
+
+    def get_or_render(self, key: str, version: int, render: Callable[[], str]) -> Tuple[bytes, str]:
+        """
+        Cached (body, etag) for a page, rendering it if the version changed
+
+        Args:
+            key: Page name (plus anything else the output depends on)
+            version: Current data version
+            render: Builds the page's HTML
+        """
+        with self._lock:
+            page = self._pages.get(key)
+            if page is not None and page[0] == version:
+                self._pages.move_to_end(key)
+                return page[1], page[2]
+
+        body = render().encode('utf-8')
+        etag = f'{version}-{hashlib.blake2b(body, digest_size=8).hexdigest()}'
+
+        with self._lock:
+            self._pages[key] = (version, body, etag)
+            self._pages.move_to_end(key)
+            while len(self._pages) > self.max_entries:
+                self._pages.popitem(last=False)
+        return body, etag
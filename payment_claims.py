@@ -0,0 +1,144 @@
+"""
+Payment Claims Module
+Memoized payment verification results and one-time premium payment claims
+"""
+
+import logging
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from db_pool import get_pool
+
+logger = logging.getLogger(__name__)
+
+# Same format SQLite uses for CURRENT_TIMESTAMP (UTC)
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class PaymentClaims:
+    """
+    One row per premium payment tx hash (the primary key is the unique index)
+
+    The first final verification result for a payment is stored here, so a
+    resubmitted tx hash is answered with one primary-key lookup instead of
+    three RPC calls. A verified payment is consumed by `claim()`, a
+    conditional upsert inside the pool's write transaction: of any number of
+    concurrent requests for the same payment exactly one wins.
+    """
+
+    def __init__(self, db_file: str = 'faucet.db'):
+        self.db_file = db_file
+        self.pool = get_pool(db_file)
+
+        with self.pool.writer() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS payment_claims (
+                    payment_tx TEXT PRIMARY KEY,
+                    verified BOOLEAN NOT NULL,
+                    amount_eth REAL,
+                    from_address TEXT,
+                    error TEXT,
+                    claimed_by TEXT,
+                    claimed_at DATETIME,
+                    payout_tx TEXT,
+                    verified_at DATETIME NOT NULL
+                )
+            ''')
+
+    def get(self, payment_tx: str) -> Optional[Dict]:
+        """Stored result for a payment (None if never verified)"""
+        row = self.pool.reader().execute(
+            'SELECT * FROM payment_claims WHERE payment_tx = ?', (payment_tx.lower(),)
+        ).fetchone()
+        if not row:
+            return None
+        return {
+            'payment_tx': row['payment_tx'],
+            'verified': bool(row['verified']),
+            'amount_eth': row['amount_eth'],
+            'from_address': row['from_address'],
+            'error': row['error'],
+            'claimed': row['claimed_by'] is not None,
+            'claimed_by': row['claimed_by'],
+            'claimed_at': row['claimed_at'],
+            'payout_tx': row['payout_tx']
+        }
+
+    def record_failure(self, payment_tx: str, error: str):
+        """Remember a payment that failed verification for good"""
+        with self.pool.writer() as conn:
+            conn.execute('''
+                INSERT OR IGNORE INTO payment_claims (payment_tx, verified, error, verified_at)
+                VALUES (?, FALSE, ?, ?)
+            ''', (payment_tx.lower(), error, self._now()))
+
+    def claim(self, payment_tx: str, agent_name: str, payment_result: Dict) -> bool:
+        """
+        Consume a verified payment for one payout
+
+        Returns:
+            True if this call claimed the payment, False if it was already
+            claimed or its sender queued it as a balance deposit
+        """
+        with self.pool.writer() as conn:
+            if self._deposited(conn, payment_tx, payment_result.get('from_address')):
+                logger.warning(f"Rejected payment {payment_tx} by {agent_name}: already a balance deposit")
+                return False
+
+            cursor = conn.execute('''
+                INSERT INTO payment_claims
+                (payment_tx, verified, amount_eth, from_address, claimed_by, claimed_at, verified_at)
+                VALUES (?, TRUE, ?, ?, ?, ?, ?)
+                ON CONFLICT(payment_tx) DO UPDATE SET
+                    claimed_by = excluded.claimed_by,
+                    claimed_at = excluded.claimed_at
+                WHERE payment_claims.verified AND payment_claims.claimed_by IS NULL
+            ''', (
+                payment_tx.lower(),
+                payment_result.get('amount_eth'),
+                payment_result.get('from_address'),
+                agent_name,
+                self._now(),
+                self._now()
+            ))
+            claimed = cursor.rowcount == 1
+
+        if not claimed:
+            logger.warning(f"Rejected replay of payment {payment_tx} by {agent_name}")
+        return claimed
+
+    def _deposited(self, conn, payment_tx: str, from_address: Optional[str]) -> bool:
+        """
+        Whether a transfer is credited, or pending by its sender, as a deposit (BalanceSystem)
+
+        Checked in the claim's write transaction, as BalanceSystem checks
+        payment_claims before queueing a deposit. Pending deposits queued by
+        other wallets are left out: they are rejected once verified.
+        """
+        if not conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'deposits'"
+        ).fetchone():
+            return False
+        return conn.execute('''
+            SELECT 1 FROM deposits
+            WHERE tx_hash = ? AND (status = 'credited' OR (status = 'pending' AND sender = ?))
+        ''', (payment_tx.lower(), (from_address or '').lower())).fetchone() is not None
+
+    def set_payout(self, payment_tx: str, payout_tx: str):
+        """Attach the payout transaction to a claimed payment"""
+        with self.pool.writer() as conn:
+            conn.execute(
+                'UPDATE payment_claims SET payout_tx = ? WHERE payment_tx = ?',
+                (payout_tx, payment_tx.lower())
+            )
+
+    def release(self, payment_tx: str):
+        """Undo a claim whose payout could not be sent (the payment stays verified)"""
+        with self.pool.writer() as conn:
+            conn.execute('''
+                UPDATE payment_claims SET claimed_by = NULL, claimed_at = NULL
+                WHERE payment_tx = ? AND payout_tx IS NULL
+            ''', (payment_tx.lower(),))
+
+    def _now(self) -> str:
+        return datetime.now(timezone.utc).strftime(TIMESTAMP_FORMAT)
@@ -0,0 +1,268 @@
+"""
+Payment Index Module
+Incremental local index of ETH payments to the faucet payment address
+"""
+
+import base64
+import json
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from web3 import Web3
+
+from db_pool import get_pool
+
+logger = logging.getLogger(__name__)
+
+# Blocks behind head left unindexed, so a shallow reorg can't leave stale rows
+REORG_DEPTH = 2
+# Where a fresh index starts: ~24h of Sepolia blocks (12s each)
+DEFAULT_LOOKBACK_BLOCKS = 7200
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(block_time: int, tx_hash: str) -> str:
+    """Opaque page cursor for the (block_time, tx_hash) keyset"""
+    return base64.urlsafe_b64encode(json.dumps([block_time, tx_hash]).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[int, str]:
+    """Inverse of encode_cursor; raises ValueError for a malformed cursor"""
+    try:
+        block_time, tx_hash = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if not isinstance(block_time, int) or not isinstance(tx_hash, str):
+        raise ValueError('Invalid cursor')
+    return block_time, tx_hash
+
+
+class PaymentIndexer:
+    """
+    SQLite index of payments into `payment_address`
+
+    Payments are plain ETH transfers, which emit no logs, so `sync()` walks
+    blocks with full transactions from the last checkpoint to
+    head - REORG_DEPTH, at most `batch_blocks` per call. Matching transfers
+    (successful only) and the new checkpoint are written in one
+    transaction per range, so a crash never skips or double-counts blocks.
+    Lookups by sender or time window are keyset-paginated indexed queries.
+    """
+
+    def __init__(
+        self,
+        w3: Web3,
+        payment_address: str,
+        db_file: str = 'faucet.db',
+        batch_blocks: int = 500,
+        start_block: int = None,
+        lookback_blocks: int = DEFAULT_LOOKBACK_BLOCKS,
+        sync_interval: float = 12.0
+    ):
+        """
+        Args:
+            w3: Connected Web3 instance
+            payment_address: Faucet payment receiving address
+            db_file: SQLite database path
+            batch_blocks: Blocks indexed per transaction (and per sync call)
+            start_block: First block of a fresh index (default: head - lookback_blocks)
+            lookback_blocks: History indexed when there is no checkpoint yet
+            sync_interval: Seconds between background syncs (see start())
+        """
+        self.w3 = w3
+        self.payment_address = payment_address.lower()
+        self.db_file = db_file
+        self.batch_blocks = batch_blocks
+        self.start_block = start_block
+        self.lookback_blocks = lookback_blocks
+        self.sync_interval = sync_interval
+
+        self._sync_lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+        self.pool = get_pool(db_file)
+        with self.pool.writer() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS indexed_payments (
+                    tx_hash TEXT PRIMARY KEY,
+                    from_address TEXT NOT NULL,
+                    amount_wei TEXT NOT NULL,
+                    amount_eth REAL NOT NULL,
+                    block_number INTEGER NOT NULL,
+                    block_time INTEGER NOT NULL
+                )
+            ''')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_payments_sender_time
+                ON indexed_payments(from_address, block_time, tx_hash)
+            ''')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_payments_time
+                ON indexed_payments(block_time, tx_hash)
+            ''')
+            # One row per indexed address
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS payment_index_checkpoints (
+                    payment_address TEXT PRIMARY KEY,
+                    last_block INTEGER NOT NULL
+                )
+            ''')
+
+    def checkpoint(self) -> Optional[int]:
+        """Last block indexed (None before the first sync)"""
+        row = self.pool.reader().execute(
+            'SELECT last_block FROM payment_index_checkpoints WHERE payment_address = ?',
+            (self.payment_address,)
+        ).fetchone()
+        return row['last_block'] if row else None
+
+    def sync(self, max_blocks: int = None) -> int:
+        """
+        Index blocks from the checkpoint up to head - REORG_DEPTH
+
+        Args:
+            max_blocks: Stop after this many blocks (default: catch up fully)
+
+        Returns:
+            Number of blocks indexed
+        """
+        with self._sync_lock:
+            target = self.w3.eth.block_number - REORG_DEPTH
+            last = self.checkpoint()
+            if last is None:
+                start = self.start_block if self.start_block is not None else target - self.lookback_blocks + 1
+                last = max(start, 0) - 1
+
+            if max_blocks is not None:
+                target = min(target, last + max_blocks)
+
+            indexed = 0
+            while last < target:
+                end = min(last + self.batch_blocks, target)
+                self._index_range(last + 1, end)
+                indexed += end - last
+                last = end
+
+            if indexed:
+                logger.info(f"Payment index at block {last} (+{indexed} blocks)")
+            return indexed
+
+    def _index_range(self, first: int, last: int):
+        """Fetch blocks first..last and store matches with the new checkpoint"""
+        rows = []
+        for number in range(first, last + 1):
+            block = self.w3.eth.get_block(number, full_transactions=True)
+            for tx in block['transactions']:
+                if not tx.get('to') or tx['to'].lower() != self.payment_address or not tx['value']:
+                    continue
+                # A reverted transfer moves no ETH
+                receipt = self.w3.eth.get_transaction_receipt(tx['hash'])
+                if receipt['status'] != 1:
+                    continue
+                tx_hash = tx['hash'].hex() if isinstance(tx['hash'], bytes) else tx['hash']
+                rows.append((
+                    tx_hash.lower(),
+                    tx['from'].lower(),
+                    str(tx['value']),
+                    float(Web3.from_wei(tx['value'], 'ether')),
+                    number,
+                    block['timestamp']
+                ))
+
+        with self.pool.writer() as conn:
+            conn.executemany('''
+                INSERT OR IGNORE INTO indexed_payments
+                (tx_hash, from_address, amount_wei, amount_eth, block_number, block_time)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', rows)
+            conn.execute('''
+                INSERT INTO payment_index_checkpoints (payment_address, last_block) VALUES (?, ?)
+                ON CONFLICT(payment_address) DO UPDATE SET last_block = excluded.last_block
+            ''', (self.payment_address, last))
+
+    def payments(
+        self,
+        from_address: str = None,
+        since: float = None,
+        until: float = None,
+        limit: int = 50,
+        cursor: str = None
+    ) -> Tuple[List[Dict], Optional[str]]:
+        """
+        One page of indexed payments, newest first
+
+        Args:
+            from_address: Only payments from this sender
+            since: Unix time lower bound (inclusive)
+            until: Unix time upper bound (exclusive)
+            limit: Rows per page (capped at MAX_PAGE_SIZE)
+            cursor: next_cursor of the previous page
+
+        Returns:
+            (payments, next_cursor) - next_cursor is None on the last page
+
+        Raises:
+            ValueError: malformed cursor
+        """
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        clauses, params = [], []
+        if from_address:
+            clauses.append('from_address = ?')
+            params.append(from_address.lower())
+        if since is not None:
+            clauses.append('block_time >= ?')
+            params.append(int(since))
+        if until is not None:
+            clauses.append('block_time < ?')
+            params.append(int(until))
+        if cursor is not None:
+            clauses.append('(block_time, tx_hash) < (?, ?)')
+            params.extend(decode_cursor(cursor))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+
+        rows = self.pool.reader().execute(f'''
+            SELECT tx_hash, from_address, amount_eth, block_number, block_time
+            FROM indexed_payments {where}
+            ORDER BY block_time DESC, tx_hash DESC
+            LIMIT ?
+        ''', params + [limit + 1]).fetchall()
+
+        next_cursor = None
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            next_cursor = encode_cursor(last['block_time'], last['tx_hash'])
+
+        return [{
+            'tx_hash': row['tx_hash'],
+            'from_address': row['from_address'],
+            'amount_eth': row['amount_eth'],
+            'block_number': row['block_number'],
+            'timestamp': datetime.fromtimestamp(row['block_time'], timezone.utc).isoformat()
+        } for row in rows[:limit]], next_cursor
+
+    def start(self):
+        """Keep the index synced in the background (no-op if already running)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='payment-indexer', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.sync_interval + 1)
+
+    def is_running(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.sync(max_blocks=self.batch_blocks)
+            except Exception as e:
+                logger.error(f"Payment index sync failed: {e}")
+            self._stop.wait(self.sync_interval)
@@ -0,0 +1,262 @@
+"""
+Payment Confirmation Tracker
+Follows new block heads and completes premium payouts once payments confirm
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+from web3.exceptions import TransactionNotFound
+
+from payment_verifier import MIN_CONFIRMATIONS
+
+logger = logging.getLogger(__name__)
+
+
+class PaymentConfirmationTracker:
+    """
+    Pending premium payments, confirmed in the background
+
+    Instead of every agent polling /request-premium (three or four RPCs per
+    try), a payment that is not yet confirmed is registered here once. A
+    daemon thread follows the chain head: each new block is fetched once and
+    its transaction hashes are matched against every pending payment in one
+    set lookup, so the RPC cost per block does not grow with the number of
+    waiting payments. When a payment has MIN_CONFIRMATIONS it is verified in
+    full (recipient, amount, status) and `on_confirmed` runs - typically the
+    payout.
+
+    Status lifecycle: pending -> confirming -> confirmed / failed / expired
+    """
+
+    def __init__(
+        self,
+        verifier,
+        poll_interval: float = 4.0,
+        timeout: float = 900.0,
+        max_blocks_per_poll: int = 50,
+        max_finished: int = 10000
+    ):
+        """
+        Args:
+            verifier: PaymentVerifier used for the final check (and its w3)
+            poll_interval: Seconds between chain head checks
+            timeout: Seconds before a payment never seen in a block expires
+            max_blocks_per_poll: Blocks fetched per poll before falling back
+                to per-payment receipt lookups
+            max_finished: Finished payments kept for status polling
+        """
+        self.verifier = verifier
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.max_blocks_per_poll = max_blocks_per_poll
+        self.max_finished = max_finished
+
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._finished = OrderedDict()
+        self._last_head = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def watch(
+        self,
+        tx_hash: str,
+        expected_amount_eth: float,
+        on_confirmed: Callable[[Dict], Optional[Dict]],
+        on_failed: Callable[[Dict], None] = None,
+        block_number: int = None,
+        meta: Dict = None
+    ) -> Dict:
+        """
+        Register a payment to complete once it confirms
+
+        Args:
+            tx_hash: Payment transaction hash
+            expected_amount_eth: Amount the payment must cover
+            on_confirmed: Called with the verification result; its return
+                value is kept as the entry's 'payout'
+            on_failed: Called with the entry status if the payment fails or expires
+            block_number: Block the payment was mined in, if already known
+            meta: Extra data kept with the entry
+
+        Returns:
+            Current status (an already-tracked hash is not registered twice)
+        """
+        key = tx_hash.lower()
+        with self._lock:
+            if key not in self._pending and key not in self._finished:
+                self._pending[key] = {
+                    'tx_hash': tx_hash,
+                    'status': 'confirming' if block_number is not None else 'pending',
+                    'expected_amount_eth': expected_amount_eth,
+                    'block_number': block_number,
+                    'checked': block_number is not None,
+                    'created_at': time.time(),
+                    'error': None,
+                    'payout': None,
+                    'meta': meta or {},
+                    'on_confirmed': on_confirmed,
+                    'on_failed': on_failed
+                }
+        self.start()
+        return self.status(tx_hash)
+
+    def status(self, tx_hash: str) -> Optional[Dict]:
+        """Get public state of a tracked payment (None if unknown)"""
+        key = tx_hash.lower()
+        with self._lock:
+            entry = self._pending.get(key) or self._finished.get(key)
+            if not entry:
+                return None
+            return {k: v for k, v in entry.items() if k not in ('on_confirmed', 'on_failed', 'checked', 'meta')}
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def start(self):
+        """Start the head-following thread (no-op if already running)"""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='payment-tracker', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.poll_interval + 1)
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.poll_once()
+            except Exception as e:
+                logger.error(f"Payment tracker poll failed: {e}")
+
+    def poll_once(self):
+        """Scan new blocks for pending payments and settle confirmed ones"""
+        with self._lock:
+            pending = list(self._pending.values())
+        if not pending:
+            # Idle: stop following the chain until something is registered
+            self._last_head = None
+            return
+
+        w3 = self.verifier.w3
+        head = w3.eth.block_number
+
+        unseen = [e for e in pending if e['block_number'] is None]
+        first = head - self.max_blocks_per_poll + 1
+        if self._last_head is not None:
+            first = max(first, self._last_head + 1)
+        else:
+            first = head + 1
+
+        # A long gap (or first poll) is covered by one receipt lookup per payment
+        gap = self._last_head is None or first > self._last_head + 1
+        for entry in unseen:
+            if gap or not entry['checked']:
+                entry['block_number'] = self._receipt_block(w3, entry['tx_hash'])
+                entry['checked'] = True
+
+        unseen = [e for e in unseen if e['block_number'] is None]
+        if unseen:
+            waiting = {e['tx_hash'].lower(): e for e in unseen}
+            for number in range(first, head + 1):
+                block = w3.eth.get_block(number)
+                for tx in block['transactions']:
+                    tx_hash = tx.hex() if isinstance(tx, bytes) else str(tx)
+                    entry = waiting.pop(tx_hash.lower(), None)
+                    if entry:
+                        entry['block_number'] = number
+                if not waiting:
+                    break
+
+        self._last_head = head
+
+        now = time.time()
+        for entry in pending:
+            if entry['block_number'] is None:
+                if now - entry['created_at'] > self.timeout:
+                    entry['error'] = 'Payment not seen on chain before timeout'
+                    self._finish(entry, 'expired')
+                continue
+
+            entry['status'] = 'confirming'
+            if head - entry['block_number'] >= MIN_CONFIRMATIONS:
+                self._settle(entry)
+
+    def _receipt_block(self, w3, tx_hash: str) -> Optional[int]:
+        try:
+            receipt = w3.eth.get_transaction_receipt(tx_hash)
+        except TransactionNotFound:
+            return None
+        return receipt['blockNumber'] if receipt else None
+
+    def _settle(self, entry: Dict):
+        """Verify a confirmed payment in full and run its callback"""
+        result = self.verifier.verify_payment(entry['tx_hash'], entry['expected_amount_eth'])
+
+        if result.get('verified'):
+            try:
+                entry['payout'] = entry['on_confirmed'](result)
+            except Exception as e:
+                logger.error(f"Payout for payment {entry['tx_hash']} failed: {e}")
+                entry['error'] = f'Payout failed: {e}'
+                self._finish(entry, 'failed')
+                return
+            self._finish(entry, 'confirmed')
+            logger.info(f"Payment confirmed: {entry['tx_hash']}")
+        elif result.get('pending'):
+            # Reorged out (or node lagging): look for it again
+            entry['block_number'] = result.get('block_number')
+            entry['checked'] = entry['block_number'] is not None
+        else:
+            entry['error'] = result.get('error')
+            self._finish(entry, 'failed')
+            logger.warning(f"Payment failed verification: {entry['tx_hash']} ({entry['error']})")
+
+    def _finish(self, entry: Dict, status: str):
+        key = entry['tx_hash'].lower()
+        with self._lock:
+            self._pending.pop(key, None)
+            entry['status'] = status
+            entry['finished_at'] = time.time()
+            self._finished[key] = entry
+            while len(self._finished) > self.max_finished:
+                self._finished.popitem(last=False)
+
+        if status != 'confirmed' and entry['on_failed']:
+            try:
+                entry['on_failed'](self.status(entry['tx_hash']))
+            except Exception as e:
+                logger.error(f"on_failed callback failed for {entry['tx_hash']}: {e}")
+
+
+class MockPaymentConfirmationTracker(PaymentConfirmationTracker):
+    """
+    Mock tracker for MockPaymentVerifier (no chain to follow)
+
+    Each poll simply re-verifies every pending payment.
+    """
+
+    def __init__(self, verifier, poll_interval: float = 2.0, timeout: float = 900.0):
+        super().__init__(verifier, poll_interval=poll_interval, timeout=timeout)
+
+    def poll_once(self):
+        with self._lock:
+            pending = list(self._pending.values())
+
+        now = time.time()
+        for entry in pending:
+            if now - entry['created_at'] > self.timeout:
+                entry['error'] = 'Payment not seen on chain before timeout'
+                self._finish(entry, 'expired')
+                continue
+            self._settle(entry)
@@ -3,23 +3,33 @@ Payment Verification Module
 Verifies ETH payments for premium tier access
 """
 
-from web3 import Web3
+from web3 import Web3, AsyncWeb3
+from web3.exceptions import TransactionNotFound
 import logging
+import time
 from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from payment_index import PaymentIndexer
 
 logger = logging.getLogger(__name__)
 
+# Blocks mined on top of the payment's block before it counts
+MIN_CONFIRMATIONS = 1
+
 
 class PaymentVerifier:
     """Verify ETH payments for premium faucet access"""
 
-    def __init__(self, payment_address: str, rpc_url: str = None):
+    def __init__(self, payment_address: str, rpc_url: str = None, index_db: str = None):
         """
         Initialize payment verifier
 
         Args:
             payment_address: Faucet payment receiving address
             rpc_url: Optional Sepolia RPC URL for real verification
+            index_db: SQLite path for the local payment index
+                (get_recent_payments returns [] without one)
         """
         self.payment_address = payment_address
         self.rpc_url = rpc_url
@@ -32,6 +42,13 @@ class PaymentVerifier:
         else:
             self.w3 = None
 
+        # Async client for the ASGI server, created on first use
+        self.async_w3 = None
+
+        self.indexer = None
+        if self.w3 and index_db:
+            self.indexer = PaymentIndexer(self.w3, payment_address, db_file=index_db)
+
         logger.info(f"Payment verifier initialized: {payment_address}")
 
     def verify_payment(self, tx_hash: str, expected_amount_eth: float = 0.001) -> dict:
@@ -43,99 +60,190 @@ class PaymentVerifier:
             expected_amount_eth: Expected payment amount in ETH
 
         Returns:
-            dict with verification result and details
+            dict with verification result and details; a payment that is
+            not mined or not yet confirmed has 'pending': True
         """
         if not self.w3:
             # No RPC - can't verify
             return {
                 'verified': False,
+                'retryable': True,
                 'error': 'No RPC configured - cannot verify payment'
             }
 
         try:
             # Get transaction details
-            tx = self.w3.eth.get_transaction(tx_hash)
+            try:
+                tx = self.w3.eth.get_transaction(tx_hash)
+            except TransactionNotFound:
+                tx = None
 
             if not tx:
-                return {'verified': False, 'error': 'Transaction not found'}
-
-            # Check recipient
-            if tx['to'].lower() != self.payment_address.lower():
-                return {
-                    'verified': False,
-                    'error': f'Payment sent to wrong address: {tx["to"]}'
-                }
-
-            # Check amount
-            amount_eth = self.w3.from_wei(tx['value'], 'ether')
-            if amount_eth < expected_amount_eth:
-                return {
-                    'verified': False,
-                    'error': f'Insufficient payment: {amount_eth} ETH (need {expected_amount_eth} ETH)'
-                }
+                return self._pending('Transaction not found')
+
+            error = self._check_transaction(tx, expected_amount_eth)
+            if error:
+                return error
+
+            if tx.get('blockNumber') is None:
+                return self._pending('Transaction not mined yet')
 
             # Check confirmation
             receipt = self.w3.eth.get_transaction_receipt(tx_hash)
-            if receipt['status'] != 1:
-                return {'verified': False, 'error': 'Transaction failed'}
-
             current_block = self.w3.eth.block_number
-            confirmations = current_block - receipt['blockNumber']
 
-            if confirmations < 1:
-                return {
-                    'verified': False,
-                    'error': f'Need at least 1 confirmation (current: {confirmations})'
-                }
+            return self._check_receipt(tx, receipt, current_block)
 
-            # All checks passed
+        except Exception as e:
+            logger.error(f"Payment verification error: {e}")
+            # RPC trouble says nothing about the payment, so it may be retried
+            return {'verified': False, 'retryable': True, 'error': str(e)}
+
+    async def verify_payment_async(self, tx_hash: str, expected_amount_eth: float = 0.001) -> dict:
+        """Async version of verify_payment for the ASGI server"""
+        if not self.rpc_url:
+            # No RPC - can't verify
             return {
-                'verified': True,
-                'amount_eth': float(amount_eth),
-                'from_address': tx['from'],
-                'confirmations': confirmations,
-                'block_number': receipt['blockNumber']
+                'verified': False,
+                'retryable': True,
+                'error': 'No RPC configured - cannot verify payment'
             }
 
+        try:
+            if self.async_w3 is None:
+                self.async_w3 = AsyncWeb3(AsyncWeb3.AsyncHTTPProvider(self.rpc_url))
+
+            # Get transaction details
+            try:
+                tx = await self.async_w3.eth.get_transaction(tx_hash)
+            except TransactionNotFound:
+                tx = None
+
+            if not tx:
+                return self._pending('Transaction not found')
+
+            error = self._check_transaction(tx, expected_amount_eth)
+            if error:
+                return error
+
+            if tx.get('blockNumber') is None:
+                return self._pending('Transaction not mined yet')
+
+            # Check confirmation
+            receipt = await self.async_w3.eth.get_transaction_receipt(tx_hash)
+            current_block = await self.async_w3.eth.block_number
+
+            return self._check_receipt(tx, receipt, current_block)
+
         except Exception as e:
             logger.error(f"Payment verification error: {e}")
-            return {'verified': False, 'error': str(e)}
+            # RPC trouble says nothing about the payment, so it may be retried
+            return {'verified': False, 'retryable': True, 'error': str(e)}
 
-    def get_recent_payments(self, from_address: str = None, hours: int = 24) -> list:
+    def _check_transaction(self, tx, expected_amount_eth: float) -> dict:
+        """Check recipient and amount; returns an error result or None"""
+        # Check recipient
+        if tx['to'].lower() != self.payment_address.lower():
+            return {
+                'verified': False,
+                'error': f'Payment sent to wrong address: {tx["to"]}'
+            }
+
+        # Check amount
+        amount_eth = Web3.from_wei(tx['value'], 'ether')
+        if amount_eth < expected_amount_eth:
+            return {
+                'verified': False,
+                'error': f'Insufficient payment: {amount_eth} ETH (need {expected_amount_eth} ETH)'
+            }
+
+        return None
+
+    def _check_receipt(self, tx, receipt, current_block: int) -> dict:
+        """Check the receipt status and confirmations; returns the final result"""
+        if receipt['status'] != 1:
+            return {'verified': False, 'error': 'Transaction failed'}
+
+        confirmations = current_block - receipt['blockNumber']
+
+        if confirmations < MIN_CONFIRMATIONS:
+            return self._pending(
+                f'Need at least {MIN_CONFIRMATIONS} confirmation (current: {confirmations})',
+                block_number=receipt['blockNumber']
+            )
+
+        # All checks passed
+        return {
+            'verified': True,
+            'amount_eth': float(Web3.from_wei(tx['value'], 'ether')),
+            'from_address': tx['from'],
+            'confirmations': confirmations,
+            'block_number': receipt['blockNumber']
+        }
+
+    def _pending(self, error: str, block_number: int = None) -> dict:
+        """Result for a payment that may still confirm (see PaymentConfirmationTracker)"""
+        return {
+            'verified': False,
+            'pending': True,
+            'error': error,
+            'block_number': block_number
+        }
+
+    def get_recent_payments(
+        self,
+        from_address: str = None,
+        hours: int = 24,
+        limit: int = 50,
+        cursor: str = None
+    ) -> Tuple[list, Optional[str]]:
         """
-        Get recent payments to faucet
+        Get recent payments to faucet, one page at a time
 
         Args:
             from_address: Optional filter by sender
             hours: Look back this many hours
+            limit: Payments per page (capped at MAX_PAGE_SIZE)
+            cursor: next_cursor of the previous page
 
         Returns:
-            List of payment transactions
+            (payments, next_cursor) - newest first; next_cursor is None on the last page
+
+        Raises:
+            ValueError: malformed cursor
         """
-        if not self.w3:
-            return []
+        if not self.indexer:
+            return [], None
 
         try:
-            current_block = self.w3.eth.block_number
-            # Rough estimate: 12s per block on Sepolia
-            blocks_per_hour = 300
-            from_block = current_block - (blocks_per_hour * hours)
-
-            # This is simplified - in production use event logs
-            # For now just return empty list
-            return []
-
+            # Only blocks since the last checkpoint are fetched; the lookup
+            # itself is served from the local index. Without the background
+            # indexer at most one batch is synced here, so a cold index
+            # catches up over several calls instead of inside one.
+            if not self.indexer.is_running():
+                self.indexer.sync(max_blocks=self.indexer.batch_blocks)
         except Exception as e:
-            logger.error(f"Error fetching recent payments: {e}")
-            return []
+            logger.error(f"Payment index sync failed, serving indexed payments: {e}")
+
+        return self.indexer.payments(
+            from_address=from_address, since=time.time() - hours * 3600, limit=limit, cursor=cursor
+        )
 
 
 class MockPaymentVerifier(PaymentVerifier):
     """Mock payment verifier for testing"""
 
-    def __init__(self):
-        """Initialize mock verifier"""
+    def __init__(self, confirm_after: float = 15.0):
+        """
+        Initialize mock verifier
+
+        Args:
+            confirm_after: Seconds before a "0xPENDING" payment confirms
+        """
         self.payment_address = "0x0000000000000000000000000000000000000001"
+        self.confirm_after = confirm_after
+        self.indexer = None
+        self._first_seen = {}
         logger.info("Mock payment verifier initialized")
 
     def verify_payment(self, tx_hash: str, expected_amount_eth: float = 0.001) -> dict:
@@ -144,13 +252,22 @@ class MockPaymentVerifier(PaymentVerifier):
 
         Rules:
         - Any tx hash starting with "0xPAID" is considered valid payment
+        - "0xPENDING" hashes stay pending for `confirm_after` seconds after
+          they are first seen, then verify like "0xPAID"
         - Otherwise returns verification failure
         """
         if not tx_hash.startswith('0x'):
             return {'verified': False, 'error': 'Invalid transaction hash format'}
 
+        paid = tx_hash[2:].upper().startswith('PAID')
+        if tx_hash[2:].upper().startswith('PENDING'):
+            first_seen = self._first_seen.setdefault(tx_hash, time.time())
+            if time.time() - first_seen < self.confirm_after:
+                return self._pending('Mock payment not confirmed yet', block_number=123456)
+            paid = True
+
         # Accept special mock payment hashes (case-insensitive after 0x)
-        if tx_hash.startswith('0x') and tx_hash[2:].upper().startswith('PAID'):
+        if paid:
             logger.info(f"[MOCK] Payment verified: {tx_hash}")
             return {
                 'verified': True,
@@ -166,6 +283,16 @@ class MockPaymentVerifier(PaymentVerifier):
             'error': 'Mock payment not recognized. Use tx hash starting with "0xPAID" for testing.'
         }
 
-    def get_recent_payments(self, from_address: str = None, hours: int = 24) -> list:
-        """Mock recent payments - return empty list"""
-        return []
+    async def verify_payment_async(self, tx_hash: str, expected_amount_eth: float = 0.001) -> dict:
+        """Mock payment verification (same rules as verify_payment)"""
+        return self.verify_payment(tx_hash, expected_amount_eth)
+
+    def get_recent_payments(
+        self,
+        from_address: str = None,
+        hours: int = 24,
+        limit: int = 50,
+        cursor: str = None
+    ) -> Tuple[list, Optional[str]]:
+        """Mock recent payments - always an empty last page"""
+        return [], None
@@ -0,0 +1,178 @@
+"""
+Rate Limiter
+Token-bucket request admission by agent, wallet and client IP,
+in memory or shared between workers through SQLite
+"""
+
+import asyncio
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from db_pool import get_pool
+
+logger = logging.getLogger(__name__)
+
+# Per dimension: (tokens refilled per second, bucket size)
+DEFAULT_LIMITS = {
+    'ip': (1.0, 30),
+    'agent': (5 / 60, 5),
+    'wallet': (5 / 60, 5),
+}
+
+# Rows of idle (full again) buckets are purged every this many writes
+PURGE_EVERY = 1000
+
+
+def retry_after_header(seconds: float) -> str:
+    """Retry-After value: whole seconds, rounded up"""
+    return str(max(1, math.ceil(seconds)))
+
+
+def forwarded_client(forwarded_for: Optional[str], trusted_proxies: int) -> Optional[str]:
+    """
+    Client address from X-Forwarded-For behind `trusted_proxies` proxies
+
+    Each proxy appends the address it received the request from, so only
+    the last `trusted_proxies` entries are trustworthy; anything left of
+    them was written by the client. Same rule as werkzeug's ProxyFix(x_for=n).
+
+    Returns:
+        The address the outermost trusted proxy saw, or None if the header
+        has fewer entries than there are proxies (use the peer address)
+    """
+    if not forwarded_for or trusted_proxies < 1:
+        return None
+    hops = [hop.strip() for hop in forwarded_for.split(',')]
+    if len(hops) < trusted_proxies:
+        return None
+    return hops[-trusted_proxies] or None
+
+
+class TokenBucketLimiter:
+    """
+    Admission control in front of the faucet routes
+
+    Every request takes one token from each of its buckets (one per
+    dimension: client IP, agent name, wallet). A bucket holds up to `burst`
+    tokens and refills at `rate` per second, so short bursts pass and
+    sustained floods are cut to the refill rate. Either all buckets have a
+    token and all are charged, or the request is refused with the time
+    until the emptiest one refills - nothing else (DB, Moltbook, RPC) runs.
+
+    In memory the buckets are per process, at most `max_keys` of them
+    (least recently used dropped - a dropped bucket comes back full). With
+    `db_file` they live in a `rate_buckets` table instead, updated in one
+    write transaction per request, so gunicorn workers share the limits.
+    """
+
+    def __init__(
+        self,
+        limits: Dict[str, Tuple[float, float]] = None,
+        db_file: str = None,
+        max_keys: int = 100000,
+        clock: Callable[[], float] = time.time
+    ):
+        self.limits = limits or DEFAULT_LIMITS
+        self.max_keys = max_keys
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        # bucket key -> (tokens, updated_at)
+        self._buckets: 'OrderedDict[str, Tuple[float, float]]' = OrderedDict()
+        self._writes = 0
+
+        self.pool = None
+        if db_file:
+            self.pool = get_pool(db_file)
+            with self.pool.writer() as conn:
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS rate_buckets (
+                        bucket_key TEXT PRIMARY KEY,
+                        tokens REAL NOT NULL,
+                        updated_at REAL NOT NULL
+                    ) WITHOUT ROWID
+                ''')
+
+    def acquire(self, **identity: Optional[str]) -> float:
+        """
+        Take one token from each bucket of a request
+
+        Args:
+            identity: Dimension values, e.g. ip='1.2.3.4', agent='Galeon',
+                wallet='0x...'; unknown dimensions and empty values are ignored
+
+        Returns:
+            0 if admitted, otherwise seconds until the request would be
+        """
+        keys = {
+            f'{dimension}:{value}': self.limits[dimension]
+            for dimension, value in identity.items()
+            if value and dimension in self.limits
+        }
+        if not keys:
+            return 0.0
+
+        if self.pool:
+            return self._acquire_persistent(keys)
+
+        with self._lock:
+            now = self.clock()
+            state = {key: self._buckets.get(key) for key in keys}
+            retry_after, updated = self._take(keys, state, now)
+            for key, bucket in updated.items():
+                self._buckets[key] = bucket
+                self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return retry_after
+
+    async def acquire_async(self, **identity: Optional[str]) -> float:
+        """acquire for the event loop (the SQLite backend runs in a thread)"""
+        if self.pool:
+            return await asyncio.to_thread(lambda: self.acquire(**identity))
+        return self.acquire(**identity)
+
+    def _acquire_persistent(self, keys: Dict[str, Tuple[float, float]]) -> float:
+        placeholders = ', '.join('?' for _ in keys)
+        with self.pool.writer() as conn:
+            now = self.clock()
+            rows = conn.execute(
+                f'SELECT bucket_key, tokens, updated_at FROM rate_buckets WHERE bucket_key IN ({placeholders})',
+                tuple(keys)
+            ).fetchall()
+            state = {key: None for key in keys}
+            state.update({row['bucket_key']: (row['tokens'], row['updated_at']) for row in rows})
+
+            retry_after, updated = self._take(keys, state, now)
+            if updated:
+                conn.executemany(
+                    'INSERT OR REPLACE INTO rate_buckets (bucket_key, tokens, updated_at) VALUES (?, ?, ?)',
+                    [(key, tokens, updated_at) for key, (tokens, updated_at) in updated.items()]
+                )
+
+            self._writes += 1
+            if self._writes % PURGE_EVERY == 0:
+                # A bucket idle this long has refilled completely
+                idle = max(burst / rate for rate, burst in self.limits.values())
+                conn.execute('DELETE FROM rate_buckets WHERE updated_at < ?', (now - idle,))
+        return retry_after
+
+    def _take(self, keys, state, now: float):
+        """Refill and charge buckets; returns (retry_after, buckets to store)"""
+        refilled = {}
+        retry_after = 0.0
+        for key, (rate, burst) in keys.items():
+            bucket = state.get(key)
+            tokens = burst if bucket is None else min(burst, bucket[0] + (now - bucket[1]) * rate)
+            refilled[key] = tokens
+            if tokens < 1:
+                retry_after = max(retry_after, (1 - tokens) / rate)
+
+        if retry_after:
+            # Refused requests don't touch the buckets
+            return retry_after, {}
+        return 0.0, {key: (tokens - 1, now) for key, tokens in refilled.items()}
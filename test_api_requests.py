@@ -0,0 +1,45 @@
+"""
+/api/requests endpoint tests (Flask app, mock faucet)
+"""
+
+import importlib
+import json
+
+import pytest
+
+WALLET = '0x742d35Cc6634C0532925a3b844Bc9e7595f0bEb1'
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    import app
+    app = importlib.reload(app)
+    for i in range(12):
+        app.db.record_request(f'agent{i % 2}', WALLET, 'Testing', 10, f'0x{i:064x}')
+    yield app.app.test_client()
+    app.balance_poller.stop()
+
+
+def test_pages_and_filters(client):
+    first = client.get('/api/requests?limit=5').get_json()
+    assert len(first['requests']) == 5
+    second = client.get(f"/api/requests?limit=5&cursor={first['next_cursor']}").get_json()
+    assert not {r['id'] for r in first['requests']} & {r['id'] for r in second['requests']}
+
+    agent = client.get('/api/requests?agent=agent1&limit=100').get_json()
+    assert len(agent['requests']) == 6
+    assert agent['next_cursor'] is None
+
+    assert client.get('/api/requests?cursor=garbage').status_code == 400
+    assert client.get('/api/requests?since=yesterday').status_code == 400
+    assert client.get('/api/requests?since=2000-01-01T00:00:00Z').get_json()['requests']
+
+
+def test_ndjson_export(client):
+    response = client.get('/api/requests?format=ndjson&wallet=' + WALLET)
+    assert response.mimetype == 'application/x-ndjson'
+
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert len(rows) == 12
+    assert rows[0]['id'] > rows[-1]['id']
@@ -0,0 +1,180 @@
+"""
+ASGI server tests (mock mode)
+"""
+
+import importlib
+
+import pytest
+
+pytest.importorskip('httpx')
+from starlette.testclient import TestClient
+
+WALLET = '0x742d35Cc6634C0532925a3b844Bc9e7595f0bEb1'
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('MOCK_MODE', '1')
+    import asgi_app
+    asgi_app = importlib.reload(asgi_app)
+    with TestClient(asgi_app.app) as client:
+        yield client
+
+
+def test_free_tier_then_cooldown(client):
+    body = {'agent_name': 'AsyncAgent', 'wallet_address': WALLET, 'reason': 'testing'}
+
+    response = client.post('/request', json=body)
+    assert response.status_code == 200
+    assert response.json()['tx_hash'].startswith('0x')
+
+    response = client.post('/request', json=body)
+    assert response.status_code == 429
+
+
+def test_premium_requires_payment(client):
+    body = {'agent_name': 'PayingAgent', 'wallet_address': WALLET}
+
+    response = client.post('/request-premium', json={**body, 'payment_tx': '0xNOTPAID'})
+    assert response.status_code == 402
+
+    response = client.post('/request-premium', json={**body, 'payment_tx': '0xPAID123'})
+    assert response.status_code == 200
+    assert response.json()['tier'] == 'premium'
+
+
+def test_deposit_then_spend_balance(client):
+    response = client.post('/deposit', json={
+        'agent_name': 'DepositAgent', 'amount_eth': 0.002, 'deposit_tx': '0xDEPOSIT1'
+    })
+    assert response.status_code == 200
+
+    response = client.get('/balance', params={'agent_name': 'DepositAgent'})
+    assert response.json()['balance'] == pytest.approx(0.002)
+
+    body = {'agent_name': 'DepositAgent', 'wallet_address': WALLET}
+    assert client.post('/request-premium-balance', json=body).status_code == 200
+    assert client.post('/request-premium-balance', json=body).status_code == 200
+    assert client.post('/request-premium-balance', json=body).status_code == 402
+
+
+def test_missing_fields(client):
+    assert client.post('/request', json={}).status_code == 400
+    assert client.get('/balance').status_code == 400
+
+
+def test_health_and_ready(client):
+    health = client.get('/health').json()
+    assert health['status'] == 'healthy'
+    assert 'faucet_balance_stale' in health
+
+    import asgi_app
+    asgi_app.balance_poller.refresh()
+    response = client.get('/ready')
+    assert response.status_code == 200
+    assert response.json()['checks'] == {'faucet_balance': True, 'database': True}
+
+
+def test_pending_premium_payment_paid_out_by_tracker(client):
+    import asgi_app
+    asgi_app.payment_tracker.stop()
+    body = {'agent_name': 'PendingAgent', 'wallet_address': WALLET, 'payment_tx': '0xPENDING42'}
+
+    response = client.post('/request-premium', json=body)
+    assert response.status_code == 202
+    assert response.json()['status_url'] == '/payment/0xPENDING42'
+    assert client.get('/payment/0xPENDING42').json()['status'] == 'confirming'
+
+    asgi_app.payment_verifier.confirm_after = 0
+    asgi_app.payment_tracker.poll_once()
+
+    payment = client.get('/payment/0xPENDING42').json()
+    assert payment['status'] == 'confirmed'
+    assert payment['payout']['tx_hash'].startswith('0x')
+    assert client.get('/payment/0xUNKNOWN').status_code == 404
+    assert client.get('/payments?from_address=0xabc').json() == {'success': True, 'payments': [], 'next_cursor': None}
+    assert client.get('/payments?hours=day').status_code == 400
+
+
+def test_payment_replay_rejected_without_rpc(client):
+    import asgi_app
+    calls = []
+    verify = asgi_app.payment_verifier.verify_payment_async
+
+    async def counting_verify(tx_hash, expected_amount_eth=0.001):
+        calls.append(tx_hash)
+        return await verify(tx_hash, expected_amount_eth)
+
+    asgi_app.payment_verifier.verify_payment_async = counting_verify
+    body = {'agent_name': 'ReplayAgent', 'wallet_address': WALLET, 'payment_tx': '0xPAIDREPLAY'}
+
+    first = client.post('/request-premium', json=body)
+    assert first.status_code == 200
+
+    replay = client.post('/request-premium', json={**body, 'agent_name': 'OtherAgent'})
+    assert replay.status_code == 409
+    assert replay.json()['payout_tx'] == first.json()['tx_hash']
+
+    bad = {**body, 'payment_tx': '0xNOTPAID'}
+    assert client.post('/request-premium', json=bad).status_code == 402
+    assert client.post('/request-premium', json=bad).status_code == 402
+
+    assert calls == ['0xPAIDREPLAY', '0xNOTPAID']
+
+
+def test_idempotency_key_replays_payout(client):
+    body = {'agent_name': 'RetryAgent', 'wallet_address': WALLET, 'reason': 'testing'}
+    headers = {'Idempotency-Key': 'retry-1'}
+
+    first = client.post('/request', json=body, headers=headers)
+    retry = client.post('/request', json=body, headers=headers)
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.json()['tx_hash'] == first.json()['tx_hash']
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+
+    # Without the key the cooldown applies as usual
+    assert client.post('/request', json=body).status_code == 429
+    assert client.post('/request', json={**body, 'reason': 'other'}, headers=headers).status_code == 422
+
+
+def test_idempotent_retries_not_rate_limited(client):
+    body = {'agent_name': 'PatientAgent', 'wallet_address': WALLET, 'payment_tx': '0xNOTPAID'}
+    headers = {'Idempotency-Key': 'retry-2'}
+
+    # The agent bucket admits 5 requests; replays of one key are not charged
+    statuses = [client.post('/request-premium', json=body, headers=headers).status_code for _ in range(10)]
+    assert statuses == [402] * 10
+    assert client.post('/request-premium', json=body).status_code == 402
+
+
+def test_flood_rejected_with_retry_after(client):
+    body = {'agent_name': 'FloodAgent', 'wallet_address': WALLET}
+
+    statuses = [client.post('/request-premium', json={**body, 'payment_tx': '0xNOTPAID'}).status_code for _ in range(5)]
+    assert statuses == [402] * 5
+
+    response = client.post('/request-premium', json={**body, 'payment_tx': '0xNOTPAID'})
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+
+
+def test_spoofed_forwarded_for_shares_ip_bucket(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('MOCK_MODE', '1')
+    monkeypatch.setenv('RATE_LIMIT_TRUST_PROXY', '1')
+    import asgi_app
+    asgi_app = importlib.reload(asgi_app)
+
+    with TestClient(asgi_app.app) as client:
+        # New agent and wallet each time, so only the IP bucket (burst 30) limits
+        statuses = [
+            client.post(
+                '/request-premium',
+                json={'agent_name': f'agent{i}', 'wallet_address': f'0x{i:040x}', 'payment_tx': '0xNOTPAID'},
+                headers={'X-Forwarded-For': f'10.0.{i}.1, 203.0.113.7'}
+            ).status_code
+            for i in range(31)
+        ]
+    assert statuses == [402] * 30 + [429]
@@ -0,0 +1,63 @@
+"""
+Faucet balance poller tests (mock faucet)
+"""
+
+import time
+
+from balance_poller import BalancePoller
+from blockchain import MockUSDCFaucet
+
+
+class CountingFaucet(MockUSDCFaucet):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+        self.fail = False
+
+    def get_balance(self):
+        self.calls += 1
+        if self.fail:
+            raise Exception('RPC unavailable')
+        return 1234.5
+
+
+def test_probes_read_from_memory():
+    faucet = CountingFaucet()
+    poller = BalancePoller(faucet, interval=60)
+
+    assert poller.snapshot()['stale'] is True
+
+    poller.refresh()
+    for _ in range(100):
+        snapshot = poller.snapshot()
+
+    assert snapshot['balance'] == 1234.5
+    assert snapshot['stale'] is False
+    assert snapshot['updated_at'] is not None
+    assert faucet.calls == 1
+
+
+def test_failed_refresh_keeps_last_balance_until_stale():
+    faucet = CountingFaucet()
+    poller = BalancePoller(faucet, interval=60, max_age=0.2)
+    poller.refresh()
+
+    faucet.fail = True
+    assert poller.refresh() is None
+    snapshot = poller.snapshot()
+    assert snapshot['balance'] == 1234.5
+    assert snapshot['error'] == 'RPC unavailable'
+
+    time.sleep(0.3)
+    assert poller.is_fresh() is False
+
+
+def test_background_refresh():
+    faucet = CountingFaucet()
+    poller = BalancePoller(faucet, interval=0.05)
+    poller.start()
+    time.sleep(0.3)
+    poller.stop()
+
+    assert faucet.calls >= 3
+    assert poller.is_fresh()
@@ -0,0 +1,178 @@
+"""
+Balance system tests (deposits, deductions, concurrency)
+"""
+
+import sqlite3
+import threading
+
+import balance_system
+from balance_system import BalanceSystem, eth_to_wei
+from db_pool import ConnectionPool
+
+
+def _balance_system(db_file):
+    balance_system = BalanceSystem(db_file)
+    balance_system.init_db()
+    return balance_system
+
+
+# Tables as written by the REAL-column schema
+LEGACY_SCHEMA = '''
+    CREATE TABLE agent_balances (
+        agent_name TEXT PRIMARY KEY,
+        balance_eth REAL DEFAULT 0,
+        total_deposited REAL DEFAULT 0,
+        total_spent REAL DEFAULT 0,
+        last_deposit_tx TEXT,
+        last_deposit_time DATETIME,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE deposits (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        agent_name TEXT NOT NULL,
+        amount_eth REAL NOT NULL,
+        tx_hash TEXT NOT NULL,
+        verified BOOLEAN DEFAULT FALSE,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE spending (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        agent_name TEXT NOT NULL,
+        amount_eth REAL NOT NULL,
+        service_type TEXT NOT NULL,
+        request_id INTEGER,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+    );
+'''
+
+
+def test_deduct_and_insufficient_balance(tmp_path):
+    balances = _balance_system(str(tmp_path / 'faucet.db'))
+    balances.record_deposit('Galeon', 0.5, '0xDEPOSIT1')
+
+    result = balances.deduct_balance('Galeon', 0.25)
+    assert result['success']
+    assert result['new_balance'] == 0.25
+
+    result = balances.deduct_balance('Galeon', 0.5)
+    assert not result['success']
+    assert result['current_balance'] == 0.25
+    assert result['shortfall'] == 0.25
+
+    assert not balances.deduct_balance('Nobody', 0.001)['success']
+
+
+def test_no_overdraft_under_concurrency(tmp_path):
+    db_file = str(tmp_path / 'faucet.db')
+    balances = _balance_system(db_file)
+
+    # 64 deductions' worth of balance
+    amount = 0.001
+    balances.record_deposit('Galeon', 0.064, '0xDEPOSIT1')
+
+    # Several "workers" with their own connections, as separate processes would have
+    workers = [balances]
+    for _ in range(3):
+        worker = BalanceSystem(db_file)
+        worker.pool = ConnectionPool(db_file)
+        workers.append(worker)
+
+    results = []
+    lock = threading.Lock()
+    start = threading.Barrier(300)
+
+    def spend(worker):
+        start.wait()
+        result = worker.deduct_balance('Galeon', amount)
+        with lock:
+            results.append(result['success'])
+
+    threads = [threading.Thread(target=spend, args=(workers[i % len(workers)],)) for i in range(300)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results.count(True) == 64
+    assert balances.get_balance('Galeon') == 0
+
+    reader = balances.pool.reader()
+    assert reader.execute('SELECT COUNT(*) FROM spending').fetchone()[0] == 64
+    info = balances.get_balance_info('Galeon')
+    assert info['total_spent'] == 0.064
+
+
+def test_integer_ledger_has_no_drift(tmp_path):
+    balances = _balance_system(str(tmp_path / 'faucet.db'))
+    balances.record_deposit('Galeon', 1, '0xDEPOSIT1')
+
+    for _ in range(1000):
+        assert balances.deduct_balance('Galeon', 0.001)['success']
+
+    info = balances.get_balance_info('Galeon')
+    assert info['balance_wei'] == 0
+    assert info['total_spent'] == 1.0
+    assert not info['can_use_premium']
+    assert not balances.deduct_balance('Galeon', 0.001)['success']
+
+
+def test_eth_to_wei_is_exact():
+    assert eth_to_wei(0.001) == 10 ** 15
+    assert eth_to_wei('0.1') == 10 ** 17
+    assert eth_to_wei(1) == 10 ** 18
+
+
+def test_migrates_real_columns_in_batches(tmp_path, monkeypatch):
+    db_file = str(tmp_path / 'faucet.db')
+
+    conn = sqlite3.connect(db_file)
+    conn.executescript(LEGACY_SCHEMA)
+    for i in range(25):
+        conn.execute(
+            'INSERT INTO agent_balances (agent_name, balance_eth, total_deposited, total_spent) VALUES (?, ?, ?, ?)',
+            (f'agent{i}', 0.009000000000000001, 0.01, 0.001)
+        )
+        conn.execute("INSERT INTO deposits (agent_name, amount_eth, tx_hash) VALUES (?, 0.01, '0xDEPOSIT')", (f'agent{i}',))
+        conn.execute("INSERT INTO spending (agent_name, amount_eth, service_type) VALUES (?, 0.001, 'premium_tier')", (f'agent{i}',))
+    conn.commit()
+    conn.close()
+
+    monkeypatch.setattr(balance_system, 'MIGRATION_BATCH_SIZE', 10)
+    balances = _balance_system(db_file)
+
+    info = balances.get_balance_info('agent7')
+    assert info['balance_wei'] == 9 * 10 ** 15
+    assert info['total_deposited'] == 0.01
+    assert info['total_spent'] == 0.001
+
+    reader = balances.pool.reader()
+    assert reader.execute('SELECT SUM(amount_wei) FROM deposits').fetchone()[0] == 25 * 10 ** 16
+    assert reader.execute('SELECT COUNT(*) FROM spending WHERE amount_wei IS NULL').fetchone()[0] == 0
+
+    # Legacy NOT NULL amount_eth columns keep accepting new rows
+    assert balances.deduct_balance('agent7', 0.001)['success']
+    assert balances.record_deposit('agent7', 0.5, '0xDEPOSIT2')['success']
+    assert balances.get_balance_wei('agent7') == 508 * 10 ** 15
+
+
+def test_migrated_database_keeps_native_wei_rows(tmp_path):
+    db_file = str(tmp_path / 'faucet.db')
+    conn = sqlite3.connect(db_file)
+    conn.executescript(LEGACY_SCHEMA)
+    conn.execute("INSERT INTO agent_balances (agent_name, balance_eth, total_deposited) VALUES ('Old', 0.5, 0.5)")
+    conn.commit()
+    conn.close()
+
+    balances = _balance_system(db_file)
+    assert balances.record_deposit('New', 1, '0xDEPOSIT1')['success']
+    assert balances.record_deposit('Old', 0.25, '0xDEPOSIT2')['success']
+    info = balances.get_balance_info('New')
+    assert info['balance_wei'] == 10 ** 18
+    assert info['total_spent'] == 0
+
+    # A restart must not convert the rows again
+    balances = _balance_system(db_file)
+    assert balances.get_balance_wei('New') == 10 ** 18
+    assert balances.get_balance_wei('Old') == 75 * 10 ** 16
+    assert balances.pool.reader().execute('SELECT COUNT(*) FROM wei_backfill').fetchone()[0] == 0
+
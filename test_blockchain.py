@@ -0,0 +1,167 @@
+"""
+Faucet transaction pipeline tests against a local stand-in JSON-RPC node
+"""
+
+import threading
+
+import pytest
+from web3 import Web3
+
+from blockchain import USDCFaucet
+from fake_rpc_node import FakeRPCNode
+
+TEST_PRIVATE_KEY = '0x' + '11' * 32
+RECIPIENT = '0x742d35Cc6634C0532925a3b844Bc9e7595f0bEb1'
+
+
+@pytest.fixture
+def node():
+    node = FakeRPCNode().start()
+    yield node
+    node.stop()
+
+
+@pytest.fixture
+def faucet(node):
+    faucet = USDCFaucet(TEST_PRIVATE_KEY, node.url, receipt_poll_interval=60)
+    yield faucet
+    faucet.receipt_tracker.stop()
+    faucet.gas_oracle.stop()
+
+
+def test_send_returns_before_confirmation(node, faucet):
+    tx_hash = faucet.send_usdc(RECIPIENT, 10)
+
+    assert faucet.get_transaction_status(tx_hash)['status'] == 'pending'
+
+    node.mine()
+    faucet.receipt_tracker.poll_once()
+
+    status = faucet.get_transaction_status(tx_hash)
+    assert status['status'] == 'confirmed'
+    assert status['block_number'] == node.block_number
+
+
+def test_concurrent_sends_use_distinct_nonces(node, faucet):
+    hashes = []
+    lock = threading.Lock()
+
+    def send():
+        tx_hash = faucet.send_usdc(RECIPIENT, 1)
+        with lock:
+            hashes.append(tx_hash)
+
+    threads = [threading.Thread(target=send) for _ in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(set(hashes)) == 20
+    assert sorted(node.mempool) == list(range(20))
+    # Nonce fetched from the node once, not per send
+    assert node.calls['eth_getTransactionCount'] == 1
+    assert faucet.receipt_tracker.pending_count() == 20
+
+
+def test_resync_on_nonce_too_low(node, faucet):
+    faucet.send_usdc(RECIPIENT, 1)
+    node.mine()
+
+    # Another process spends nonces 1..3 from the same wallet
+    node.use_nonces_externally(3)
+
+    tx_hash = faucet.send_usdc(RECIPIENT, 1)
+
+    assert node.transactions[tx_hash]['nonce'] == 4
+    assert node.calls['eth_getTransactionCount'] == 2
+
+
+def test_failed_send_releases_nonce(node, faucet):
+    node.fail_next_send = 'insufficient funds for gas'
+
+    with pytest.raises(Exception):
+        faucet.send_usdc(RECIPIENT, 1)
+
+    tx_hash = faucet.send_usdc(RECIPIENT, 1)
+    assert node.transactions[tx_hash]['nonce'] == 0
+
+
+def test_dropped_transaction_triggers_resync(node, faucet):
+    tx_hash = faucet.send_usdc(RECIPIENT, 1)
+    faucet.receipt_tracker.timeout = 0
+
+    # Node forgets the transaction (e.g. evicted from the mempool)
+    node.mempool.clear()
+    faucet.receipt_tracker.poll_once()
+
+    assert faucet.get_transaction_status(tx_hash)['status'] == 'dropped'
+    assert faucet.nonce_manager.next_nonce() == 0
+
+
+def test_overdue_transaction_kept_while_in_mempool(node, faucet):
+    tx_hash = faucet.send_usdc(RECIPIENT, 1)
+    faucet.receipt_tracker.timeout = 0
+
+    # Still waiting in the node's mempool past the timeout
+    faucet.receipt_tracker.poll_once()
+    assert faucet.get_transaction_status(tx_hash)['status'] == 'pending'
+    assert faucet.nonce_manager.next_nonce() == 1
+
+    node.mine()
+    faucet.receipt_tracker.poll_once()
+    assert faucet.get_transaction_status(tx_hash)['status'] == 'confirmed'
+
+
+def test_send_batch_shares_lookups(node, faucet):
+    transfers = [(RECIPIENT, i + 1) for i in range(5)]
+
+    results = faucet.send_batch(transfers)
+
+    assert all(r['tx_hash'] for r in results)
+    assert sorted(node.mempool) == list(range(5))
+    # One fee lookup and one gas estimate for the whole batch
+    assert node.calls['eth_getBlockByNumber'] == 1
+    assert node.calls['eth_estimateGas'] == 1
+    # decimals and symbol, read once at construction
+    assert node.calls['eth_call'] == 2
+
+
+def test_metadata_cached_and_calldata_encoded_directly(node, faucet):
+    assert faucet.metadata.decimals == 6
+    assert faucet.metadata.symbol == 'USDC'
+    assert faucet.metadata.chain_id == 11155111
+    faucet.send_usdc(RECIPIENT, 1)  # Warm the fee and gas limit caches
+    calls_before = dict(node.calls)
+
+    tx_hash = faucet.send_usdc(RECIPIENT, 12.5)
+
+    # Only the send itself reaches the node
+    assert {m: n - calls_before.get(m, 0) for m, n in node.calls.items() if n != calls_before.get(m, 0)} \
+        == {'eth_sendRawTransaction': 1}
+    expected = faucet.usdc_contract.encodeABI(
+        fn_name='transfer', args=[Web3.to_checksum_address(RECIPIENT), 12_500_000]
+    )
+    assert node.transactions[tx_hash]['data'] == expected
+    assert node.transactions[tx_hash]['to'] == faucet.metadata.address.lower()
+
+
+def test_fee_strategies_and_cached_gas_limit(node, faucet):
+    cheap_hash = faucet.send_usdc(RECIPIENT, 1)
+    fast_hash = faucet.send_usdc(RECIPIENT, 1, fee_strategy='fast')
+
+    cheap = node.transactions[cheap_hash]
+    fast = node.transactions[fast_hash]
+    assert cheap['fees']['maxPriorityFeePerGas'] == node.priority_fee
+    assert fast['fees']['maxPriorityFeePerGas'] > cheap['fees']['maxPriorityFeePerGas']
+    assert fast['fees']['maxFeePerGas'] > cheap['fees']['maxFeePerGas'] > node.base_fee
+    assert cheap['gas'] == fast['gas'] == int(node.transfer_gas * 1.2)
+    assert node.calls['eth_estimateGas'] == 1
+
+
+def test_legacy_gas_price_without_base_fee(node, faucet):
+    node.base_fee = None
+
+    tx_hash = faucet.send_usdc(RECIPIENT, 1)
+
+    assert node.transactions[tx_hash]['fees'] == {'gasPrice': node.gas_price}
@@ -0,0 +1,71 @@
+"""
+Cooldown index tests (timer wheel eviction)
+"""
+
+from cooldown_index import CooldownIndex
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_record_and_lookup():
+    clock = FakeClock()
+    index = CooldownIndex(retention_seconds=3600, slot_seconds=60, clock=clock)
+
+    index.record('Galeon', clock.now, '2026-01-01 00:00:00')
+
+    assert index.last_request('Galeon') == (clock.now, '2026-01-01 00:00:00')
+    assert index.last_request('Other') is None
+
+
+def test_entries_evicted_after_retention():
+    clock = FakeClock()
+    index = CooldownIndex(retention_seconds=3600, slot_seconds=60, clock=clock)
+
+    for i in range(1000):
+        index.record(f'agent{i}', clock.now, 'ts')
+    assert len(index) == 1000
+
+    clock.now += 3600 + 60
+    assert index.last_request('agent0') is None
+    assert len(index) == 0
+
+
+def test_refresh_extends_lifetime():
+    clock = FakeClock()
+    index = CooldownIndex(retention_seconds=3600, slot_seconds=60, clock=clock)
+
+    index.record('Galeon', clock.now, 'first')
+    clock.now += 1800
+    index.record('Galeon', clock.now, 'second')
+
+    # Original slot comes due, refreshed entry survives
+    clock.now += 1800 + 60
+    assert index.last_request('Galeon')[1] == 'second'
+
+    clock.now += 1800
+    assert index.last_request('Galeon') is None
+
+
+def test_older_record_ignored():
+    clock = FakeClock()
+    index = CooldownIndex(retention_seconds=3600, slot_seconds=60, clock=clock)
+
+    index.record('Galeon', clock.now, 'new')
+    index.record('Galeon', clock.now - 100, 'old')
+
+    assert index.last_request('Galeon')[1] == 'new'
+
+
+def test_long_idle_gap():
+    clock = FakeClock()
+    index = CooldownIndex(retention_seconds=3600, slot_seconds=60, clock=clock)
+    index.record('Galeon', clock.now, 'ts')
+
+    clock.now += 10 * 24 * 3600
+    assert len(index) == 0
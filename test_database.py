@@ -0,0 +1,259 @@
+"""
+Database tests (request log, cooldown, stats)
+"""
+
+import sqlite3
+import threading
+
+from database import Database
+from db_pool import get_pool
+
+WALLET = '0x742d35Cc6634C0532925a3b844Bc9e7595f0bEb1'
+
+
+def _count_rows(db_file):
+    conn = sqlite3.connect(db_file)
+    try:
+        return conn.execute('SELECT COUNT(*) FROM requests').fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_write_behind_groups_commits(tmp_path):
+    db_file = str(tmp_path / 'faucet.db')
+    db = Database(db_file, write_behind=True, flush_rows=50, flush_interval_ms=1000)
+    db.init_db()
+
+    for i in range(200):
+        db.record_request(f'agent{i}', WALLET, 'Testing write-behind', 10, f'0x{i:064x}')
+    db.flush()
+
+    assert _count_rows(db_file) == 200
+    assert db.get_stats()['total_requests'] == 200
+    db.close()
+
+
+def test_write_behind_cooldown_sees_queued_rows(tmp_path):
+    db_file = str(tmp_path / 'faucet.db')
+    db = Database(db_file, write_behind=True, flush_interval_ms=60000, flush_rows=1000)
+    db.init_db()
+
+    db.record_request('Galeon', WALLET, 'Testing', 10, '0xabc')
+
+    # Not committed yet, but the agent is already in cooldown
+    assert _count_rows(db_file) == 0
+    assert db.is_in_cooldown('Galeon', 24)
+    assert db.get_last_request_time('Galeon') != 'Never'
+    assert not db.is_in_cooldown('Other', 24)
+    db.close()
+
+
+def test_close_flushes_pending_rows(tmp_path):
+    db_file = str(tmp_path / 'faucet.db')
+    db = Database(db_file, write_behind=True, flush_interval_ms=60000, flush_rows=1000)
+    db.init_db()
+
+    for i in range(10):
+        db.record_request(f'agent{i}', WALLET, 'Testing', 10, f'0x{i}')
+    db.close()
+
+    assert _count_rows(db_file) == 10
+
+
+def test_pool_uses_wal_and_per_thread_readers(tmp_path):
+    db_file = str(tmp_path / 'faucet.db')
+    db = Database(db_file)
+    db.init_db()
+
+    pool = get_pool(db_file)
+    assert pool.reader().execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    assert pool.reader() is pool.reader()
+
+    other = []
+    t = threading.Thread(target=lambda: other.append(pool.reader()))
+    t.start()
+    t.join()
+    assert other[0] is not pool.reader()
+
+
+def test_reads_do_not_wait_for_open_write(tmp_path):
+    db_file = str(tmp_path / 'faucet.db')
+    db = Database(db_file)
+    db.init_db()
+    db.record_request('Galeon', WALLET, 'Testing', 10, '0xabc')
+    reader = db.pool.reader()
+
+    with db.pool.writer() as conn:
+        conn.execute(
+            "INSERT INTO requests (agent_name, wallet_address, amount) VALUES ('Other', ?, 10)",
+            (WALLET,)
+        )
+        # Uncommitted write is invisible, and the read does not block
+        assert reader.execute('SELECT COUNT(*) FROM requests').fetchone()[0] == 1
+
+    assert reader.execute('SELECT COUNT(*) FROM requests').fetchone()[0] == 2
+
+
+def test_cooldown_index_loaded_at_startup(tmp_path):
+    db_file = str(tmp_path / 'faucet.db')
+    db = Database(db_file)
+    db.init_db()
+    db.record_request('Galeon', WALLET, 'Testing', 10, '0xabc')
+    db.record_request('Failed', WALLET, 'Testing', 10, '', success=False)
+
+    # Fresh process: index rebuilt from SQLite
+    restarted = Database(db_file)
+    restarted.init_db()
+
+    assert len(restarted.cooldown_index) == 1
+    assert restarted.is_in_cooldown('Galeon', 24)
+    assert not restarted.is_in_cooldown('Failed', 24)
+    assert restarted.get_last_request_time('Galeon') == db.get_last_request_time('Galeon')
+
+
+def test_cooldown_longer_than_retention_uses_sql(tmp_path):
+    db_file = str(tmp_path / 'faucet.db')
+    db = Database(db_file, cooldown_retention_hours=1)
+    db.init_db()
+    db.record_request('Galeon', WALLET, 'Testing', 10, '0xabc')
+
+    assert db.is_in_cooldown('Galeon', 1)
+    assert db.is_in_cooldown('Galeon', 48)
+    assert not db.is_in_cooldown('Other', 48)
+
+
+def test_cooldown_sees_other_workers_requests(tmp_path):
+    db_file = str(tmp_path / 'faucet.db')
+    worker_a, worker_b = Database(db_file), Database(db_file)
+    worker_a.init_db()
+    worker_b.init_db()
+
+    worker_a.record_request('Galeon', WALLET, 'Testing', 10, '0xabc')
+
+    # Not in worker B's index, found in SQLite and remembered
+    assert worker_b.is_in_cooldown('Galeon', 24)
+    assert worker_b.cooldown_index.last_request('Galeon') is not None
+    assert not worker_b.is_in_cooldown('Other', 24)
+
+
+def _seed(db):
+    db.record_request('Galeon', WALLET, 'Testing USDC hackathon project', 10, '0x1')
+    db.record_request('Galeon', WALLET, 'Pay another agent', 10, '0x2')
+    db.record_request('Bot', WALLET, 'Deploy a smart contract', 10, '0x3')
+    db.record_request('Bot', WALLET, '', 10, '0x4')
+    db.record_request('Broken', WALLET, 'Testing', 10, '', success=False)
+
+
+def test_stats_counters_match_table(tmp_path):
+    db = Database(str(tmp_path / 'faucet.db'))
+    db.init_db()
+    _seed(db)
+
+    stats = db.get_detailed_stats()
+
+    assert stats['total_requests'] == 5
+    assert stats['successful_requests'] == 4
+    assert stats['failed_requests'] == 1
+    assert stats['total_usdc'] == 40
+    assert stats['unique_agents'] == 3
+    assert stats['success_rate'] == 80.0
+    assert {uc['category']: uc['count'] for uc in stats['use_cases']} == {
+        'Testing': 1, 'Payment': 1, 'Smart Contract': 1, 'Other': 1
+    }
+
+
+def test_stats_counters_rebuilt_for_existing_table(tmp_path):
+    db_file = str(tmp_path / 'faucet.db')
+    db = Database(db_file)
+    db.init_db()
+    _seed(db)
+    expected = db.get_detailed_stats()
+
+    # Database created before the counters existed
+    with db.pool.writer() as conn:
+        conn.execute('DROP TABLE stats_counters')
+        conn.execute('DROP TABLE stats_agents')
+
+    restarted = Database(db_file)
+    restarted.init_db()
+
+    assert restarted.get_detailed_stats() == expected
+
+
+def test_stats_counters_with_write_behind(tmp_path):
+    db = Database(str(tmp_path / 'faucet.db'), write_behind=True, flush_rows=2)
+    db.init_db()
+    _seed(db)
+    db.flush()
+
+    assert db.get_detailed_stats()['total_requests'] == 5
+    assert db.get_detailed_stats()['unique_agents'] == 3
+    db.close()
+
+
+def test_use_case_stored_and_backfilled(tmp_path):
+    db = Database(str(tmp_path / 'faucet.db'))
+    db.init_db()
+    _seed(db)
+
+    reader = db.pool.reader()
+    stored = [row[0] for row in reader.execute('SELECT use_case FROM requests ORDER BY id')]
+    assert stored == ['Testing', 'Payment', 'Smart Contract', 'Other', 'Testing']
+
+    with db.pool.writer() as conn:
+        conn.execute('UPDATE requests SET use_case = NULL')
+
+    assert db.backfill_use_cases(batch_size=2) == 5
+    assert [row[0] for row in reader.execute('SELECT use_case FROM requests ORDER BY id')] == stored
+
+
+def _insert_requests(db, rows):
+    """rows: (agent_name, tier, timestamp) tuples, inserted directly"""
+    with db.pool.writer() as conn:
+        conn.executemany('''
+            INSERT INTO requests (agent_name, wallet_address, reason, amount, tx_hash, tier, timestamp)
+            VALUES (?, ?, 'Testing', 10, '0xabc', ?, ?)
+        ''', [(agent, WALLET, tier, timestamp) for agent, tier, timestamp in rows])
+
+
+def test_keyset_pages_cover_every_row_once(tmp_path):
+    db = Database(str(tmp_path / 'faucet.db'))
+    db.init_db()
+    # Several rows per timestamp, so the id tiebreak matters
+    _insert_requests(db, [
+        (f'agent{i % 3}', 'premium' if i % 4 == 0 else 'free', f'2026-01-01 00:00:{i // 5:02d}')
+        for i in range(57)
+    ])
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = db.get_requests_page(limit=10, cursor=cursor)
+        seen.extend(row['id'] for row in page)
+        if cursor is None:
+            break
+
+    assert sorted(seen) == list(range(1, 58))
+    assert len(seen) == len(set(seen))
+    timestamps = [row['timestamp'] for row in db.iter_requests(batch_size=7)]
+    assert timestamps == sorted(timestamps, reverse=True)
+
+    premium = list(db.iter_requests(batch_size=4, agent_name='agent0', tier='premium'))
+    assert {row['id'] for row in premium} == {i + 1 for i in range(57) if i % 3 == 0 and i % 4 == 0}
+
+    window = list(db.iter_requests(since='2026-01-01 00:00:02', until='2026-01-01 00:00:04'))
+    assert len(window) == 10
+
+
+def test_keyset_page_plans_use_index(tmp_path):
+    db = Database(str(tmp_path / 'faucet.db'))
+    db.init_db()
+    conn = db.pool.reader()
+
+    for column in ('agent_name', 'tier', 'wallet_address'):
+        plan = ' '.join(row['detail'] for row in conn.execute(f'''
+            EXPLAIN QUERY PLAN
+            SELECT * FROM requests WHERE {column} = ? AND (timestamp, id) < (?, ?)
+            ORDER BY timestamp DESC, id DESC LIMIT 50
+        ''', ('x', '2026-01-01 00:00:00', 1)))
+        assert 'USING INDEX' in plan
+        assert 'TEMP B-TREE' not in plan
@@ -0,0 +1,130 @@
+"""
+Deposit verification pipeline tests against a local stand-in JSON-RPC node
+"""
+
+import pytest
+from eth_account import Account
+from eth_account.messages import encode_defunct
+from web3 import Web3
+
+from balance_system import BalanceSystem, deposit_message
+from deposit_pipeline import DepositPipeline
+from fake_rpc_node import FakeRPCNode
+from payment_claims import PaymentClaims
+
+DEPOSIT_ADDRESS = '0x' + 'ab' * 20
+SENDER = Account.from_key('0x' + '01' * 32)
+OTHER = Account.from_key('0x' + '02' * 32)
+
+
+@pytest.fixture
+def node():
+    node = FakeRPCNode().start()
+    yield node
+    node.stop()
+
+
+@pytest.fixture
+def balances(tmp_path):
+    balances = BalanceSystem(str(tmp_path / 'faucet.db'), deposit_address=DEPOSIT_ADDRESS)
+    balances.init_db()
+    return balances
+
+
+def _deposit(node, eth, to=DEPOSIT_ADDRESS, status=1):
+    return node.add_payment(SENDER.address, to, Web3.to_wei(eth, 'ether'), status=status)
+
+
+def _record(balances, agent_name, eth, tx_hash, signer=SENDER):
+    message = encode_defunct(text=deposit_message(agent_name, tx_hash))
+    return balances.record_deposit(agent_name, eth, tx_hash, signer.sign_message(message).signature.hex())
+
+
+def test_deposits_pending_until_verified(node, balances):
+    tx_hash = _deposit(node, 0.002)
+
+    result = _record(balances, 'Galeon', 0.002, tx_hash)
+    assert result['pending']
+    assert balances.get_balance('Galeon') == 0
+    assert not _record(balances, 'Galeon', 0.002, tx_hash)['success']
+    assert not _record(balances, 'Galeon', 0.002, '0xDEPOSIT1')['success']
+
+    pipeline = DepositPipeline(balances, node.url)
+
+    # Mined in the head block: no confirmations yet
+    assert pipeline.process_once() == {'credited': 0, 'rejected': 0, 'pending': 1}
+
+    node.mine()
+    assert pipeline.process_once()['credited'] == 1
+    assert balances.get_balance('Galeon') == 0.002
+    assert balances.pending_deposits() == []
+
+    # Credited once only
+    assert pipeline.process_once()['credited'] == 0
+    assert balances.get_balance('Galeon') == 0.002
+
+
+def test_burst_verified_in_batches(node, balances):
+    for i in range(250):
+        _record(balances, f'agent{i}', 0.001, _deposit(node, 0.001))
+    wrong = _deposit(node, 0.001, to='0x' + 'cd' * 20)
+    reverted = _deposit(node, 0.001, status=0)
+    _record(balances, 'agent0', 0.001, wrong)
+    _record(balances, 'agent1', 0.001, reverted)
+    node.mine()
+
+    pipeline = DepositPipeline(balances, node.url, batch_size=100)
+    requests_before = node.http_requests
+    counts = pipeline.process_once()
+
+    assert counts == {'credited': 250, 'rejected': 2, 'pending': 0}
+    # 252 deposits x 2 lookups in three batch requests
+    assert node.http_requests - requests_before == 3
+    assert balances.get_balance('agent0') == 0.001
+    assert balances.get_balance('agent249') == 0.001
+
+    # A rejected deposit can be resubmitted
+    assert _record(balances, 'agent0', 0.001, wrong)['pending']
+
+
+def test_unseen_deposit_rejected_after_timeout(node, balances):
+    _record(balances, 'Galeon', 0.001, '0x' + 'ee' * 32)
+    pipeline = DepositPipeline(balances, node.url)
+
+    assert pipeline.process_once()['pending'] == 1
+
+    pipeline.timeout = -1
+    assert pipeline.process_once()['rejected'] == 1
+    assert balances.pending_deposits() == []
+
+
+def test_deposit_bound_to_signing_sender(node, balances):
+    tx_hash = _deposit(node, 0.002)
+
+    assert not balances.record_deposit('Galeon', 0.002, tx_hash)['success']
+    assert not balances.record_deposit('Galeon', 0.002, tx_hash, '0x' + '00' * 65)['success']
+
+    # Someone who saw the transfer on-chain queues it first
+    assert _record(balances, 'Thief', 0.002, tx_hash, signer=OTHER)['pending']
+    assert _record(balances, 'Galeon', 0.002, tx_hash)['pending']
+    node.mine()
+
+    assert DepositPipeline(balances, node.url).process_once() == {'credited': 1, 'rejected': 1, 'pending': 0}
+    assert balances.get_balance('Thief') == 0
+    assert balances.get_balance('Galeon') == 0.002
+    assert not _record(balances, 'Thief', 0.002, tx_hash, signer=OTHER)['success']
+
+
+def test_transfer_is_either_deposit_or_premium_payment(node, balances, tmp_path):
+    claims = PaymentClaims(str(tmp_path / 'faucet.db'))
+    payment = {'amount_eth': 0.001, 'from_address': SENDER.address}
+
+    paid = _deposit(node, 0.001)
+    assert claims.claim(paid, 'Galeon', payment)
+    result = _record(balances, 'Galeon', 0.001, paid)
+    assert result['error'] == 'Transaction already used as a premium payment'
+
+    deposited = _deposit(node, 0.001)
+    assert _record(balances, 'Galeon', 0.001, deposited)['pending']
+    assert not claims.claim(deposited, 'Galeon', payment)
+    assert claims.get(deposited) is None
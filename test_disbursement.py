@@ -0,0 +1,136 @@
+"""
+Disbursement queue tests (mock faucet)
+"""
+
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+
+from blockchain import MockUSDCFaucet
+from disbursement import DisbursementQueue
+
+RECIPIENT = '0x742d35Cc6634C0532925a3b844Bc9e7595f0bEb1'
+
+
+class CountingFaucet(MockUSDCFaucet):
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+
+    def send_batch(self, transfers):
+        self.batches.append(list(transfers))
+        return super().send_batch(transfers)
+
+
+def test_flush_on_size_threshold():
+    faucet = CountingFaucet()
+    sent = []
+    queue = DisbursementQueue(faucet, max_batch=3, max_wait=60, on_sent=sent.append)
+
+    tickets = [queue.enqueue(RECIPIENT, 10, key=f'agent{i}') for i in range(3)]
+    queue.stop()
+
+    assert len(faucet.batches) == 1
+    assert len(faucet.batches[0]) == 3
+    assert len(sent) == 3
+    for ticket_id in tickets:
+        ticket = queue.get_ticket(ticket_id)
+        assert ticket['status'] == 'confirmed'
+        assert ticket['tx_hash'].startswith('0x')
+
+
+def test_flush_on_time_threshold():
+    faucet = CountingFaucet()
+    queue = DisbursementQueue(faucet, max_batch=100, max_wait=0.05)
+
+    ticket_id = queue.enqueue(RECIPIENT, 10)
+    for _ in range(100):
+        if queue.get_ticket(ticket_id)['status'] != 'queued':
+            break
+        time.sleep(0.01)
+
+    assert queue.get_ticket(ticket_id)['status'] == 'confirmed'
+    queue.stop()
+
+
+def test_open_ticket_until_sent():
+    faucet = CountingFaucet()
+    queue = DisbursementQueue(faucet, max_batch=100, max_wait=60)
+
+    queue.enqueue(RECIPIENT, 10, key='Galeon')
+    assert queue.has_open_ticket('Galeon')
+    assert not queue.has_open_ticket('Other')
+
+    queue.flush()
+    assert not queue.has_open_ticket('Galeon')
+    queue.stop()
+
+
+def test_one_open_ticket_per_key_under_concurrency():
+    faucet = CountingFaucet()
+    queue = DisbursementQueue(faucet, max_batch=100, max_wait=60)
+    start = threading.Barrier(20)
+    tickets = []
+
+    def request():
+        start.wait()
+        tickets.append(queue.enqueue(RECIPIENT, 10, key='Galeon'))
+
+    threads = [threading.Thread(target=request) for _ in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len([t for t in tickets if t is not None]) == 1
+    assert queue.pending_count() == 1
+    queue.stop()
+    assert queue.enqueue(RECIPIENT, 10, key='Galeon') is not None
+    queue.stop()
+
+
+def test_failed_batch_marks_tickets_failed():
+    class BrokenFaucet(MockUSDCFaucet):
+        def send_batch(self, transfers):
+            raise Exception('rpc down')
+
+    queue = DisbursementQueue(BrokenFaucet(), max_batch=100, max_wait=60)
+    ticket_id = queue.enqueue(RECIPIENT, 10)
+    queue.flush()
+
+    ticket = queue.get_ticket(ticket_id)
+    assert ticket['status'] == 'failed'
+    assert ticket['error'] == 'rpc down'
+    queue.stop()
+
+
+def test_stop_drains_every_batch():
+    faucet = CountingFaucet()
+    queue = DisbursementQueue(faucet, max_batch=2, max_wait=60)
+
+    tickets = [queue.enqueue(RECIPIENT, 10) for _ in range(5)]
+    queue.stop()
+
+    assert [len(batch) for batch in faucet.batches] == [2, 2, 1]
+    assert queue.pending_count() == 0
+    assert all(queue.get_ticket(ticket_id)['status'] == 'confirmed' for ticket_id in tickets)
+
+
+def test_app_sends_queued_payouts_at_exit(tmp_path):
+    script = (
+        "import app\n"
+        "app.payout_queue.enqueue(%r, 10, key='Galeon',"
+        " meta={'agent_name': 'Galeon', 'reason': 'Testing', 'moltbook_proof': ''})\n"
+    ) % RECIPIENT
+    env = dict(os.environ, PAYOUT_BATCHING='1', PAYOUT_BATCH_WAIT='60', DB_WRITE_BEHIND='1',
+               PYTHONPATH=os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run([sys.executable, '-c', script], cwd=tmp_path, env=env, check=True, timeout=60)
+
+    conn = sqlite3.connect(str(tmp_path / 'faucet.db'))
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM requests WHERE agent_name = 'Galeon'").fetchone()[0] == 1
+    finally:
+        conn.close()
@@ -0,0 +1,59 @@
+"""
+Flask request guard tests
+"""
+
+from flask import Flask, jsonify
+
+import flask_guards
+from idempotency import IdempotencyStore
+from rate_limiter import TokenBucketLimiter
+
+
+def make_client():
+    app = Flask(__name__)
+    limiter = TokenBucketLimiter()
+    idempotent = flask_guards.idempotent(IdempotencyStore())
+    rate_limited = flask_guards.rate_limited(limiter, trust_proxy=1)
+    calls = []
+
+    @app.route('/pay', methods=['POST'])
+    @idempotent
+    @rate_limited
+    def pay():
+        calls.append(1)
+        return jsonify({'success': True, 'n': len(calls)})
+
+    return app.test_client(), calls
+
+
+def test_replays_skip_admission():
+    client, calls = make_client()
+    body = {'agent_name': 'Retry', 'wallet_address': '0x' + '1' * 40}
+    headers = {'Idempotency-Key': 'k1'}
+
+    responses = [client.post('/pay', json=body, headers=headers) for _ in range(10)]
+    assert [r.status_code for r in responses] == [200] * 10
+    assert {r.get_json()['n'] for r in responses} == {1}
+    assert responses[-1].headers['Idempotent-Replayed'] == 'true'
+    assert len(calls) == 1
+
+    assert client.post('/pay', json={**body, 'reason': 'x'}, headers=headers).status_code == 422
+    assert client.post('/pay', json=body, headers={'Idempotency-Key': 'k' * 256}).status_code == 400
+
+
+def test_flood_rejected_with_retry_after():
+    client, calls = make_client()
+    body = {'agent_name': 'Flood', 'wallet_address': '0x' + '2' * 40}
+
+    statuses = [client.post('/pay', json=body).status_code for _ in range(6)]
+    assert statuses[-1] == 429
+    assert len(calls) == statuses.count(200)
+
+
+def test_client_ip_from_trusted_hop():
+    app = Flask(__name__)
+    with app.test_request_context(
+        '/', headers={'X-Forwarded-For': '10.0.0.1, 203.0.113.7'}, environ_base={'REMOTE_ADDR': '127.0.0.1'}
+    ):
+        assert flask_guards.client_ip(1) == '203.0.113.7'
+        assert flask_guards.client_ip(0) == '127.0.0.1'
@@ -0,0 +1,109 @@
+"""
+Pooled HTTP client tests against a local keep-alive server
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from http_client import HostBusyError, PooledHTTPClient
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.hits += 1
+            fail = self.server.fail_next > 0
+            if fail:
+                self.server.fail_next -= 1
+        time.sleep(self.server.delay)
+
+        body = json.dumps({'name': 'Galeon'}).encode()
+        self.send_response(503 if fail else 200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.connections = server.hits = server.fail_next = 0
+    server.delay = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    server.url = f'http://127.0.0.1:{server.server_address[1]}/users/Galeon'
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_connection_reused(server):
+    client = PooledHTTPClient()
+
+    for _ in range(5):
+        assert client.get(server.url).json()['name'] == 'Galeon'
+
+    assert server.connections == 1
+    stats = client.latency_stats()
+    assert stats['connect']['count'] == 5
+    assert stats['first_byte']['max_ms'] is not None
+
+
+def test_retries_with_backoff(server):
+    server.fail_next = 2
+    client = PooledHTTPClient(retries=2, backoff_factor=0)
+
+    assert client.get(server.url).status_code == 200
+    assert server.hits == 3
+
+
+def test_per_host_limit(server):
+    server.delay = 0.5
+    client = PooledHTTPClient(max_per_host=1)
+
+    slow = threading.Thread(target=client.get, args=(server.url,))
+    slow.start()
+    time.sleep(0.1)
+
+    with pytest.raises(HostBusyError):
+        client.get(server.url, timeout=0.1)
+    slow.join()
+
+
+def test_streamed_response_holds_slot_until_closed(server):
+    client = PooledHTTPClient(max_per_host=1)
+
+    with client.get(server.url, stream=True) as response:
+        with pytest.raises(HostBusyError):
+            client.get(server.url, timeout=0.1)
+        assert response.json()['name'] == 'Galeon'
+
+    assert client.get(server.url, timeout=1).status_code == 200
+
+
+def test_idle_hosts_forgotten(server):
+    client = PooledHTTPClient(retries=0)
+
+    client.get(server.url)
+    client.get(server.url, stream=True).close()
+    with pytest.raises(requests.exceptions.ConnectionError):
+        client.get('http://127.0.0.1:1/', timeout=1)
+
+    assert client._host_slots == {}
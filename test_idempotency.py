@@ -0,0 +1,96 @@
+"""
+Idempotency key store tests
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from idempotency import IdempotencyStore, IdempotencyKeyReused, fingerprint
+
+BODY = fingerprint(b'{"agent_name": "Galeon"}')
+
+
+def test_replays_stored_response():
+    store = IdempotencyStore()
+    calls = []
+
+    def handler():
+        calls.append(1)
+        return 200, b'{"tx_hash": "0xabc"}'
+
+    assert store.execute('k', BODY, handler) == (200, b'{"tx_hash": "0xabc"}', False)
+    assert store.execute('k', BODY, handler) == (200, b'{"tx_hash": "0xabc"}', True)
+    assert len(calls) == 1
+
+    with pytest.raises(IdempotencyKeyReused):
+        store.execute('k', fingerprint(b'{}'), handler)
+
+
+def test_server_errors_not_stored_and_ttl():
+    now = [1000.0]
+    store = IdempotencyStore(ttl=60, clock=lambda: now[0])
+
+    assert store.execute('k', BODY, lambda: (500, b'{}'))[0] == 500
+    assert store.execute('k', BODY, lambda: (200, b'{"ok": 1}'))[2] is False
+    assert store.execute('k', BODY, lambda: (200, b'{"ok": 2}'))[1] == b'{"ok": 1}'
+
+    now[0] += 61
+    assert store.execute('k', BODY, lambda: (200, b'{"ok": 3}'))[1] == b'{"ok": 3}'
+
+
+def test_rate_limited_response_not_stored():
+    store = IdempotencyStore()
+    assert store.execute('k', BODY, lambda: (429, b'{}'))[0] == 429
+    assert store.execute('k', BODY, lambda: (200, b'{"ok": 1}'))[:2] == (200, b'{"ok": 1}')
+
+
+def test_max_entries_drops_oldest():
+    store = IdempotencyStore(max_entries=2)
+    for key in ('a', 'b', 'c'):
+        store.execute(key, BODY, lambda: (200, b'{}'))
+
+    assert len(store) == 2
+    assert store.execute('a', BODY, lambda: (201, b'{}'))[0] == 201
+
+
+def test_concurrent_duplicates_wait_for_first():
+    store = IdempotencyStore()
+    calls = []
+    results = []
+
+    def handler():
+        calls.append(1)
+        time.sleep(0.1)
+        return 200, b'{"tx_hash": "0xabc"}'
+
+    def worker():
+        results.append(store.execute('k', BODY, handler))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert sorted(r[2] for r in results) == [False] + [True] * 7
+
+
+def test_async_duplicates_share_one_execution():
+    store = IdempotencyStore()
+    calls = []
+
+    async def handler():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return 200, b'{}'
+
+    async def main():
+        return await asyncio.gather(*[store.execute_async('k', BODY, handler) for _ in range(5)])
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert [r[2] for r in results].count(False) == 1
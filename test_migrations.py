@@ -0,0 +1,116 @@
+"""
+Schema migration and query plan tests
+"""
+
+import sqlite3
+
+import pytest
+
+from database import REQUESTS_MIGRATIONS, Database
+from db_pool import get_pool
+from migrations import apply_migrations
+
+# Request log reads and the index each one must use
+QUERY_PLANS = [
+    # is_in_cooldown (cooldown index miss)
+    ('''SELECT MAX(timestamp) AS last_timestamp FROM requests
+        WHERE agent_name = ? AND timestamp > ? AND success = TRUE''',
+     ('Galeon', '2026-01-01 00:00:00'), 'idx_success_agent_timestamp'),
+    # get_last_request_time
+    ('''SELECT timestamp FROM requests WHERE agent_name = ? AND success = TRUE
+        ORDER BY timestamp DESC LIMIT 1''',
+     ('Galeon',), 'idx_success_agent_timestamp'),
+    # get_recent_requests
+    ('''SELECT agent_name, wallet_address, reason, amount, tx_hash, timestamp FROM requests
+        WHERE success = TRUE ORDER BY timestamp DESC LIMIT ?''',
+     (50,), 'idx_success_timestamp'),
+    # _load_cooldown_index
+    ('''SELECT agent_name, MAX(timestamp) as last_timestamp FROM requests
+        WHERE success = TRUE AND timestamp > ? GROUP BY agent_name''',
+     ('2026-01-01 00:00:00',), 'idx_success_agent_timestamp'),
+]
+
+
+def _indexes(db_file):
+    conn = sqlite3.connect(db_file)
+    try:
+        return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize('sql, params, index', QUERY_PLANS)
+def test_request_queries_use_index(tmp_path, sql, params, index):
+    db = Database(str(tmp_path / 'faucet.db'))
+    db.init_db()
+
+    details = [row['detail'] for row in db.pool.reader().execute(f'EXPLAIN QUERY PLAN {sql}', params)]
+    plan = ' '.join(details)
+    assert f'USING INDEX {index}' in plan or f'USING COVERING INDEX {index}' in plan
+    assert 'SCAN requests' not in [detail.strip() for detail in details]
+    assert 'TEMP B-TREE' not in plan
+
+
+def test_migrations_applied_once(tmp_path):
+    db_file = str(tmp_path / 'faucet.db')
+    Database(db_file).init_db()
+
+    applied = [row[0] for row in sqlite3.connect(db_file).execute(
+        'SELECT name FROM schema_migrations ORDER BY name'
+    )]
+    assert applied == [name for name, _ in REQUESTS_MIGRATIONS]
+    assert apply_migrations(get_pool(db_file), REQUESTS_MIGRATIONS) == []
+    assert {'idx_success_agent_timestamp', 'idx_success_timestamp'} <= _indexes(db_file)
+
+
+def test_migrations_upgrade_existing_database(tmp_path):
+    db_file = str(tmp_path / 'faucet.db')
+    conn = sqlite3.connect(db_file)
+    conn.execute('''
+        CREATE TABLE requests (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            agent_name TEXT NOT NULL,
+            wallet_address TEXT NOT NULL,
+            reason TEXT NOT NULL,
+            amount REAL NOT NULL,
+            tx_hash TEXT,
+            moltbook_proof TEXT,
+            success BOOLEAN DEFAULT TRUE,
+            tier TEXT DEFAULT 'free',
+            payment_tx TEXT,
+            payment_amount REAL,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('CREATE INDEX idx_agent_name ON requests(agent_name)')
+    conn.execute('''
+        INSERT INTO requests (agent_name, wallet_address, reason, amount, tier, payment_tx)
+        VALUES ('Galeon', '0xabc', 'Testing', 10, 'premium', '0xpay')
+    ''')
+    conn.commit()
+    conn.close()
+
+    db = Database(db_file)
+    db.init_db()
+
+    assert 'idx_agent_name' not in _indexes(db_file)
+    assert 'idx_success_agent_timestamp' in _indexes(db_file)
+    assert db.is_in_cooldown('Galeon', 24)
+
+
+def test_failed_migration_is_rolled_back(tmp_path):
+    pool = get_pool(str(tmp_path / 'migrations.db'))
+    migrations = [
+        ('0001_table', ['CREATE TABLE items (id INTEGER PRIMARY KEY)']),
+        ('0002_broken', ['CREATE INDEX idx_items_name ON items(id)', 'CREATE INDEX idx_bad ON missing(id)']),
+    ]
+
+    with pytest.raises(sqlite3.OperationalError):
+        apply_migrations(pool, migrations)
+
+    conn = pool.reader()
+    assert [row['name'] for row in conn.execute('SELECT name FROM schema_migrations')] == ['0001_table']
+    assert conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'idx_items_name'").fetchone() is None
+
+    migrations[1] = ('0002_broken', ['CREATE INDEX idx_items_name ON items(id)'])
+    assert apply_migrations(pool, migrations) == ['0002_broken']
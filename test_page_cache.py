@@ -0,0 +1,60 @@
+"""
+Dashboard page cache tests
+"""
+
+import importlib
+
+import pytest
+
+from page_cache import PageCache
+
+
+def test_rendered_once_per_version():
+    cache = PageCache()
+    renders = []
+
+    def render():
+        renders.append(1)
+        return f'<p>{len(renders)}</p>'
+
+    body, etag = cache.get_or_render('stats', 1, render)
+    assert cache.get_or_render('stats', 1, render) == (body, etag)
+    assert len(renders) == 1
+
+    new_body, new_etag = cache.get_or_render('stats', 2, render)
+    assert new_body == b'<p>2</p>'
+    assert new_etag != etag
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    import app
+    app = importlib.reload(app)
+    yield app, app.app.test_client()
+    app.balance_poller.stop()
+
+
+def test_dashboard_etag_and_invalidation(client):
+    app, client = client
+
+    first = client.get('/stats')
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+
+    assert client.get('/stats', headers={'If-None-Match': etag}).status_code == 304
+
+    app.db.record_request(
+        agent_name='Galeon', wallet_address='0x' + '1' * 40, reason='<script>{{ 7 * 7 }}</script>',
+        amount=10, tx_hash='0xabc'
+    )
+
+    changed = client.get('/stats', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+
+    # Agent-supplied text is escaped, not evaluated as a template
+    recent = client.get('/recent').get_data(as_text=True)
+    assert '&lt;script&gt;{{ 7 * 7 }}' in recent
+    assert 'Galeon' in recent
+    assert client.get('/').status_code == 200
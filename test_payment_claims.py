@@ -0,0 +1,64 @@
+"""
+Payment claims store tests
+"""
+
+import threading
+
+from payment_claims import PaymentClaims
+
+RESULT = {'verified': True, 'amount_eth': 0.001, 'from_address': '0x' + '1' * 40}
+
+
+def test_claim_once(tmp_path):
+    claims = PaymentClaims(str(tmp_path / 'claims.db'))
+
+    assert claims.get('0xPAID1') is None
+    assert claims.claim('0xPAID1', 'AgentA', RESULT) is True
+    assert claims.claim('0xpaid1', 'AgentB', RESULT) is False
+
+    claims.set_payout('0xPAID1', '0xpayout')
+    claim = claims.get('0xPaid1')
+    assert claim['claimed_by'] == 'AgentA'
+    assert claim['payout_tx'] == '0xpayout'
+    assert claim['amount_eth'] == 0.001
+
+
+def test_concurrent_claims_have_one_winner(tmp_path):
+    claims = PaymentClaims(str(tmp_path / 'claims.db'))
+    results = []
+    barrier = threading.Barrier(16)
+
+    def worker(i):
+        barrier.wait()
+        results.append(claims.claim('0xPAID2', f'Agent{i}', RESULT))
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results.count(True) == 1
+
+
+def test_failed_verification_is_memoized_and_not_claimable(tmp_path):
+    claims = PaymentClaims(str(tmp_path / 'claims.db'))
+
+    claims.record_failure('0xBAD', 'Payment sent to wrong address')
+    claim = claims.get('0xBAD')
+    assert claim['verified'] is False
+    assert claim['error'] == 'Payment sent to wrong address'
+    assert claims.claim('0xBAD', 'AgentA', RESULT) is False
+
+
+def test_release_allows_new_claim_until_paid_out(tmp_path):
+    claims = PaymentClaims(str(tmp_path / 'claims.db'))
+
+    claims.claim('0xPAID3', 'AgentA', RESULT)
+    claims.release('0xPAID3')
+    assert claims.get('0xPAID3')['claimed'] is False
+    assert claims.claim('0xPAID3', 'AgentA', RESULT) is True
+
+    claims.set_payout('0xPAID3', '0xpayout')
+    claims.release('0xPAID3')
+    assert claims.get('0xPAID3')['claimed'] is True
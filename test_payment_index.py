@@ -0,0 +1,123 @@
+"""
+Payment index tests against a local stand-in JSON-RPC node
+"""
+
+import pytest
+from web3 import Web3
+
+from fake_rpc_node import FakeRPCNode
+import payment_index
+from payment_index import PaymentIndexer, REORG_DEPTH
+from payment_verifier import PaymentVerifier
+
+PAYMENT_ADDRESS = '0x' + 'ab' * 20
+ALICE = '0x' + '01' * 20
+BOB = '0x' + '02' * 20
+
+
+@pytest.fixture
+def node():
+    node = FakeRPCNode().start()
+    yield node
+    node.stop()
+
+
+def _pay(node, sender, eth, status=1, to=PAYMENT_ADDRESS):
+    return node.add_payment(sender, to, Web3.to_wei(eth, 'ether'), status=status)
+
+
+def test_sync_indexes_payments_incrementally(node, tmp_path):
+    w3 = Web3(Web3.HTTPProvider(node.url))
+    indexer = PaymentIndexer(w3, PAYMENT_ADDRESS, db_file=str(tmp_path / 'index.db'), start_block=100)
+
+    alice_tx = _pay(node, ALICE, 0.001)
+    _pay(node, BOB, 0.002)
+    _pay(node, BOB, 0.005, status=0)
+    _pay(node, ALICE, 0.003, to='0x' + 'cd' * 20)
+    node.block_number += REORG_DEPTH
+
+    assert indexer.sync() == node.block_number - REORG_DEPTH - 99
+    assert indexer.checkpoint() == node.block_number - REORG_DEPTH
+
+    payments, next_cursor = indexer.payments()
+    assert next_cursor is None
+    assert [p['amount_eth'] for p in payments] == [0.002, 0.001]
+    assert indexer.payments(from_address=Web3.to_checksum_address(ALICE))[0][0]['tx_hash'] == alice_tx
+
+    # Nothing new: no blocks fetched
+    fetched = node.calls['eth_getBlockByNumber']
+    assert indexer.sync() == 0
+    assert node.calls['eth_getBlockByNumber'] == fetched
+
+    _pay(node, ALICE, 0.01)
+    node.block_number += REORG_DEPTH
+    assert indexer.sync() == 1 + REORG_DEPTH
+    assert node.calls['eth_getBlockByNumber'] == fetched + 1 + REORG_DEPTH
+    assert len(indexer.payments(from_address=ALICE)[0]) == 2
+
+
+def test_checkpoint_survives_restart_and_time_window(node, tmp_path):
+    db_file = str(tmp_path / 'index.db')
+    w3 = Web3(Web3.HTTPProvider(node.url))
+
+    _pay(node, ALICE, 0.001)
+    node.block_number += REORG_DEPTH
+    PaymentIndexer(w3, PAYMENT_ADDRESS, db_file=db_file, start_block=100).sync()
+
+    restarted = PaymentIndexer(w3, PAYMENT_ADDRESS, db_file=db_file, start_block=0)
+    fetched = node.calls['eth_getBlockByNumber']
+    assert restarted.sync() == 0
+    assert node.calls['eth_getBlockByNumber'] == fetched
+
+    block_time = 1_700_000_000 + 101 * 12
+    assert len(restarted.payments(since=block_time)[0]) == 1
+    assert restarted.payments(since=block_time + 1) == ([], None)
+    assert restarted.payments(until=block_time) == ([], None)
+
+
+def test_verifier_recent_payments_use_index(node, tmp_path):
+    verifier = PaymentVerifier(PAYMENT_ADDRESS, node.url, index_db=str(tmp_path / 'index.db'))
+    verifier.indexer.start_block = 100
+
+    _pay(node, BOB, 0.002)
+    node.block_number += REORG_DEPTH
+
+    # Block timestamps are in 2023, well outside a 24h window
+    assert verifier.get_recent_payments(hours=24) == ([], None)
+    payments, _ = verifier.get_recent_payments(from_address=BOB, hours=24 * 365 * 10)
+    assert payments[0]['amount_eth'] == 0.002
+    assert payments[0]['from_address'] == BOB
+
+
+def test_cold_index_synced_one_batch_per_lookup(node, tmp_path):
+    verifier = PaymentVerifier(PAYMENT_ADDRESS, node.url, index_db=str(tmp_path / 'index.db'))
+    verifier.indexer.start_block = 100
+    verifier.indexer.batch_blocks = 10
+    node.block_number = 500
+
+    assert verifier.get_recent_payments(hours=24) == ([], None)
+    assert verifier.indexer.checkpoint() == 109
+    verifier.get_recent_payments(hours=24)
+    assert verifier.indexer.checkpoint() == 119
+
+
+def test_payments_paged_by_keyset(node, tmp_path, monkeypatch):
+    w3 = Web3(Web3.HTTPProvider(node.url))
+    indexer = PaymentIndexer(w3, PAYMENT_ADDRESS, db_file=str(tmp_path / 'index.db'), start_block=100)
+    sent = [_pay(node, ALICE, 0.001 * (i + 1)) for i in range(7)]
+    node.block_number += REORG_DEPTH
+    indexer.sync()
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = indexer.payments(limit=3, cursor=cursor)
+        seen += [p['tx_hash'] for p in page]
+        if cursor is None:
+            break
+    assert seen == sent[::-1]
+
+    monkeypatch.setattr(payment_index, 'MAX_PAGE_SIZE', 5)
+    page, cursor = indexer.payments(limit=10 ** 6)
+    assert len(page) == 5 and cursor is not None
+    with pytest.raises(ValueError):
+        indexer.payments(cursor='not-a-cursor')
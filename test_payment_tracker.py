@@ -0,0 +1,115 @@
+"""
+Payment confirmation tracker tests (stub chain)
+"""
+
+from web3.exceptions import TransactionNotFound
+
+from payment_tracker import PaymentConfirmationTracker, MockPaymentConfirmationTracker
+from payment_verifier import MockPaymentVerifier
+
+
+class StubEth:
+    def __init__(self):
+        self.block_number = 100
+        self.blocks = {}
+        self.receipts = {}
+        self.calls = {'get_block': 0, 'get_transaction_receipt': 0}
+
+    def get_block(self, number):
+        self.calls['get_block'] += 1
+        return {'number': number, 'transactions': self.blocks.get(number, [])}
+
+    def get_transaction_receipt(self, tx_hash):
+        self.calls['get_transaction_receipt'] += 1
+        if tx_hash not in self.receipts:
+            raise TransactionNotFound(tx_hash)
+        return self.receipts[tx_hash]
+
+
+class StubVerifier:
+    def __init__(self):
+        self.w3 = type('W3', (), {})()
+        self.w3.eth = StubEth()
+        self.verified = []
+
+    def verify_payment(self, tx_hash, expected_amount_eth):
+        self.verified.append(tx_hash)
+        if tx_hash == '0xbad':
+            return {'verified': False, 'error': 'Wrong recipient'}
+        return {'verified': True, 'amount_eth': expected_amount_eth}
+
+
+def test_blocks_scanned_once_for_all_pending_payments():
+    verifier = StubVerifier()
+    eth = verifier.w3.eth
+    tracker = PaymentConfirmationTracker(verifier)
+    payouts = []
+
+    hashes = [f'0x{i:02x}' for i in range(20)]
+    for tx_hash in hashes:
+        tracker.watch(tx_hash, 0.001, on_confirmed=lambda result, h=tx_hash: payouts.append(h) or {'tx_hash': 'payout-' + h})
+    tracker.stop()
+
+    # First poll: one receipt lookup per payment, none mined yet
+    tracker.poll_once()
+    assert eth.calls['get_transaction_receipt'] == 20
+
+    eth.blocks[101] = ['0xother']
+    eth.blocks[102] = hashes
+    eth.block_number = 102
+    tracker.poll_once()
+
+    # Following the head costs one get_block per new block, not per payment
+    assert eth.calls['get_transaction_receipt'] == 20
+    assert eth.calls['get_block'] == 2
+    assert tracker.status(hashes[0])['status'] == 'confirming'
+    assert payouts == []
+
+    eth.block_number = 103
+    tracker.poll_once()
+
+    assert sorted(payouts) == sorted(hashes)
+    assert tracker.pending_count() == 0
+    assert tracker.status(hashes[0])['status'] == 'confirmed'
+    assert tracker.status(hashes[0])['payout'] == {'tx_hash': 'payout-' + hashes[0]}
+
+
+def test_failed_and_expired_payments():
+    verifier = StubVerifier()
+    eth = verifier.w3.eth
+    tracker = PaymentConfirmationTracker(verifier, timeout=0)
+    failed = []
+
+    tracker.watch('0xbad', 0.001, on_confirmed=lambda r: None, on_failed=failed.append, block_number=90)
+    tracker.watch('0xlost', 0.001, on_confirmed=lambda r: None, on_failed=failed.append)
+    tracker.stop()
+    tracker.poll_once()
+
+    assert tracker.status('0xBAD')['status'] == 'failed'
+    assert tracker.status('0xbad')['error'] == 'Wrong recipient'
+    assert tracker.status('0xlost')['status'] == 'expired'
+    assert [f['tx_hash'] for f in failed] == ['0xbad', '0xlost']
+
+
+def test_watch_is_idempotent():
+    verifier = StubVerifier()
+    tracker = PaymentConfirmationTracker(verifier)
+    calls = []
+
+    for _ in range(3):
+        tracker.watch('0xAbC', 0.001, on_confirmed=calls.append, block_number=50)
+    tracker.stop()
+    tracker.poll_once()
+
+    assert len(calls) == 1
+    assert verifier.verified == ['0xAbC']
+
+
+def test_mock_tracker_confirms_pending_mock_payment():
+    verifier = MockPaymentVerifier(confirm_after=0)
+    tracker = MockPaymentConfirmationTracker(verifier)
+    tracker.watch('0xPENDING1', 0.001, on_confirmed=lambda result: {'tx_hash': '0xpayout'})
+    tracker.stop()
+    tracker.poll_once()
+
+    assert tracker.status('0xPENDING1')['status'] == 'confirmed'
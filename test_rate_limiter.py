@@ -0,0 +1,86 @@
+"""
+Token-bucket rate limiter tests
+"""
+
+import pytest
+
+from rate_limiter import TokenBucketLimiter, forwarded_client, retry_after_header
+
+LIMITS = {'ip': (1.0, 3), 'agent': (0.5, 2)}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def make_limiter(request, tmp_path):
+    def make(clock):
+        db_file = str(tmp_path / 'limits.db') if request.param == 'sqlite' else None
+        return TokenBucketLimiter(LIMITS, db_file=db_file, clock=clock)
+    return make
+
+
+def test_burst_then_refill(make_limiter):
+    clock = Clock()
+    limiter = make_limiter(clock)
+
+    assert limiter.acquire(agent='Galeon') == 0
+    assert limiter.acquire(agent='Galeon') == 0
+    assert limiter.acquire(agent='Galeon') == pytest.approx(2.0)
+    assert limiter.acquire(agent='Other') == 0
+
+    clock.now += 2
+    assert limiter.acquire(agent='Galeon') == 0
+    assert limiter.acquire(agent='Galeon') > 0
+
+
+def test_all_buckets_charged_or_none(make_limiter):
+    clock = Clock()
+    limiter = make_limiter(clock)
+
+    limiter.acquire(ip='1.2.3.4', agent='A')
+    limiter.acquire(ip='1.2.3.4', agent='A')
+    # Agent bucket empty: refused, and the IP bucket keeps its last token
+    assert limiter.acquire(ip='1.2.3.4', agent='A') > 0
+    assert limiter.acquire(ip='1.2.3.4', agent='B') == 0
+    assert limiter.acquire(ip='1.2.3.4', agent='C') > 0
+
+    # Unknown dimensions and empty values are ignored
+    assert limiter.acquire(wallet='0xabc', agent='') == 0
+
+
+def test_sqlite_buckets_shared_between_workers(tmp_path):
+    clock = Clock()
+    db_file = str(tmp_path / 'limits.db')
+    workers = [TokenBucketLimiter(LIMITS, db_file=db_file, clock=clock) for _ in range(2)]
+
+    assert workers[0].acquire(agent='Galeon') == 0
+    assert workers[1].acquire(agent='Galeon') == 0
+    assert workers[0].acquire(agent='Galeon') > 0
+
+
+def test_memory_buckets_bounded():
+    limiter = TokenBucketLimiter(LIMITS, max_keys=10)
+    for i in range(100):
+        limiter.acquire(agent=f'agent{i}')
+    assert len(limiter._buckets) == 10
+
+
+def test_retry_after_header_rounds_up():
+    assert retry_after_header(0.2) == '1'
+    assert retry_after_header(2.0) == '2'
+    assert retry_after_header(2.1) == '3'
+
+
+def test_forwarded_client_ignores_client_written_hops():
+    # The client sent "X-Forwarded-For: 6.6.6.6"; one proxy appended the real peer
+    assert forwarded_client('6.6.6.6, 1.2.3.4', 1) == '1.2.3.4'
+    assert forwarded_client('6.6.6.6, 1.2.3.4, 10.0.0.2', 2) == '1.2.3.4'
+    assert forwarded_client('1.2.3.4', 2) is None
+    assert forwarded_client('1.2.3.4', 0) is None
+    assert forwarded_client(None, 1) is None
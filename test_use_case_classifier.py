@@ -0,0 +1,49 @@
+"""
+Use case classifier tests (must agree with the keyword-by-keyword scan)
+"""
+
+import random
+
+from use_case_classifier import USE_CASE_KEYWORDS, UseCaseClassifier, classifier
+
+
+def naive_classify(reason):
+    if not reason:
+        return 'Other'
+    reason_lower = reason.lower()
+    for category, kws in USE_CASE_KEYWORDS.items():
+        if any(kw in reason_lower for kw in kws):
+            return category
+    return 'Other'
+
+
+def test_priority_kept():
+    assert classifier.classify('Testing a payment contract') == 'Testing'
+    assert classifier.classify('Deploy contract for my agent') == 'Smart Contract'
+    assert classifier.classify('A2A payments') == 'Payment'
+    assert classifier.classify('USDC Hackathon project') == 'Hackathon'
+    assert classifier.classify('Just because') == 'Other'
+    assert classifier.classify('') == 'Other'
+    assert classifier.classify(None) == 'Other'
+
+
+def test_overlapping_keywords():
+    # 'agentest' contains 'agent' and, overlapping it, 'test'
+    assert classifier.classify('agentest') == 'Testing'
+
+
+def test_matches_naive_scan_on_random_reasons():
+    rng = random.Random(42)
+    words = [kw for kws in USE_CASE_KEYWORDS.values() for kw in kws]
+    words += ['hello', 'faucet', 'TEST', 'Pay', 'con', 'tract', 'a', ' ', '-', 'ing']
+
+    for _ in range(5000):
+        reason = ''.join(rng.choice(words) for _ in range(rng.randint(0, 6)))
+        assert classifier.classify(reason) == naive_classify(reason), reason
+
+
+def test_custom_keywords():
+    custom = UseCaseClassifier({'Alpha': ['foo'], 'Beta': ['bar']})
+    assert custom.classify('bar foo') == 'Alpha'
+    assert custom.classify('bar') == 'Beta'
+    assert custom.classify('baz') == 'Other'
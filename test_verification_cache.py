@@ -0,0 +1,124 @@
+"""
+Verification cache tests
+"""
+
+import asyncio
+import threading
+import time
+
+from verification_cache import VerificationCache
+from verifier import MoltbookVerifier
+
+
+class FakeClock:
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class CountingVerifier(MoltbookVerifier):
+    """Moltbook stand-in: known agents exist, proofs are never valid"""
+
+    def __init__(self, known=(), delay=0.0, **kwargs):
+        super().__init__(**kwargs)
+        self.known = set(known)
+        self.delay = delay
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def _check_agent_exists(self, agent_name):
+        with self.lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return agent_name in self.known
+
+    def _validate_proof_url(self, proof_url, agent_name):
+        return False
+
+
+def test_separate_positive_and_negative_ttls():
+    clock = FakeClock()
+    cache = VerificationCache(positive_ttl=100, negative_ttl=10, clock=clock)
+    cache.put('good', True)
+    cache.put('bad', False)
+
+    clock.now += 11
+    assert cache.get('good') is True
+    assert cache.get('bad') is None
+
+    clock.now += 100
+    assert cache.get('good') is None
+
+
+def test_lru_eviction():
+    cache = VerificationCache(max_entries=2)
+    cache.put('a', True)
+    cache.put('b', True)
+    cache.get('a')
+    cache.put('c', True)
+
+    assert len(cache) == 2
+    assert cache.get('a') is True
+    assert cache.get('b') is None
+
+
+def test_concurrent_lookups_share_one_call():
+    verifier = CountingVerifier(known={'Galeon'}, delay=0.2)
+    results = []
+
+    threads = [threading.Thread(target=lambda: results.append(verifier.verify_agent('Galeon')))
+               for _ in range(10)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == [True] * 10
+    assert verifier.calls == 1
+
+
+def test_async_lookups_share_one_call():
+    class AsyncCountingVerifier(CountingVerifier):
+        async def _check_agent_exists_async(self, session, agent_name):
+            self.calls += 1
+            await asyncio.sleep(0.05)
+            return agent_name in self.known
+
+    verifier = AsyncCountingVerifier(known={'Galeon'})
+
+    async def run():
+        try:
+            return await asyncio.gather(*[verifier.verify_agent_async('Galeon') for _ in range(10)])
+        finally:
+            await verifier.aclose()
+
+    assert asyncio.run(run()) == [True] * 10
+    assert verifier.calls == 1
+
+
+def test_negative_result_cached_briefly():
+    clock = FakeClock()
+    verifier = CountingVerifier(cache=VerificationCache(negative_ttl=10, clock=clock))
+
+    assert verifier.verify_agent('Nobody') is False
+    assert verifier.verify_agent('Nobody') is False
+    assert verifier.calls == 1
+
+    clock.now += 11
+    verifier.known.add('Nobody')  # Registered in the meantime
+    assert verifier.verify_agent('Nobody') is True
+    assert verifier.calls == 2
+
+
+def test_sqlite_tier_survives_restart(tmp_path):
+    db_file = str(tmp_path / 'verify.db')
+
+    first = CountingVerifier(known={'Galeon'}, cache=VerificationCache(db_file=db_file))
+    assert first.verify_agent('Galeon') is True
+
+    # New process: empty memory tier, same database
+    second = CountingVerifier(known=set(), cache=VerificationCache(db_file=db_file))
+    assert second.verify_agent('Galeon') is True
+    assert second.calls == 0
@@ -0,0 +1,100 @@
+"""
+Proof page streaming matcher and fetch tests
+"""
+
+import socket
+import threading
+import time
+from urllib.parse import urlparse
+
+import verifier
+from http_client import PooledHTTPClient
+from verifier import MoltbookVerifier, ProofMatcher, _is_moltbook_url
+
+
+class _LocalHTTP(PooledHTTPClient):
+    """Sends every request to a local server instead of the URL's host"""
+
+    def __init__(self, base_url: str):
+        super().__init__()
+        self.base_url = base_url
+
+    def get(self, url: str, timeout: float = 10, **kwargs):
+        return super().get(self.base_url + urlparse(url).path, timeout=timeout, **kwargs)
+
+
+def _drip_server(body: bytes, interval: float):
+    """Serve one page, one byte every `interval` seconds; returns its URL"""
+    server = socket.socket()
+    server.bind(('127.0.0.1', 0))
+    server.listen()
+
+    def serve():
+        conn, _ = server.accept()
+        conn.recv(65536)
+        conn.sendall(b'HTTP/1.1 200 OK\r\nContent-Type: text/html\r\nContent-Length: %d\r\n\r\n' % len(body))
+        try:
+            for i in range(len(body)):
+                conn.sendall(body[i:i + 1])
+                time.sleep(interval)
+        except OSError:
+            pass
+        finally:
+            conn.close()
+            server.close()
+
+    threading.Thread(target=serve, daemon=True).start()
+    return f'http://127.0.0.1:{server.getsockname()[1]}'
+
+
+def test_match_split_across_chunks():
+    matcher = ProofMatcher('Galeon')
+    chunks = [b'<html>posted by Gal', b'EON', b' on moltbook</html>']
+
+    assert matcher.feed(chunks[0]) is False
+    assert matcher.feed(chunks[1]) is True
+
+
+def test_multibyte_character_split_across_chunks():
+    name = 'Agenté'.encode('utf-8')
+    matcher = ProofMatcher('agenté')
+
+    assert matcher.feed(b'by ' + name[:-1]) is False
+    assert matcher.feed(name[-1:]) is True
+
+
+def test_stops_at_byte_budget():
+    matcher = ProofMatcher('Galeon', max_bytes=100)
+
+    assert matcher.feed(b'x' * 95) is False
+    # Name starts past the budget, so it must not be seen
+    assert matcher.feed(b'xxxxxGaleon') is False
+    assert matcher.exhausted
+    assert matcher.bytes_read == 100
+
+
+def test_no_match():
+    matcher = ProofMatcher('Galeon')
+    for _ in range(10):
+        assert matcher.feed(b'nothing to see here ' * 100) is False
+    assert len(matcher._tail) == len('Galeon') - 1
+
+
+def test_slow_proof_page_abandoned_at_deadline(monkeypatch):
+    monkeypatch.setattr(verifier, 'PROOF_TIMEOUT', 0.5)
+    # Every read returns within the per-read timeout, the page would take ~50s
+    base_url = _drip_server(b'x' * 500 + b'Galeon', interval=0.1)
+    moltbook = MoltbookVerifier(http=_LocalHTTP(base_url))
+
+    started = time.monotonic()
+    assert not moltbook._validate_proof_url('https://www.moltbook.com/post/1', 'Galeon')
+    assert time.monotonic() - started < 2
+
+
+def test_proof_url_host_must_be_moltbook():
+    assert _is_moltbook_url('https://moltbook.com/post/1')
+    assert _is_moltbook_url('https://www.moltbook.com/post/1')
+    assert not _is_moltbook_url('https://moltbook.com.evil.io/post/1')
+    assert not _is_moltbook_url('https://notmoltbook.com/post/1')
+    assert not _is_moltbook_url('https://evil.io/moltbook.com')
+    assert not _is_moltbook_url('https://moltbook.com@evil.io/post/1')
@@ -0,0 +1,197 @@
+"""
+Transaction Pipeline Module
+Local nonce management and background receipt tracking for the faucet hot wallet
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+from web3.exceptions import TransactionNotFound
+
+logger = logging.getLogger(__name__)
+
+# RPC error fragments that mean our local nonce no longer matches the node
+NONCE_ERROR_MARKERS = (
+    'nonce too low',
+    'nonce too high',
+    'invalid nonce',
+    'replacement transaction underpriced',
+)
+
+
+def is_nonce_error(error: Exception) -> bool:
+    """Check if an RPC error was caused by a stale or conflicting nonce"""
+    message = str(error).lower()
+    return any(marker in message for marker in NONCE_ERROR_MARKERS)
+
+
+class NonceManager:
+    """
+    Hands out nonces for one account from memory
+
+    The node is only asked for the pending transaction count on first use
+    and whenever the caller reports that the local view went stale
+    (nonce error on send, dropped transaction).
+    """
+
+    def __init__(self, w3, address: str):
+        self.w3 = w3
+        self.address = address
+        self._lock = threading.Lock()
+        self._next_nonce = None
+
+    def next_nonce(self) -> int:
+        """Reserve the next nonce for a transaction"""
+        with self._lock:
+            if self._next_nonce is None:
+                self._next_nonce = self._fetch_pending_count()
+            nonce = self._next_nonce
+            self._next_nonce += 1
+            return nonce
+
+    def resync(self) -> int:
+        """Reload the next nonce from the node's pending transaction count"""
+        with self._lock:
+            self._next_nonce = self._fetch_pending_count()
+            logger.info(f"Nonce resynced for {self.address}: next={self._next_nonce}")
+            return self._next_nonce
+
+    def _fetch_pending_count(self) -> int:
+        return self.w3.eth.get_transaction_count(self.address, 'pending')
+
+
+class ReceiptTracker:
+    """
+    Background confirmation of submitted transactions
+
+    Senders register a tx hash and return immediately; a daemon thread polls
+    the node for receipts and records the outcome. A transaction without a
+    receipt after `timeout` seconds is marked dropped only once the node no
+    longer knows it; one still waiting in the mempool (e.g. underpriced) is
+    logged as overdue and kept.
+    """
+
+    def __init__(
+        self,
+        w3,
+        poll_interval: float = 2.0,
+        timeout: float = 300.0,
+        on_dropped: Callable[[Dict], None] = None,
+        max_finished: int = 10000
+    ):
+        self.w3 = w3
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.on_dropped = on_dropped
+        self.max_finished = max_finished
+
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._finished = OrderedDict()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def track(self, tx_hash: str, nonce: int = None, callback: Callable[[Dict], None] = None):
+        """Register a submitted transaction for confirmation"""
+        with self._lock:
+            self._pending[tx_hash] = {
+                'tx_hash': tx_hash,
+                'nonce': nonce,
+                'status': 'pending',
+                'submitted_at': time.time(),
+                'callback': callback
+            }
+        self.start()
+
+    def status(self, tx_hash: str) -> Optional[Dict]:
+        """Get tracking state for a transaction (None if unknown)"""
+        with self._lock:
+            entry = self._pending.get(tx_hash) or self._finished.get(tx_hash)
+            if not entry:
+                return None
+            return {k: v for k, v in entry.items() if k != 'callback'}
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def start(self):
+        """Start the polling thread (no-op if already running)"""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='receipt-tracker', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.poll_interval + 1)
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.poll_once()
+            except Exception as e:
+                logger.error(f"Receipt tracker poll failed: {e}")
+
+    def poll_once(self):
+        """Check every pending transaction once"""
+        with self._lock:
+            pending = list(self._pending.values())
+
+        now = time.time()
+        for entry in pending:
+            tx_hash = entry['tx_hash']
+            try:
+                receipt = self.w3.eth.get_transaction_receipt(tx_hash)
+            except TransactionNotFound:
+                receipt = None
+
+            if receipt is None:
+                if now - entry['submitted_at'] > self.timeout and not self._still_pending(entry):
+                    self._finish(entry, 'dropped')
+                    logger.warning(f"Transaction dropped: {tx_hash} (nonce {entry['nonce']})")
+                    if self.on_dropped:
+                        self.on_dropped(entry)
+                continue
+
+            status = 'confirmed' if receipt['status'] == 1 else 'failed'
+            self._finish(entry, status, block_number=receipt['blockNumber'])
+            if status == 'failed':
+                logger.error(f"Transaction failed: {tx_hash}")
+
+    def _still_pending(self, entry: Dict) -> bool:
+        """Whether the node still has the transaction (warns once when it does)"""
+        try:
+            known = self.w3.eth.get_transaction(entry['tx_hash']) is not None
+        except TransactionNotFound:
+            known = False
+
+        if known and not entry.get('overdue'):
+            entry['overdue'] = True
+            logger.warning(
+                f"Transaction {entry['tx_hash']} (nonce {entry['nonce']}) still pending after {self.timeout:.0f}s"
+            )
+        return known
+
+    def _finish(self, entry: Dict, status: str, block_number: int = None):
+        with self._lock:
+            self._pending.pop(entry['tx_hash'], None)
+            entry['status'] = status
+            entry['block_number'] = block_number
+            entry['finished_at'] = time.time()
+            self._finished[entry['tx_hash']] = entry
+            while len(self._finished) > self.max_finished:
+                self._finished.popitem(last=False)
+
+        callback = entry.get('callback')
+        if callback:
+            try:
+                callback(self.status(entry['tx_hash']))
+            except Exception as e:
+                logger.error(f"Receipt callback failed for {entry['tx_hash']}: {e}")
@@ -0,0 +1,62 @@
+"""
+Use Case Classifier
+Maps a request reason to its dashboard use-case category in one pass
+"""
+
+import re
+from typing import Dict, List
+
+# Use case keywords, checked in priority order (first category wins)
+USE_CASE_KEYWORDS = {
+    'Testing': ['test', 'testing', 'try', 'experiment'],
+    'Payment': ['payment', 'pay', 'transfer', 'send'],
+    'Smart Contract': ['contract', 'deploy', 'smart contract'],
+    'Agent-to-Agent': ['agent', 'a2a', 'agent-to-agent'],
+    'Hackathon': ['hackathon', 'usdc', 'competition', 'project']
+}
+OTHER = 'Other'
+USE_CASE_CATEGORIES = list(USE_CASE_KEYWORDS) + [OTHER]
+
+
+class UseCaseClassifier:
+    """
+    Keyword classifier compiled into a single regex
+
+    The pattern is a zero-width lookahead over one alternation of every
+    keyword, with alternatives ordered by category priority. It therefore
+    reports a match at every position where any keyword starts (overlapping
+    ones included) and names the highest-priority category matching there.
+    Scanning once and keeping the best category gives the same answer as
+    checking each category's keywords in turn, and the scan stops early as
+    soon as the top-priority category is found.
+    """
+
+    def __init__(self, keywords: Dict[str, List[str]] = None):
+        self.keywords = keywords or USE_CASE_KEYWORDS
+        self.categories = list(self.keywords)
+
+        groups = []
+        for index, kws in enumerate(self.keywords.values()):
+            # Longest first so the reported group is stable; any match will do
+            alternation = '|'.join(re.escape(kw) for kw in sorted(kws, key=len, reverse=True))
+            groups.append(f'(?P<c{index}>{alternation})')
+        self._pattern = re.compile('(?=(?:' + '|'.join(groups) + '))')
+
+    def classify(self, reason: str) -> str:
+        """Get the use case category for one reason string"""
+        if not reason:
+            return OTHER
+
+        best = None
+        for match in self._pattern.finditer(reason.lower()):
+            priority = int(match.lastgroup[1:])
+            if best is None or priority < best:
+                best = priority
+                if best == 0:
+                    break
+
+        return self.categories[best] if best is not None else OTHER
+
+
+# Shared instance (the pattern is compiled once at import)
+classifier = UseCaseClassifier()
@@ -0,0 +1,231 @@
+"""
+Verification Cache
+Bounded TTL + LRU cache of agent verification results,
+with single-flight lookups and an optional SQLite tier
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from db_pool import get_pool
+
+logger = logging.getLogger(__name__)
+
+# Rows are purged from the SQLite tier every this many writes
+PURGE_EVERY = 500
+
+
+class _Flight:
+    """One in-progress verification that concurrent callers wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class VerificationCache:
+    """
+    Agent verification results, remembered between requests
+
+    Positive and negative results expire separately: a verified agent stays
+    verified for `positive_ttl`, while a failure is only trusted for the
+    short `negative_ttl` so a newly registered agent (or a Moltbook hiccup)
+    is retried soon. The in-memory tier holds at most `max_entries` keys and
+    drops the least recently used first.
+
+    Concurrent lookups for the same key share one call to the verifier.
+
+    With `db_file` set, results are also written to a `verification_cache`
+    table so a restarted worker starts warm instead of re-verifying every
+    active agent against Moltbook.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        positive_ttl: float = 6 * 3600,
+        negative_ttl: float = 60,
+        db_file: str = None,
+        clock: Callable[[], float] = time.time
+    ):
+        self.max_entries = max_entries
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.clock = clock
+
+        self._entries: 'OrderedDict[str, Tuple[bool, float]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, _Flight] = {}
+        self._inflight_async: Dict[str, asyncio.Future] = {}
+        self._writes = 0
+
+        self.pool = None
+        if db_file:
+            self.pool = get_pool(db_file)
+            with self.pool.writer() as conn:
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS verification_cache (
+                        cache_key TEXT PRIMARY KEY,
+                        verified BOOLEAN NOT NULL,
+                        expires_at REAL NOT NULL
+                    ) WITHOUT ROWID
+                ''')
+
+    def get(self, key: str) -> Optional[bool]:
+        """Get a cached result, or None if unknown or expired"""
+        cached = self._get_memory(key)
+        if cached is None and self.pool:
+            cached = self._get_persistent(key)
+        return cached
+
+    def put(self, key: str, verified: bool):
+        """Remember a verification result"""
+        ttl = self.positive_ttl if verified else self.negative_ttl
+        expires_at = self.clock() + ttl
+        self._put_memory(key, verified, expires_at)
+        if self.pool:
+            self._put_persistent(key, verified, expires_at)
+
+    async def put_async(self, key: str, verified: bool):
+        """Async version of put (the SQLite write runs off the event loop)"""
+        if self.pool:
+            await asyncio.to_thread(self.put, key, verified)
+        else:
+            self.put(key, verified)
+
+    def peek(self, key: str) -> Optional[bool]:
+        """Like get, but only consults the in-memory tier (never blocks on SQLite)"""
+        return self._get_memory(key)
+
+    def invalidate(self, key: str):
+        """Forget a cached result"""
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.pool:
+            with self.pool.writer() as conn:
+                conn.execute('DELETE FROM verification_cache WHERE cache_key = ?', (key,))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def get_or_verify(self, key: str, verify: Callable[[], bool]) -> bool:
+        """
+        Get a cached result, calling `verify` on a miss
+
+        Threads asking for the same key while a verification is running wait
+        for it instead of starting their own.
+        """
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = bool(verify())
+            self.put(key, flight.result)
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            flight.done.set()
+
+    async def get_or_verify_async(self, key: str, verify: Callable[[], Awaitable[bool]]) -> bool:
+        """Async version of get_or_verify (callers share one awaited verification)"""
+        cached = self._get_memory(key)
+        if cached is None and self.pool:
+            cached = await asyncio.to_thread(self._get_persistent, key)
+        if cached is not None:
+            return cached
+
+        future = self._inflight_async.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight_async[key] = future
+        try:
+            result = bool(await verify())
+            await self.put_async(key, result)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so an unawaited failure is not logged as lost
+            future.exception()
+            raise
+        finally:
+            del self._inflight_async[key]
+
+    def _get_memory(self, key: str) -> Optional[bool]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            verified, expires_at = entry
+            if expires_at <= self.clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return verified
+
+    def _put_memory(self, key: str, verified: bool, expires_at: float):
+        with self._lock:
+            self._entries[key] = (verified, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _get_persistent(self, key: str) -> Optional[bool]:
+        try:
+            row = self.pool.reader().execute(
+                'SELECT verified, expires_at FROM verification_cache WHERE cache_key = ?',
+                (key,)
+            ).fetchone()
+        except Exception as e:
+            logger.error(f"Verification cache read failed: {e}")
+            return None
+
+        if row is None or row['expires_at'] <= self.clock():
+            return None
+
+        verified = bool(row['verified'])
+        self._put_memory(key, verified, row['expires_at'])
+        return verified
+
+    def _put_persistent(self, key: str, verified: bool, expires_at: float):
+        try:
+            with self.pool.writer() as conn:
+                conn.execute('''
+                    INSERT INTO verification_cache (cache_key, verified, expires_at)
+                    VALUES (?, ?, ?)
+                    ON CONFLICT(cache_key) DO UPDATE SET
+                        verified = excluded.verified,
+                        expires_at = excluded.expires_at
+                ''', (key, verified, expires_at))
+
+                self._writes += 1
+                if self._writes % PURGE_EVERY == 0:
+                    conn.execute('DELETE FROM verification_cache WHERE expires_at <= ?', (self.clock(),))
+        except Exception as e:
+            # The memory tier still has the result; persistence is best effort
+            logger.error(f"Verification cache write failed: {e}")
@@ -3,30 +3,110 @@ Moltbook Agent Verifier
 Validates that requesters are real Moltbook agents
 """
 
-import requests
+import aiohttp
+import codecs
 import logging
+import socket
+import threading
+import time
 from urllib.parse import urlparse
 
+from http_client import PooledHTTPClient
+from verification_cache import VerificationCache
+
 logger = logging.getLogger(__name__)
 
 MOLTBOOK_API_BASE = "https://www.moltbook.com/api/v1"
 
+# Proof pages are scanned in chunks and abandoned after this many bytes
+PROOF_CHUNK_SIZE = 16 * 1024
+MAX_PROOF_BYTES = 1024 * 1024
+# Wall-clock budget for fetching a proof page (the async path's ClientTimeout total)
+PROOF_TIMEOUT = 10
+
+
+def _abort_response(response):
+    """Shut down a streaming response's socket, so a read blocked on it returns"""
+    connection = response.raw.connection
+    sock = getattr(connection, 'sock', None)
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+def _is_moltbook_url(url: str) -> bool:
+    """True for moltbook.com and its subdomains (not e.g. moltbook.com.evil.io)"""
+    host = (urlparse(url).hostname or '').rstrip('.')
+    return host == 'moltbook.com' or host.endswith('.moltbook.com')
+
+
+class ProofMatcher:
+    """
+    Case-insensitive streaming search for an agent name in a proof page
+
+    Chunks are decoded incrementally and only the last len(name) - 1
+    characters are carried over, so a name split across two chunks is still
+    found while memory stays constant. feed() returns True as soon as the
+    name is seen; once `max_bytes` have been fed, `exhausted` is set and the
+    caller should stop reading.
+    """
+
+    def __init__(self, agent_name: str, encoding: str = None, max_bytes: int = MAX_PROOF_BYTES):
+        self.needle = agent_name.lower()
+        self.max_bytes = max_bytes
+        self.bytes_read = 0
+        self.found = False
+        self._tail = ''
+        try:
+            decoder_cls = codecs.getincrementaldecoder(encoding or 'utf-8')
+        except LookupError:
+            decoder_cls = codecs.getincrementaldecoder('utf-8')
+        self._decoder = decoder_cls(errors='replace')
+
+    @property
+    def exhausted(self) -> bool:
+        return self.bytes_read >= self.max_bytes
+
+    def feed(self, chunk: bytes) -> bool:
+        if self.found or self.exhausted or not self.needle:
+            return self.found or not self.needle
+
+        chunk = chunk[:self.max_bytes - self.bytes_read]
+        self.bytes_read += len(chunk)
+
+        text = self._tail + self._decoder.decode(chunk).lower()
+        if self.needle in text:
+            self.found = True
+        else:
+            keep = len(self.needle) - 1
+            self._tail = text[-keep:] if keep else ''
+        return self.found
+
 
 class MoltbookVerifier:
     """Verify agent identity via Moltbook API"""
 
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, cache: VerificationCache = None, http: PooledHTTPClient = None):
         """
         Initialize verifier
 
         Args:
             api_key: Optional Moltbook API key for authenticated requests
+            cache: Verification result cache (in-memory by default)
+            http: Pooled keep-alive HTTP client for Moltbook calls
         """
         self.api_key = api_key
+        self.cache = cache if cache is not None else VerificationCache()
+        self.http = http or PooledHTTPClient()
         self.headers = {}
         if api_key:
             self.headers['Authorization'] = f'Bearer {api_key}'
 
+        # aiohttp session for the ASGI server, created inside its event loop
+        self._async_session = None
+
     def verify_agent(self, agent_name: str, moltbook_proof: str = None) -> bool:
         """
         Verify that agent exists on Moltbook
@@ -38,6 +118,27 @@ class MoltbookVerifier:
         Returns:
             True if verified, False otherwise
         """
+        # A verified agent stays verified whatever proof it sends next time
+        if self.cache.get(agent_name):
+            return True
+
+        return self.cache.get_or_verify(
+            self._cache_key(agent_name, moltbook_proof),
+            lambda: self._verify_uncached(agent_name, moltbook_proof)
+        )
+
+    def _cache_key(self, agent_name: str, moltbook_proof: str = None) -> str:
+        """Agent name alone, or agent name + proof URL when a proof is given"""
+        return f"{agent_name}\n{moltbook_proof}" if moltbook_proof else agent_name
+
+    def _verify_uncached(self, agent_name: str, moltbook_proof: str = None) -> bool:
+        verified = self._verify_with_moltbook(agent_name, moltbook_proof)
+        # Proof-verified agents are also cached under their bare name
+        if verified and moltbook_proof:
+            self.cache.put(agent_name, True)
+        return verified
+
+    def _verify_with_moltbook(self, agent_name: str, moltbook_proof: str = None) -> bool:
         try:
             # Method 1: Check if agent exists via API
             if self._check_agent_exists(agent_name):
@@ -60,7 +161,7 @@ class MoltbookVerifier:
         """Check if agent exists on Moltbook via API"""
         try:
             url = f"{MOLTBOOK_API_BASE}/users/{agent_name}"
-            response = requests.get(url, headers=self.headers, timeout=10)
+            response = self.http.get(url, headers=self.headers, timeout=10)
 
             if response.status_code == 200:
                 data = response.json()
@@ -86,18 +187,131 @@ class MoltbookVerifier:
             True if valid proof
         """
         try:
-            # Check if URL is from moltbook.com
-            parsed = urlparse(proof_url)
-            if 'moltbook.com' not in parsed.netloc:
+            if not _is_moltbook_url(proof_url):
                 return False
 
-            # Fetch the URL and check if agent_name appears
-            response = requests.get(proof_url, timeout=10)
-            if response.status_code == 200:
-                content = response.text.lower()
-                # Check if agent name appears in content
-                if agent_name.lower() in content:
-                    return True
+            # Stream the page and stop as soon as agent_name appears. The
+            # requests timeout only bounds each socket read, so a page that
+            # trickles in is cut off at the deadline by shutting down its socket.
+            deadline = time.monotonic() + PROOF_TIMEOUT
+            with self.http.get(proof_url, timeout=PROOF_TIMEOUT, stream=True) as response:
+                if response.status_code != 200:
+                    return False
+
+                watchdog = threading.Timer(max(deadline - time.monotonic(), 0), _abort_response, (response,))
+                watchdog.daemon = True
+                watchdog.start()
+                try:
+                    matcher = ProofMatcher(agent_name, response.encoding)
+                    for chunk in response.iter_content(PROOF_CHUNK_SIZE):
+                        if matcher.feed(chunk):
+                            return True
+                        if matcher.exhausted:
+                            logger.warning(f"Proof page over {MAX_PROOF_BYTES} bytes, gave up: {proof_url}")
+                            break
+                        if time.monotonic() >= deadline:
+                            logger.warning(f"Proof page not read within {PROOF_TIMEOUT}s, gave up: {proof_url}")
+                            break
+                finally:
+                    watchdog.cancel()
+
+            return False
+
+        except Exception as e:
+            logger.error(f"Proof URL validation failed: {str(e)}")
+            return False
+
+    async def verify_agent_async(self, agent_name: str, moltbook_proof: str = None) -> bool:
+        """Async version of verify_agent for the ASGI server"""
+        if self.cache.peek(agent_name):
+            return True
+
+        return await self.cache.get_or_verify_async(
+            self._cache_key(agent_name, moltbook_proof),
+            lambda: self._verify_uncached_async(agent_name, moltbook_proof)
+        )
+
+    async def _verify_uncached_async(self, agent_name: str, moltbook_proof: str = None) -> bool:
+        verified = await self._verify_with_moltbook_async(agent_name, moltbook_proof)
+        # Proof-verified agents are also cached under their bare name
+        if verified and moltbook_proof:
+            await self.cache.put_async(agent_name, True)
+        return verified
+
+    async def _verify_with_moltbook_async(self, agent_name: str, moltbook_proof: str = None) -> bool:
+        try:
+            session = self._get_async_session()
+
+            # Method 1: Check if agent exists via API
+            if await self._check_agent_exists_async(session, agent_name):
+                logger.info(f"Verified agent: {agent_name}")
+                return True
+
+            # Method 2: Validate moltbook_proof URL
+            if moltbook_proof and await self._validate_proof_url_async(session, moltbook_proof, agent_name):
+                logger.info(f"Verified agent via proof URL: {agent_name}")
+                return True
+
+            logger.warning(f"Could not verify agent: {agent_name}")
+            return False
+
+        except Exception as e:
+            logger.error(f"Error verifying agent {agent_name}: {str(e)}")
+            return False
+
+    def _get_async_session(self) -> aiohttp.ClientSession:
+        if self._async_session is None or self._async_session.closed:
+            connector = aiohttp.TCPConnector(limit_per_host=self.http.max_per_host)
+            self._async_session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=10)
+            )
+        return self._async_session
+
+    def latency_stats(self) -> dict:
+        """Per-phase latency (DNS, connect, TLS, first byte) of Moltbook calls"""
+        return self.http.latency_stats()
+
+    async def aclose(self):
+        """Close the async HTTP session (ASGI shutdown)"""
+        if self._async_session and not self._async_session.closed:
+            await self._async_session.close()
+
+    async def _check_agent_exists_async(self, session: aiohttp.ClientSession, agent_name: str) -> bool:
+        """Async version of _check_agent_exists"""
+        try:
+            url = f"{MOLTBOOK_API_BASE}/users/{agent_name}"
+            async with session.get(url, headers=self.headers) as response:
+                if response.status == 200:
+                    data = await response.json(content_type=None)
+                    # Check if response contains user data
+                    if 'id' in data or 'name' in data:
+                        return True
+
+            return False
+
+        except Exception as e:
+            logger.error(f"API check failed for {agent_name}: {str(e)}")
+            return False
+
+    async def _validate_proof_url_async(self, session: aiohttp.ClientSession, proof_url: str, agent_name: str) -> bool:
+        """Async version of _validate_proof_url"""
+        try:
+            if not _is_moltbook_url(proof_url):
+                return False
+
+            # Stream the page and stop as soon as agent_name appears
+            async with session.get(proof_url) as response:
+                if response.status != 200:
+                    return False
+
+                matcher = ProofMatcher(agent_name, response.charset)
+                async for chunk in response.content.iter_chunked(PROOF_CHUNK_SIZE):
+                    if matcher.feed(chunk):
+                        return True
+                    if matcher.exhausted:
+                        logger.warning(f"Proof page over {MAX_PROOF_BYTES} bytes, gave up: {proof_url}")
+                        break
 
             return False
 
@@ -113,3 +327,7 @@ class MockVerifier(MoltbookVerifier):
         """Mock verification - always succeeds"""
         logger.info(f"[MOCK] Verified agent: {agent_name}")
         return True
+
+    async def verify_agent_async(self, agent_name: str, moltbook_proof: str = None) -> bool:
+        """Mock verification - always succeeds"""
+        return self.verify_agent(agent_name, moltbook_proof)